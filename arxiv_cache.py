@@ -0,0 +1,279 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import arxiv
+
+from metrics import Metrics
+
+
+def paper_record(paper: arxiv.Result) -> dict:
+    """Convert an arxiv.Result into the JSON-serializable record stored for each paper."""
+    return {
+        'paper_id': paper.get_short_id(),
+        'title': paper.title,
+        'authors': [author.name for author in paper.authors],
+        'summary': paper.summary,
+        'pdf_url': paper.pdf_url,
+        'published': str(paper.published.date())
+    }
+
+
+def normalize_query(query: str) -> str:
+    """Queries that differ only in case or whitespace share one cache entry."""
+    return " ".join(query.lower().split())
+
+
+class ArxivSearchCache:
+    """
+    Response cache in front of one shared arxiv.Client.
+
+    Entries are keyed on (normalized query, max_results), expire after ttl
+    seconds and are evicted least-recently-used first once either
+    max_entries or max_bytes is exceeded. Concurrent requests for the same
+    key are coalesced into a single upstream call. The cache is written to
+    cache_path after every insert and reloaded on start, so it survives
+    server restarts.
+
+    The client is created once and reused, so arxiv.Client's own
+    delay_seconds throttle applies across calls. At most
+    upstream_concurrency upstream calls run at once (one by default, which
+    keeps that throttle meaningful when tools run on several threads). Pass
+    any object with a results(search) method as client to test without
+    network access. min_interval spaces the starts of upstream calls across
+    all threads, which bounds the request rate when upstream_concurrency > 1.
+
+    With metrics set, cache lookups are counted by result and upstream calls
+    are timed in two phases: network (request plus feed parsing inside
+    arxiv.Client) and records (conversion to paper records); saving the cache
+    is timed as cache_save.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        cache_path: Optional[str] = None,
+        ttl: float = 24 * 3600,
+        max_entries: int = 256,
+        max_bytes: int = 16 * 1024 * 1024,
+        clock: Callable[[], float] = time.time,
+        upstream_concurrency: int = 1,
+        min_interval: float = 0.0,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.client = client or arxiv.Client(page_size=100, delay_seconds=3.0, num_retries=3)
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.metrics = metrics
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._upstream_slots = threading.BoundedSemaphore(upstream_concurrency)
+        # Rate budget: upstream calls start at least min_interval seconds apart
+        self.min_interval = min_interval
+        self._next_start = 0.0
+        self._rate_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        # key -> (expires_at, results, size in bytes), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, List[dict], int]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, Future] = {}
+        self._load()
+
+    @staticmethod
+    def key(query: str, max_results: int) -> str:
+        return f"{normalize_query(query)}|{max_results}"
+
+    def search(self, query: str, max_results: int = 5) -> List[dict]:
+        """
+        Return arXiv results for a query, from the cache when possible.
+
+        Args:
+            query: arXiv search query
+            max_results: Maximum number of results to retrieve
+
+        Returns:
+            List of paper records (see paper_record)
+        """
+        search = arxiv.Search(
+            query = query,
+            max_results = max_results,
+            sort_by = arxiv.SortCriterion.Relevance
+        )
+        return self._get(self.key(query, max_results), search)
+
+    def fetch_ids(self, paper_ids: List[str]) -> List[dict]:
+        """
+        Return the arXiv records for a list of paper IDs, from the cache when possible.
+
+        Args:
+            paper_ids: arXiv IDs such as "2311.09277v1"
+
+        Returns:
+            List of paper records (see paper_record)
+        """
+        key = "id_list:" + ",".join(sorted(set(paper_ids)))
+        return self._get(key, arxiv.Search(id_list=list(paper_ids), max_results=len(paper_ids)))
+
+    def _count(self, result: str):
+        if self.metrics is not None:
+            self.metrics.count("arxiv_cache", result=result)
+
+    def _span(self, phase: str):
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.span("arxiv", phase=phase)
+
+    def _get(self, key: str, search: arxiv.Search) -> List[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._count("hit")
+                return entry[1]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                self._count("miss")
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+                self._count("coalesced")
+
+        if not owner:
+            # Someone else is already fetching this query, share their result
+            return future.result()
+
+        try:
+            results = self._fetch(search)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            self._store(key, results)
+        future.set_result(results)
+        self._save()
+        return results
+
+    def _wait_for_rate_budget(self):
+        if not self.min_interval:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _fetch(self, search: arxiv.Search) -> List[dict]:
+        with self._upstream_slots:
+            self._wait_for_rate_budget()
+            with self._span("network"):
+                papers = list(self.client.results(search))
+        with self._span("records"):
+            return [paper_record(paper) for paper in papers]
+
+    def _store(self, key: str, results: List[dict], expires_at: Optional[float] = None):
+        size = len(json.dumps(results))
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        if expires_at is None:
+            expires_at = self.clock() + self.ttl
+        self._entries[key] = (expires_at, results, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+
+    def _snapshot(self) -> List[list]:
+        now = self.clock()
+        return [
+            [key, expires_at, results]
+            for key, (expires_at, results, _) in self._entries.items()
+            if expires_at > now
+        ]
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r") as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading {self.cache_path}: {str(e)}")
+            return
+        now = self.clock()
+        for key, expires_at, results in entries:
+            if expires_at > now:
+                self._store(key, results, expires_at)
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        # Snapshot inside the save lock so the last writer always persists the newest state
+        with self._save_lock, self._span("cache_save"):
+            with self._lock:
+                snapshot = self._snapshot()
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as cache_file:
+                json.dump(snapshot, cache_file)
+            os.replace(tmp_path, self.cache_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+            }
+
+
+def open_arxiv_cache(paper_dir: str, metrics: Optional[Metrics] = None) -> ArxivSearchCache:
+    """
+    Build the cache from environment settings.
+
+    ARXIV_CACHE_TTL (seconds), ARXIV_CACHE_MAX_ENTRIES, ARXIV_CACHE_MAX_BYTES and
+    ARXIV_CACHE_PATH (default <paper_dir>/arxiv_cache.json) override the defaults;
+    ARXIV_PAGE_SIZE, ARXIV_DELAY_SECONDS and ARXIV_NUM_RETRIES configure the
+    shared arxiv.Client, ARXIV_MAX_CONCURRENCY caps parallel upstream calls and
+    ARXIV_MIN_INTERVAL sets the minimum spacing (seconds) between their starts.
+    """
+    client = arxiv.Client(
+        page_size=int(os.environ.get("ARXIV_PAGE_SIZE", 100)),
+        delay_seconds=float(os.environ.get("ARXIV_DELAY_SECONDS", 3.0)),
+        num_retries=int(os.environ.get("ARXIV_NUM_RETRIES", 3)),
+    )
+    return ArxivSearchCache(
+        client=client,
+        cache_path=os.environ.get("ARXIV_CACHE_PATH", os.path.join(paper_dir, "arxiv_cache.json")),
+        ttl=float(os.environ.get("ARXIV_CACHE_TTL", 24 * 3600)),
+        max_entries=int(os.environ.get("ARXIV_CACHE_MAX_ENTRIES", 256)),
+        max_bytes=int(os.environ.get("ARXIV_CACHE_MAX_BYTES", 16 * 1024 * 1024)),
+        upstream_concurrency=int(os.environ.get("ARXIV_MAX_CONCURRENCY", 1)),
+        min_interval=float(os.environ.get("ARXIV_MIN_INTERVAL", 0.0)),
+        metrics=metrics,
+    )
@@ -0,0 +1,232 @@
+"""
+Headless batch mode: replay a JSONL file of queries through the chatbot's full tool loop.
+
+Each line of the query file is a JSON object; the query text is taken from
+its "query" or "prompt" field, or else from "title" and "body" (the layout
+of requests.jsonl). Queries run concurrently over the chatbot's shared
+server sessions. Every finished query is written to the output file as one
+JSON line with its answer, tool trace and timings, and a summary of
+throughput and latency percentiles is printed at the end.
+
+With the stub backend no model is called: StubOllama stands in for the
+Ollama client and answers deterministically, so runs are offline and
+repeatable while tool calls still go to the real servers.
+"""
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from context_budget import estimate_tokens
+from metrics import percentile
+from tool_router import terms
+
+# Progress is reported on stderr after this many finished queries
+PROGRESS_EVERY = 10
+
+# Trace of the query being processed ({'turns': [...], 'tool_calls': [...]}); the
+# chatbot appends its model turns and tool calls to it while one is set
+query_trace = contextvars.ContextVar("query_trace", default=None)
+
+
+def load_queries(path: str) -> List[Dict[str, str]]:
+    """
+    Read a JSONL query file.
+
+    Returns:
+        [{"id": ..., "query": ...}] in file order; the ID is the record's
+        "id" or "request_id", or its line number
+    """
+    queries = []
+    with open(path, "r") as query_file:
+        for number, line in enumerate(query_file, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{number}: invalid JSON: {e}") from e
+            if isinstance(record, str):
+                record = {"query": record}
+            query = record.get("query") or record.get("prompt")
+            if not query:
+                query = "\n\n".join(part for part in (record.get("title"), record.get("body")) if part)
+            if not query:
+                raise ValueError(f"{path}:{number}: no query, prompt or title/body field")
+            queries.append({"id": str(record.get("id") or record.get("request_id") or number), "query": query})
+    return queries
+
+
+class StubOllama:
+    """
+    Offline stand-in for ollama.AsyncClient in process_query_local.
+
+    For each query it calls the offered tool that shares the most words
+    with the query (required arguments filled from the schema default, the
+    query text, or for *_id parameters its first word containing a digit),
+    up to tool_rounds times, then answers with a summary of
+    the tool results. Responses are streamed word by word like Ollama's,
+    after latency seconds per call to imitate model time.
+    """
+
+    def __init__(self, latency: float = 0.0, tool_rounds: int = 1):
+        self.latency = latency
+        self.tool_rounds = tool_rounds
+
+    @staticmethod
+    def _pick_tool(query: str, tools: List[dict]) -> dict:
+        words = set(terms(query))
+        scores = [
+            len(words & set(terms(f"{tool['function']['name']} {tool['function'].get('description') or ''}")))
+            for tool in tools
+        ]
+        return tools[scores.index(max(scores))]
+
+    @staticmethod
+    def _arguments(query: str, schema: dict) -> dict:
+        arguments = {}
+        properties = (schema or {}).get("properties", {})
+        for name in (schema or {}).get("required", []):
+            spec = properties.get(name, {})
+            if "default" in spec:
+                arguments[name] = spec["default"]
+            elif spec.get("type") in ("integer", "number"):
+                arguments[name] = 1
+            elif spec.get("type") == "boolean":
+                arguments[name] = False
+            elif spec.get("type") == "array":
+                arguments[name] = [query]
+            elif name.endswith("id"):
+                # e.g. paper_id: the first word that looks like an identifier
+                arguments[name] = next((word for word in query.split() if any(c.isdigit() for c in word)), query)
+            else:
+                arguments[name] = query
+        return arguments
+
+    def _reply(self, messages: List[dict], tools: List[dict]) -> dict:
+        # Messages since the last user message belong to the current query
+        start = max(i for i, message in enumerate(messages) if message["role"] == "user")
+        query = messages[start]["content"]
+        rounds = sum(1 for message in messages[start:] if message["role"] == "assistant")
+        if tools and rounds < self.tool_rounds:
+            tool = self._pick_tool(query, tools)
+            function = tool["function"]
+            return {"role": "assistant", "content": "", "tool_calls": [{
+                "function": {"name": function["name"], "arguments": self._arguments(query, function.get("parameters"))}
+            }]}
+        results = [message for message in messages[start:] if message["role"] == "tool"]
+        lines = [f"Stub answer to: {query[:200]}"]
+        for message in results:
+            lines.append(f"- {message.get('tool_name')} returned {len(message['content'])} characters: "
+                         f"{message['content'][:200]}")
+        return {"role": "assistant", "content": "\n".join(lines)}
+
+    async def chat(self, model=None, messages=None, tools=None, stream=False, keep_alive=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        message = self._reply(messages or [], tools or [])
+        done = {"message": {"role": "assistant", "content": ""}, "done": True,
+                "prompt_eval_count": estimate_tokens(messages) + estimate_tokens(tools)}
+        if not stream:
+            return {**done, "message": message}
+        return self._stream(message, done)
+
+    @staticmethod
+    async def _stream(message: dict, done: dict):
+        if message.get("tool_calls"):
+            yield {"message": message}
+        for word in message["content"].split(" ") if message["content"] else []:
+            yield {"message": {"role": "assistant", "content": word + " "}}
+        yield done
+
+
+async def run_batch(chatbot, queries: List[Dict[str, str]], output_path: str, concurrency: int = 4,
+                    backend: str = "ollama") -> dict:
+    """
+    Run queries through the chatbot concurrently and write one result line per query.
+
+    Args:
+        chatbot: Connected MCP_ChatBot; with backend "stub" its Ollama client
+            should be a StubOllama
+        queries: Output of load_queries()
+        output_path: JSONL file for the results (overwritten)
+        concurrency: Queries in flight at the same time
+        backend: "anthropic" runs process_query, anything else process_query_local
+
+    Returns:
+        Summary with throughput and latency percentiles
+    """
+    process = chatbot.process_query if backend == "anthropic" else chatbot.process_query_local
+    pending = iter(queries)
+    latencies = []
+    errors = 0
+    tool_calls = 0
+
+    async def worker(output):
+        nonlocal errors, tool_calls
+        for item in pending:
+            trace = {'turns': [], 'tool_calls': []}
+            # Each worker task has its own context, so traces of concurrent queries stay apart
+            query_trace.set(trace)
+            started = time.perf_counter()
+            answer = error = None
+            try:
+                answer = await process(item['query'])
+            except Exception as e:
+                error = repr(e)
+                errors += 1
+            seconds = time.perf_counter() - started
+            latencies.append(seconds)
+            tool_calls += len(trace['tool_calls'])
+            output.write(json.dumps({
+                'id': item['id'],
+                'query': item['query'],
+                'answer': answer,
+                'error': error,
+                'seconds': seconds,
+                'llm_seconds': sum(turn['total'] for turn in trace['turns']),
+                'tool_seconds': sum(call['seconds'] for call in trace['tool_calls']),
+                'first_token_seconds': trace['turns'][0]['ttft'] if trace['turns'] else None,
+                'turns': trace['turns'],
+                'tool_calls': trace['tool_calls']
+            }, default=str) + "\n")
+            output.flush()
+            if len(latencies) % PROGRESS_EVERY == 0 or len(latencies) == len(queries):
+                print(f"{len(latencies)}/{len(queries)} queries done", file=sys.stderr)
+
+    started = time.perf_counter()
+    # The tool loop prints answers as they stream; batch results go to the output file instead
+    with open(output_path, "w") as output, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        await asyncio.gather(*(worker(output) for _ in range(max(1, concurrency))))
+    wall = time.perf_counter() - started
+
+    return {
+        'queries': len(latencies),
+        'errors': errors,
+        'tool_calls': tool_calls,
+        'concurrency': concurrency,
+        'wall_seconds': wall,
+        'queries_per_second': len(latencies) / wall if wall else None,
+        'p50_seconds': percentile(latencies, 50),
+        'p95_seconds': percentile(latencies, 95),
+        'p99_seconds': percentile(latencies, 99),
+        'mean_seconds': sum(latencies) / len(latencies) if latencies else None,
+        'max_seconds': max(latencies) if latencies else None,
+    }
+
+
+def format_summary(summary: dict) -> str:
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.1f} ms"
+
+    return "\n".join([
+        f"Queries:     {summary['queries']} ({summary['errors']} failed), {summary['tool_calls']} tool calls",
+        f"Wall time:   {summary['wall_seconds']:.2f} s at concurrency {summary['concurrency']}",
+        f"Throughput:  {summary['queries_per_second'] or 0:.2f} queries/s",
+        f"Latency:     p50 {ms(summary['p50_seconds'])}, p95 {ms(summary['p95_seconds'])}, "
+        f"p99 {ms(summary['p99_seconds'])}, mean {ms(summary['mean_seconds'])}, max {ms(summary['max_seconds'])}",
+    ])
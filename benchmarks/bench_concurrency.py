@@ -0,0 +1,107 @@
+"""
+Concurrency benchmark for research_server tools.
+
+Runs the server in-process and connects N MCP clients to it over in-memory
+transports. Every client issues search_papers calls for distinct topics
+against a stub arXiv client that sleeps to simulate network latency, so no
+request is served from the cache and nothing touches the network. With the
+tools running on the thread pool, throughput should grow with the number of
+clients until the pool (RESEARCH_TOOL_WORKERS) is saturated.
+
+Usage:
+    python benchmarks/bench_concurrency.py [--latency 0.2] [--calls 4] [--clients 1 2 4 8 16]
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class StubAuthor:
+    def __init__(self, name):
+        self.name = name
+
+
+class StubPaper:
+    def __init__(self, query, i):
+        self.title = f"{query} paper {i}"
+        self.authors = [StubAuthor("Ada Lovelace"), StubAuthor("Alan Turing")]
+        self.summary = f"A synthetic abstract about {query}. " * 10
+        self.pdf_url = f"http://arxiv.org/pdf/{abs(hash(query)) % 10000}.{i:05d}v1"
+        self.published = datetime.datetime(2024, 1, 1)
+        self._id = f"{abs(hash(query)) % 10000}.{i:05d}v1"
+
+    def get_short_id(self):
+        return self._id
+
+
+class StubArxivClient:
+    """Stands in for arxiv.Client: sleeps for latency seconds, then returns fake results."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def results(self, search):
+        time.sleep(self.latency)
+        return [StubPaper(search.query, i) for i in range(search.max_results)]
+
+
+async def run_clients(server, n_clients, calls_per_client, run_id):
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    async def client(client_id):
+        async with create_connected_server_and_client_session(server._mcp_server) as session:
+            for call in range(calls_per_client):
+                await session.call_tool(
+                    "search_papers",
+                    # refresh: always take the (stubbed) arXiv path, never the stored papers
+                    {"topic": f"run {run_id} client {client_id} call {call}", "max_results": 3, "refresh": True},
+                )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(n_clients)))
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated arXiv latency in seconds")
+    parser.add_argument("--calls", type=int, default=4, help="search_papers calls per client")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    # Keep the benchmark's papers/ tree and caches away from the real ones
+    os.chdir(tempfile.mkdtemp(prefix="research-bench-"))
+    import research_server
+    from arxiv_cache import ArxivSearchCache
+    logging.getLogger("mcp").setLevel(logging.WARNING)
+
+    research_server.arxiv_cache = ArxivSearchCache(
+        client=StubArxivClient(args.latency),
+        upstream_concurrency=max(args.clients),
+    )
+
+    print(f"tool workers: {research_server.TOOL_WORKERS}, simulated arXiv latency: {args.latency}s")
+    print(f"{'clients':>8} {'calls':>6} {'seconds':>8} {'calls/s':>8} {'speedup':>8}")
+    baseline = None
+    for run_id, n_clients in enumerate(args.clients):
+        # search_papers prints where results were saved; keep the table readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed = await run_clients(research_server.mcp, n_clients, args.calls, run_id)
+        calls = n_clients * args.calls
+        throughput = calls / elapsed
+        baseline = baseline or throughput
+        print(f"{n_clients:>8} {calls:>6} {elapsed:>8.2f} {throughput:>8.1f} {throughput / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
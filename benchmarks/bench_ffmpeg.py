@@ -0,0 +1,78 @@
+"""
+Wall-clock benchmark of single-process vs segment-parallel FFmpeg encoding.
+
+Generates a synthetic test clip with ffmpeg's lavfi sources (moving test
+pattern plus a sine tone), converts it with each requested preset through
+FFmpegJobManager once as a single encode and once segment-parallel, and
+reports the speedup. Everything happens in a temporary directory.
+
+Usage:
+    python benchmarks/bench_ffmpeg.py [--duration 120] [--size 1280x720] [--presets fast balanced]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ffmpeg_jobs import DONE, FFmpegJobManager
+from ffmpeg_presets import PRESETS, audio_args, segment_layout, video_args
+
+
+def generate_clip(path, duration, size, rate=30):
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=duration={duration}:size={size}:rate={rate}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+        # Keyframe every 2 seconds, like typical camera and screen recordings
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", str(rate * 2),
+        "-c:a", "aac", "-shortest", path
+    ], check=True)
+
+
+async def convert(manager, input_path, output_path, preset, segmented):
+    if segmented:
+        workers, threads = segment_layout()
+        video = video_args(preset, threads)
+        segments = {"workers": workers, "video_args": video, "audio_args": audio_args(preset)}
+        job = await manager.submit(input_path, output_path, video + audio_args(preset), preset, segments)
+    else:
+        video = video_args(preset)
+        job = await manager.submit(input_path, output_path, video + audio_args(preset), preset)
+    started = time.perf_counter()
+    job = await manager.wait(job["id"])
+    if job["status"] != DONE:
+        raise RuntimeError(f"{preset} conversion {job['status']}: {job['error']}")
+    return time.perf_counter() - started
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=int, default=120, help="Length of the generated clip in seconds")
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--presets", nargs="+", default=["fast", "balanced"], choices=list(PRESETS))
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="ffmpeg-bench-")
+    clip = os.path.join(work_dir, "clip.mp4")
+    generate_clip(clip, args.duration, args.size)
+    # One job at a time, so each measurement has the whole machine
+    manager = FFmpegJobManager(work_dir, os.path.join(work_dir, "jobs.json"), max_jobs=1)
+
+    workers, threads = segment_layout()
+    print(f"{args.duration}s {args.size} clip, {os.cpu_count()} cores, "
+          f"segment-parallel: {workers} encoders x {threads} threads")
+    print(f"{'preset':<10} {'single s':>9} {'parallel s':>11} {'speedup':>8}")
+    for preset in args.presets:
+        single = await convert(manager, clip, os.path.join(work_dir, f"{preset}-single.mp4"), preset, False)
+        parallel = await convert(manager, clip, os.path.join(work_dir, f"{preset}-parallel.mp4"), preset, True)
+        print(f"{preset:<10} {single:>9.2f} {parallel:>11.2f} {single / parallel:>7.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,201 @@
+"""
+Benchmark of the full-text ingestion pipeline against a local stand-in for arXiv.
+
+A threaded HTTP server on localhost serves generated sample PDFs (numbered
+sections with searchable text) with Range support, a fixed latency per
+request and a bandwidth cap per connection. With --flaky, the first
+response for every file is cut off halfway, so each download has to resume
+with a Range request. The same set of papers is ingested once per
+--downloads setting into a fresh temporary store, and the wall time, the
+throughput and the number of resumed downloads are reported; afterwards one
+paper is read back by section and by query to check the extracted text.
+Needs pypdf.
+
+Usage:
+    python benchmarks/bench_fulltext.py [--papers 32] [--pages 12] [--downloads 1 4 8]
+        [--latency 0.1] [--bandwidth 2000000] [--flaky]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fulltext import FulltextPipeline, FulltextStore, pypdf
+
+WORDS = """
+language model reasoning agent retrieval graph neural network transformer attention
+diffusion policy reinforcement learning robust training data efficient sparse scaling
+benchmark evaluation alignment safety interpretability vision multimodal memory planning
+""".split()
+SECTIONS = ["Introduction", "Related Work", "Method", "Experiments", "Results", "Conclusion"]
+
+
+def make_pdf(pages):
+    """A minimal PDF with one Helvetica text line per entry of each page's line list."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        text = "".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T* "
+            for line in lines
+        )
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def sample_paper(seed, n_pages, lines_per_page=55):
+    """PDF bytes of a paper whose numbered sections are spread over n_pages pages."""
+    rng = random.Random(seed)
+    lines = [f"Sample paper {seed}", "Abstract", " ".join(rng.choices(WORDS, k=12)) + "."]
+    per_section = max(1, n_pages * lines_per_page // len(SECTIONS))
+    for number, title in enumerate(SECTIONS, 1):
+        lines.append(f"{number} {title}")
+        for _ in range(per_section):
+            lines.append(" ".join(rng.choices(WORDS, k=12)) + ".")
+        if title == "Experiments":
+            lines.append(f"We measure a throughput of {seed} tokens per second on the quokka benchmark.")
+    return make_pdf([lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)])
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Serves /pdf/<name> from server.files with Range support, latency and a bandwidth cap."""
+
+    def do_GET(self):
+        server = self.server
+        name = self.path.rsplit("/", 1)[-1]
+        body = server.files.get(name)
+        time.sleep(server.latency)
+        if body is None:
+            self.send_error(404)
+            return
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            start = int(range_header[6:].split("-")[0])
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            with server.lock:
+                server.ranged += 1
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+
+        end = len(body)
+        with server.lock:
+            if server.flaky and name not in server.cut:
+                # Cut this first response off halfway through
+                server.cut.add(name)
+                end = start + (len(body) - start) // 2
+        block = 16 * 1024
+        for offset in range(start, end, block):
+            self.wfile.write(body[offset:min(offset + block, end)])
+            if server.bandwidth:
+                time.sleep(block / server.bandwidth)
+        if end < len(body):
+            self.close_connection = True
+            self.wfile.flush()
+            self.connection.shutdown(2)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stand_in(files, latency, bandwidth, flaky):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.daemon_threads = True
+    server.files = files
+    server.latency = latency
+    server.bandwidth = bandwidth
+    server.flaky = flaky
+    server.cut = set()
+    server.ranged = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def ingest(server, paper_ids, downloads):
+    directory = tempfile.mkdtemp(prefix="fulltext-bench-")
+    pipeline = FulltextPipeline(FulltextStore(directory), max_downloads=downloads, retry_delay=0.05)
+    base = f"http://127.0.0.1:{server.server_address[1]}/pdf/"
+    started = time.perf_counter()
+    indexes = await asyncio.gather(*(pipeline.submit(paper_id, base + paper_id) for paper_id in paper_ids))
+    elapsed = time.perf_counter() - started
+    resumed = sum(status["resumed"] for status in pipeline.status.values())
+    await pipeline.close()
+    return pipeline.store, indexes, elapsed, resumed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--papers", type=int, default=32)
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--downloads", type=int, nargs="+", default=[1, 4, 8],
+                        help="Concurrent download settings to compare")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds before each response starts")
+    parser.add_argument("--bandwidth", type=int, default=2_000_000, help="Bytes per second per connection (0: unlimited)")
+    parser.add_argument("--flaky", action="store_true", help="Cut the first response for every file halfway")
+    args = parser.parse_args()
+
+    if pypdf is None:
+        sys.exit("pypdf is not installed; run 'pip install pypdf' first")
+
+    files = {f"2401.{i:05d}v1": sample_paper(i, args.pages) for i in range(args.papers)}
+    total_bytes = sum(len(body) for body in files.values())
+    print(f"{args.papers} sample PDFs, {total_bytes / 1e6:.1f} MB, latency {args.latency * 1000:.0f} ms, "
+          f"bandwidth {args.bandwidth / 1e6:.1f} MB/s per connection{', flaky' if args.flaky else ''}")
+    print(f"{'downloads':>9} {'seconds':>8} {'MB/s':>7} {'papers/s':>9} {'resumed':>8} {'chunks':>7}")
+
+    for downloads in args.downloads:
+        server = start_stand_in(files, args.latency, args.bandwidth, args.flaky)
+        store, indexes, elapsed, resumed = asyncio.run(ingest(server, list(files), downloads))
+        server.shutdown()
+        chunks = sum(len(index["chunks"]) for index in indexes)
+        print(f"{downloads:>9} {elapsed:>8.2f} {total_bytes / elapsed / 1e6:>7.2f} "
+              f"{len(files) / elapsed:>9.1f} {resumed:>8} {chunks:>7}")
+
+    # Read one paper back by section and by query
+    paper_id = list(files)[-1]
+    index, passages = store.select(paper_id, section="Experiments", max_chars=1000)
+    print(f"\n{paper_id}: {index['pages']} pages, sections: {', '.join(entry['title'] for entry in index['sections'])}")
+    print(f"'Experiments' section starts on page {passages[0][0]['page']}")
+    _, passages = store.select(paper_id, query="quokka throughput", max_chars=1)
+    found = "quokka" in passages[0][1] if passages else False
+    print(f"Query 'quokka throughput' finds the planted sentence: {found}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Load test for research_server over streamable HTTP.
+
+Starts the server (unless --url points at one that is already running),
+connects many concurrent MCP clients and has each of them call a mix of
+tools, then reports p50/p99 latency and throughput per tool. search_papers
+is left out of the default mix because it goes to arXiv.
+
+Usage:
+    python benchmarks/bench_load.py [--clients 32] [--calls 20] [--workers 4]
+    python benchmarks/bench_load.py --url http://localhost:8001/mcp
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from metrics import percentile
+
+
+async def wait_for_server(url, timeout=30):
+    """Wait until the server accepts TCP connections."""
+    parsed = urlparse(url)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(parsed.hostname, parsed.port or 80)
+            writer.close()
+            await writer.wait_closed()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+
+async def discover_paper_ids(url):
+    """Collect a few stored paper IDs so extract_info has something to find."""
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            result = await session.call_tool("search_local", {"query": "model learning reasoning", "max_results": 50})
+            try:
+                return [paper["paper_id"] for paper in json.loads(result.content[0].text)] or ["0000.00000"]
+            except (json.JSONDecodeError, IndexError, KeyError):
+                return ["0000.00000"]
+
+
+def make_call(tool, paper_ids):
+    if tool == "extract_info":
+        return {"paper_id": random.choice(paper_ids)}
+    if tool == "search_local":
+        return {"query": random.choice(["reasoning", "chain of thought", "interpretability", "computer history"])}
+    if tool == "search_papers":
+        return {"topic": random.choice(["llm reasoning", "interpretability"]), "max_results": 3}
+    return {}
+
+
+async def run_client(url, tools, calls, paper_ids, latencies, errors):
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for _ in range(calls):
+                tool = random.choice(tools)
+                started = time.perf_counter()
+                try:
+                    if tool == "papers://folders":
+                        await session.read_resource(tool)
+                    else:
+                        result = await session.call_tool(tool, make_call(tool, paper_ids))
+                        if result.isError:
+                            errors[tool] = errors.get(tool, 0) + 1
+                except Exception:
+                    errors[tool] = errors.get(tool, 0) + 1
+                latencies.setdefault(tool, []).append(time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="URL of a running server; by default one is started locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for the local server")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--calls", type=int, default=20, help="Calls per client")
+    parser.add_argument("--tools", nargs="+", default=["extract_info", "search_local", "papers://folders"])
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        url = f"http://127.0.0.1:{args.port}/mcp"
+        server = subprocess.Popen(
+            [sys.executable, "research_server.py", "--transport", "streamable-http",
+             "--host", "127.0.0.1", "--port", str(args.port), "--workers", str(args.workers)],
+            cwd=ROOT,
+            env={**os.environ, "FASTMCP_LOG_LEVEL": "WARNING"},
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        await wait_for_server(url)
+        paper_ids = await discover_paper_ids(url)
+
+        latencies, errors = {}, {}
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            run_client(url, args.tools, args.calls, paper_ids, latencies, errors)
+            for _ in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{args.clients} clients x {args.calls} calls against {url}: "
+          f"{total} calls in {elapsed:.2f}s ({total / elapsed:.1f} calls/s)")
+    print(f"{'tool':<20} {'calls':>6} {'errors':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for tool, samples in sorted(latencies.items()):
+        print(f"{tool:<20} {len(samples):>6} {errors.get(tool, 0):>6} "
+              f"{percentile(samples, 50) * 1000:>8.1f} {percentile(samples, 99) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
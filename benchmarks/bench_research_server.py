@@ -0,0 +1,289 @@
+"""
+Benchmark suite for the research server tools on synthetic corpora.
+
+For every storage backend and corpus scale, a fresh worker process builds a
+synthetic papers/ tree (scale = number of papers, --papers-per-topic of
+them per topic) in a temporary directory, imports research_server with a
+stub arXiv client (no network, no latency), and measures search_papers,
+extract_info, find_related_papers, papers://folders and papers://{topic}.
+The first find_related_papers call builds the similarity index, so its
+cold time includes indexing the whole corpus:
+
+- latency: first (cold) call, then p50/p95/p99/mean over --iterations calls
+- memory: peak Python allocations during the calls (tracemalloc, separate
+  pass) and the process's resident set size
+- file I/O: bytes and read/write syscalls per call (from /proc/self/io,
+  Linux only; null elsewhere)
+
+Results go to a JSON file together with the git commit, so two runs can be
+compared with --compare to spot regressions.
+
+Usage:
+    python benchmarks/bench_research_server.py [--scales 10 1000 100000] [--backends json sqlite]
+        [--iterations 200] [--output bench_results.json] [--compare previous.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from metrics import percentile
+
+WORDS = """
+language model reasoning agent retrieval graph neural network transformer attention
+diffusion policy reinforcement learning robust training data efficient sparse scaling
+benchmark evaluation alignment safety interpretability vision multimodal memory planning
+compression quantization inference latency distributed optimization theory causal
+""".split()
+
+
+def paper_id(i):
+    return f"{2400 + i // 100000}.{i % 100000:05d}v1"
+
+
+def generate_corpus(store, n_papers, papers_per_topic, seed=0):
+    """Write n_papers synthetic papers, papers_per_topic per topic; returns the topic names."""
+    rng = random.Random(seed)
+    topics = []
+    batch = {}
+    for start in range(0, n_papers, papers_per_topic):
+        topic = f"topic_{len(topics):06d}"
+        topics.append(topic)
+        batch[topic] = {
+            paper_id(i): {
+                'title': " ".join(rng.choices(WORDS, k=8)).capitalize(),
+                'authors': [f"Author {rng.randrange(5000)}" for _ in range(3)],
+                'summary': " ".join(rng.choices(WORDS, k=150)),
+                'pdf_url': f"http://arxiv.org/pdf/{paper_id(i)}",
+                'published': f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+            }
+            for i in range(start, min(start + papers_per_topic, n_papers))
+        }
+        if len(batch) >= 1000:
+            store.add_papers_bulk(batch)
+            batch = {}
+    if batch:
+        store.add_papers_bulk(batch)
+    return topics
+
+
+def read_io():
+    """Cumulative I/O counters of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/io") as io_file:
+            return {key: int(value) for key, value in (line.split(": ") for line in io_file)}
+    except OSError:
+        return None
+
+
+def rss_kb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def directory_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+async def measure(call, iterations):
+    """Latency, I/O and memory of one operation; call(i) performs the i-th invocation."""
+    started = time.perf_counter()
+    await call(0)
+    cold = time.perf_counter() - started
+
+    io_before = read_io()
+    samples = []
+    for i in range(1, iterations + 1):
+        started = time.perf_counter()
+        await call(i)
+        samples.append(time.perf_counter() - started)
+    io_after = read_io()
+
+    # Allocation tracking slows every call down, so it gets its own, shorter pass
+    tracemalloc.start()
+    for i in range(iterations + 1, iterations + 1 + min(iterations, 20)):
+        await call(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    io = None
+    if io_before and io_after:
+        io = {key: (io_after[key] - io_before[key]) / iterations
+              for key in ("rchar", "wchar", "syscr", "syscw", "read_bytes", "write_bytes")}
+    return {
+        'iterations': iterations,
+        'cold_ms': cold * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'mean_ms': sum(samples) / len(samples) * 1000,
+        'peak_alloc_kb': peak / 1024,
+        'rss_kb': rss_kb(),
+        'io_per_call': io,
+    }
+
+
+async def run_worker(backend, scale, papers_per_topic, iterations):
+    """Build one corpus and benchmark every operation against it (runs in its own process)."""
+    os.chdir(tempfile.mkdtemp(prefix=f"research-bench-{backend}-{scale}-"))
+    os.environ["PAPER_STORE"] = backend
+    os.environ["ARXIV_CACHE_PATH"] = os.path.join("papers", "arxiv_cache.json")
+    import logging
+    from paper_store import open_paper_store
+    logging.getLogger("mcp").setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    store = open_paper_store("papers")
+    topics = generate_corpus(store, scale, papers_per_topic)
+    store.close()
+    generate_seconds = time.perf_counter() - started
+
+    rss_before_import = rss_kb()
+    started = time.perf_counter()
+    import research_server
+    from arxiv_cache import ArxivSearchCache
+    from bench_concurrency import StubArxivClient
+    research_server.arxiv_cache = ArxivSearchCache(client=StubArxivClient(0))
+    import_seconds = time.perf_counter() - started
+    mcp = research_server.mcp
+
+    rng = random.Random(1)
+    devnull = open(os.devnull, "w")
+
+    async def search_papers(i):
+        # search_papers prints where it saved the results; keep stdout for the JSON result
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            # refresh: similar query names would otherwise resolve to an already stored topic
+            await mcp.call_tool("search_papers", {"topic": f"bench query {i}", "max_results": 5, "refresh": True})
+        finally:
+            sys.stdout = stdout
+
+    async def extract_info(i):
+        await mcp.call_tool("extract_info", {"paper_id": paper_id(rng.randrange(scale))})
+
+    async def find_related_papers(i):
+        await mcp.call_tool("find_related_papers", {"paper_id": paper_id(rng.randrange(scale)), "k": 5})
+
+    async def get_available_folders(i):
+        await mcp.read_resource("papers://folders")
+
+    async def get_topic_papers(i):
+        await mcp.read_resource(f"papers://{rng.choice(topics)}")
+
+    results = []
+    for name, call in [("extract_info", extract_info), ("find_related_papers", find_related_papers),
+                       ("get_available_folders", get_available_folders),
+                       ("get_topic_papers", get_topic_papers), ("search_papers", search_papers)]:
+        row = await measure(call, iterations)
+        results.append({'backend': backend, 'scale': scale, 'topics': len(topics), 'papers': scale,
+                        'operation': name, **row})
+
+    corpus = {
+        'backend': backend, 'scale': scale, 'topics': len(topics), 'papers': scale,
+        'generate_seconds': generate_seconds, 'import_seconds': import_seconds,
+        'corpus_bytes': directory_bytes("papers"), 'rss_before_import_kb': rss_before_import,
+    }
+    return {'corpus': corpus, 'results': results}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path, results):
+    """Print p50 changes against an earlier results file."""
+    with open(previous_path) as previous_file:
+        previous = json.load(previous_file)
+    before = {(row['backend'], row['scale'], row['operation']): row for row in previous['results']}
+    print(f"\nCompared with {previous_path} (commit {previous.get('commit')}):")
+    print(f"{'backend':<8} {'scale':>7} {'operation':<22} {'p50 before':>11} {'p50 now':>9} {'change':>8}")
+    for row in results:
+        old = before.get((row['backend'], row['scale'], row['operation']))
+        if old is None:
+            continue
+        change = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+        print(f"{row['backend']:<8} {row['scale']:>7} {row['operation']:<22} "
+              f"{old['p50_ms']:>11.3f} {row['p50_ms']:>9.3f} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 1000, 100000],
+                        help="Corpus sizes in papers")
+    parser.add_argument("--papers-per-topic", type=int, default=10)
+    parser.add_argument("--backends", nargs="+", default=["json", "sqlite"], choices=["json", "sqlite"])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--worker", nargs=2, metavar=("BACKEND", "SCALE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        backend, scale = args.worker[0], int(args.worker[1])
+        report = asyncio.run(run_worker(backend, scale, args.papers_per_topic, args.iterations))
+        print(json.dumps(report))
+        return
+
+    corpora, results = [], []
+    print(f"{'backend':<8} {'scale':>7} {'operation':<22} {'cold ms':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'alloc KB':>9} {'RSS MB':>7} {'read B/call':>12} {'write B/call':>13}")
+    for backend in args.backends:
+        for scale in args.scales:
+            # A fresh process per corpus keeps memory numbers and module state independent
+            worker = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", backend, str(scale),
+                 "--papers-per-topic", str(args.papers_per_topic), "--iterations", str(args.iterations)],
+                capture_output=True, text=True, env={**os.environ, "FASTMCP_LOG_LEVEL": "WARNING"}
+            )
+            if worker.returncode != 0:
+                print(f"{backend} at scale {scale} failed:\n{worker.stderr}")
+                continue
+            report = json.loads(worker.stdout.strip().splitlines()[-1])
+            corpora.append(report['corpus'])
+            for row in report['results']:
+                results.append(row)
+                io = row['io_per_call'] or {}
+                print(f"{backend:<8} {scale:>7} {row['operation']:<22} {row['cold_ms']:>9.2f} "
+                      f"{row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['peak_alloc_kb']:>9.1f} "
+                      f"{row['rss_kb'] / 1024:>7.1f} {io.get('rchar', 0):>12.0f} {io.get('wchar', 0):>13.0f}")
+
+    output = {
+        'commit': git_commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'iterations': args.iterations,
+        'papers_per_topic': args.papers_per_topic,
+        'corpora': corpora,
+        'results': results,
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(output, output_file, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
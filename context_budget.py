@@ -0,0 +1,192 @@
+import json
+from typing import Dict, List, Optional
+
+# Rough size of a token for English text and JSON; close enough for budgeting
+CHARS_PER_TOKEN = 4
+# History size (estimated tokens) above which old tool results are compacted
+CONTEXT_TOKEN_BUDGET = 12000
+# Tool results of the most recent rounds are never compacted
+KEEP_RECENT_ROUNDS = 1
+# Target size of a summarized tool result
+SUMMARY_TOKENS = 200
+
+SUMMARY_NOTE = "[Tool result summarized to save context; call the tool again for full details]"
+ELIDED_NOTE = "[Earlier tool result removed to save context; call the tool again if it is needed]"
+
+
+def _text_of(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return "\n".join(_text_of(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, default=str)
+    if hasattr(value, "model_dump"):
+        return json.dumps(value.model_dump(exclude_none=True), default=str)
+    return str(value)
+
+
+def estimate_tokens(value) -> int:
+    """Approximate token count of a string, message, content block or list of them."""
+    return (len(_text_of(value)) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def result_text(content) -> str:
+    """Plain text of tool result content: a string or a list of MCP content items."""
+    if isinstance(content, str):
+        return content
+    return "\n".join(item.text if hasattr(item, "text") else _text_of(item) for item in content)
+
+
+def _label(item) -> str:
+    if isinstance(item, dict):
+        for key in ("title", "name", "paper_id", "id"):
+            if item.get(key):
+                return str(item[key])
+        return ", ".join(item)
+    return str(item)
+
+
+def summarize_tool_result(text: str, max_tokens: int = SUMMARY_TOKENS) -> str:
+    """
+    Shrink a tool result to about max_tokens.
+
+    JSON results keep their shape: lists are reduced to item labels (title,
+    name or ID) and objects to their keys with shortened values. Anything
+    else keeps its beginning.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    try:
+        data = json.loads(text)
+    except (ValueError, TypeError):
+        data = None
+
+    if isinstance(data, list) and data:
+        lines = [f"JSON list of {len(data)} items:"]
+        lines += [f"- {_label(item)[:80]}" for item in data]
+    elif isinstance(data, dict) and data:
+        lines = ["JSON object:"]
+        lines += [f"- {key}: {_text_of(value)[:80]}" for key, value in data.items()]
+    else:
+        lines = text.splitlines() or [text]
+
+    summary = []
+    used = 0
+    for line in lines:
+        if used + len(line) > max_chars:
+            summary.append(f"[... {len(text) - used} more characters omitted]")
+            break
+        summary.append(line)
+        used += len(line) + 1
+    return SUMMARY_NOTE + "\n" + "\n".join(summary)
+
+
+class ContextBudget:
+    """
+    Keeps a conversation under a token budget by compacting old tool results.
+
+    Works on both message formats used by the chatbot: Anthropic tool_result
+    blocks inside user messages and Ollama "tool" role messages. Only tool
+    results are touched, so tool_use / tool_result pairs stay intact. When the
+    history is over budget, results older than the last keep_recent rounds
+    are summarized oldest first, then replaced by a short note, and as a last
+    resort the recent ones are cut down to what is left of the budget.
+    Compaction is never undone, so the history prefix stays identical between
+    rounds and remains cacheable.
+
+    Use one instance per query; it remembers the original size of every
+    result it compacted, so saved() can report what the whole history saves
+    while compact() reports only what each call compacted.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, keep_recent: int = KEEP_RECENT_ROUNDS,
+                 summary_tokens: int = SUMMARY_TOKENS):
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.summary_tokens = summary_tokens
+        # id(holder) -> tokens of the result before it was compacted
+        self._original: Dict[int, int] = {}
+
+    @staticmethod
+    def _rounds(messages: List[dict]) -> List[List[dict]]:
+        """Tool result holders (dicts with a "content" key), grouped by tool round."""
+        rounds = []
+        current = None
+        for message in messages:
+            if message.get("role") == "tool":
+                holders = [message]
+            elif message.get("role") == "user" and isinstance(message.get("content"), list):
+                holders = [block for block in message["content"]
+                           if isinstance(block, dict) and block.get("type") == "tool_result"]
+            else:
+                current = None
+                continue
+            if current is None:
+                current = []
+                rounds.append(current)
+            current.extend(holders)
+        return rounds
+
+    def _shrink(self, holder: dict, text: str) -> int:
+        """Replace a result's content with text if that is smaller; returns the tokens saved."""
+        before = estimate_tokens(holder["content"])
+        saved = before - estimate_tokens(text)
+        if saved <= 0:
+            return 0
+        self._original.setdefault(id(holder), before)
+        holder["content"] = text
+        return saved
+
+    def compact(self, messages: List[dict], overhead: int = 0) -> int:
+        """
+        Compact tool results in place until messages fit the budget.
+
+        Args:
+            messages: Conversation history, modified in place
+            overhead: Tokens of the fixed prompt parts (system prompt, tools)
+
+        Returns:
+            Estimated tokens compacted away by this call, 0 if nothing changed;
+            saved() gives what the whole history saves
+        """
+        total = estimate_tokens(messages) + overhead
+        before = total
+        rounds = self._rounds(messages)
+        split = max(0, len(rounds) - self.keep_recent)
+        old = [holder for round_ in rounds[:split] for holder in round_]
+        recent = [holder for round_ in rounds[split:] for holder in round_]
+
+        for holder in old:
+            if total <= self.budget:
+                break
+            text = result_text(holder["content"])
+            if not text.startswith((SUMMARY_NOTE, ELIDED_NOTE)):
+                total -= self._shrink(holder, summarize_tool_result(text, self.summary_tokens))
+        for holder in old:
+            if total <= self.budget:
+                break
+            if not result_text(holder["content"]).startswith(ELIDED_NOTE):
+                total -= self._shrink(holder, ELIDED_NOTE)
+        if total > self.budget and recent:
+            # Last resort: the model has not seen these yet, so give them what is left of the budget
+            recent_tokens = sum(estimate_tokens(holder["content"]) for holder in recent)
+            share = max(self.summary_tokens, (self.budget - (total - recent_tokens)) // len(recent))
+            for holder in recent:
+                text = result_text(holder["content"])
+                if estimate_tokens(text) > share:
+                    total -= self._shrink(holder, summarize_tool_result(text, share))
+        return before - total
+
+    def saved(self, messages: List[dict]) -> int:
+        """Estimated tokens the compacted results in messages no longer cost."""
+        return sum(
+            self._original[id(holder)] - estimate_tokens(holder["content"])
+            for round_ in self._rounds(messages) for holder in round_
+            if id(holder) in self._original
+        )
+
+
+def fixed_overhead(system: Optional[str], tools: List[dict]) -> int:
+    return estimate_tokens(system) + estimate_tokens(tools)
@@ -0,0 +1,526 @@
+import asyncio
+import collections
+import contextlib
+import copy
+import functools
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only jobs of a single process are coordinated
+    fcntl = None
+
+from ffmpeg_presets import segment_seconds
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# Seconds between polls of the shared state file (new jobs, cancellations, progress writes)
+POLL_INTERVAL = 1.0
+# A worker process that has not written a heartbeat for this long is dead; its running jobs are queued again
+WORKER_TIMEOUT = 30.0
+# Finished, failed and cancelled jobs kept in the state file, most recent first
+MAX_FINISHED_JOBS = 100
+
+
+class FFmpegError(Exception):
+    """An ffmpeg process failed; the message is the tail of its stderr."""
+
+
+def default_max_jobs() -> int:
+    """
+    Jobs run at the same time, derived from the core count.
+
+    A single ffmpeg encode already spreads over several cores, so running one
+    job per core would only make every job slower; a quarter of the cores
+    keeps the machine busy without thrashing.
+    """
+    return max(1, (os.cpu_count() or 2) // 4)
+
+
+async def probe_duration(input_path: str) -> Optional[float]:
+    """Duration of a media file in seconds according to ffprobe, or None if unknown."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "error", "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1", input_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+    except FileNotFoundError:
+        return None
+    stdout, _ = await process.communicate()
+    try:
+        return float(stdout.decode().strip())
+    except ValueError:
+        return None
+
+
+class FFmpegJobManager:
+    """
+    Runs ffmpeg conversions as jobs on a bounded pool of asyncio workers.
+
+    Every job has an ID and a state record (status, percent done, fps, ETA,
+    timings, error). Progress comes from ffmpeg's machine-readable
+    "-progress pipe:1" output; stderr is drained continuously so a chatty
+    ffmpeg can never block on a full pipe.
+
+    The job table lives in state_path, which is the single source of truth
+    for every server process using it (e.g. the RESEARCH_WORKERS uvicorn
+    workers): each access reloads it under an exclusive file lock on a
+    worker thread, so the event loop never waits for the file, and a job
+    is run by whichever process claims it first, so status and cancel calls
+    work from any worker and max_jobs bounds the jobs running across all of
+    them. Running processes write a heartbeat; the jobs of a process that
+    stopped (a crash or a restart) are queued again once its heartbeat is
+    WORKER_TIMEOUT old, and resumed by any process that called start(). Only
+    the MAX_FINISHED_JOBS most recently finished jobs are kept.
+    """
+
+    def __init__(self, work_dir: str, state_path: str, max_jobs: Optional[int] = None):
+        self.work_dir = work_dir
+        self.state_path = state_path
+        self.max_jobs = max_jobs or default_max_jobs()
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        # Jobs this process claimed; their records here are authoritative
+        self._running: Dict[str, dict] = {}
+        self._processes: Dict[str, Set[asyncio.subprocess.Process]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._poller: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        # One state file exchange at a time, so an older snapshot never overwrites a newer one
+        self._state_lock = asyncio.Lock()
+
+    async def _transact(self, change: Optional[Callable[[dict], Any]] = None) -> Tuple[dict, Any]:
+        """
+        Load, update and save the shared state on a thread, without blocking the event loop.
+
+        Args:
+            change: Called with the loaded state (on the thread, under the file
+                lock) to modify it before it is written back
+
+        Returns:
+            (state as written, return value of change)
+        """
+        async with self._state_lock:
+            # The thread gets copies: the running jobs keep changing on the event loop
+            running = copy.deepcopy(self._running)
+            state, result = await asyncio.to_thread(self._exchange, running, change)
+        for job_id, job in self._running.items():
+            stored = state["jobs"].get(job_id)
+            if stored is not None and stored["status"] == CANCELLED and job["status"] == RUNNING:
+                # Cancelled through cancel() here or in another worker process: stop ffmpeg
+                job.update(status=CANCELLED, finished=stored["finished"])
+                for process in self._processes.get(job_id, ()):
+                    process.terminate()
+        return state, result
+
+    def _exchange(self, running: Dict[str, dict], change: Optional[Callable[[dict], Any]]) -> Tuple[dict, Any]:
+        """Blocking part of _transact: one read-merge-write cycle under the file lock."""
+        with contextlib.ExitStack() as stack:
+            if fcntl is not None:
+                lock_file = stack.enter_context(open(f"{self.state_path}.lock", "a"))
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.state_path, "r") as state_file:
+                    text = state_file.read()
+                state = json.loads(text)
+            except FileNotFoundError:
+                text, state = "", {}
+            except json.JSONDecodeError as e:
+                print(f"Error reading {self.state_path}: {str(e)}")
+                text, state = "", {}
+            if "jobs" not in state:
+                # Layout before the state was shared: a plain table of jobs
+                state = {"jobs": state, "workers": {}}
+            self._merge(state, running)
+            result = change(state) if change is not None else None
+            updated = json.dumps(state, indent=2)
+            if updated != text:
+                tmp_path = f"{self.state_path}.{self.worker_id}.tmp"
+                with open(tmp_path, "w") as state_file:
+                    state_file.write(updated)
+                os.replace(tmp_path, self.state_path)
+        return state, result
+
+    def _merge(self, state: dict, running: Dict[str, dict]):
+        """Bring the loaded state up to date with this process (called under the lock)."""
+        jobs, workers = state["jobs"], state["workers"]
+        now = time.time()
+        for job_id, job in running.items():
+            stored = jobs.get(job_id)
+            # A cancellation written by another process wins over the running record
+            if stored is None or stored["status"] != CANCELLED or job["status"] != RUNNING:
+                jobs[job_id] = job
+        if self._poller is not None and now - workers.get(self.worker_id, 0) > WORKER_TIMEOUT / 3:
+            workers[self.worker_id] = now
+        for worker_id, seen in list(workers.items()):
+            if now - seen > WORKER_TIMEOUT:
+                del workers[worker_id]
+        for job in jobs.values():
+            if job["status"] == RUNNING and job.get("owner") not in workers:
+                # Interrupted by a restart: the job owns its output, so start over
+                job.update(status=QUEUED, progress=0.0, fps=None, eta=None, pid=None, owner=None, restarted=True)
+        finished = sorted(
+            (job for job in jobs.values() if job["status"] not in (QUEUED, RUNNING)),
+            key=lambda job: job["finished"] or job["created"],
+            reverse=True
+        )
+        for job in finished[MAX_FINISHED_JOBS:]:
+            del jobs[job["id"]]
+
+    def start(self):
+        """Start claiming and running jobs (needs the running event loop); safe to call repeatedly."""
+        if self._poller is not None:
+            return
+        self._wake = asyncio.Event()
+        self._poller = asyncio.create_task(self._poll())
+
+    def _claim(self, state: dict) -> List[dict]:
+        """Mark the oldest queued jobs as running here, as far as max_jobs allows across all processes."""
+        jobs = state["jobs"]
+        running = sum(1 for job in jobs.values() if job["status"] == RUNNING)
+        queued = sorted((job for job in jobs.values() if job["status"] == QUEUED), key=lambda job: job["created"])
+        claimed = queued[:max(0, self.max_jobs - running)]
+        for job in claimed:
+            job.update(status=RUNNING, owner=self.worker_id, started=time.time())
+        return claimed
+
+    async def _poll(self):
+        while True:
+            self._wake.clear()
+            _, claimed = await self._transact(self._claim)
+            for job in claimed:
+                self._running[job["id"]] = job
+                task = asyncio.create_task(self._execute(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), POLL_INTERVAL)
+
+    async def submit(self, input_path: str, output_path: str, encode_args: List[str],
+                     preset: str = "", segments: Optional[dict] = None) -> dict:
+        """
+        Queue a conversion.
+
+        Args:
+            input_path: Full path of the source file
+            output_path: Full path of the file to create
+            encode_args: ffmpeg output options placed between the input and the output
+            preset: Name of the preset the options came from (for status reports)
+            segments: Encode segment-parallel instead; a dict with "workers",
+                "video_args" and "audio_args" (see _run_segmented)
+
+        Returns:
+            The new job record
+        """
+        job = {
+            "id": uuid.uuid4().hex[:8],
+            "input": input_path,
+            "output": output_path,
+            "encode_args": encode_args,
+            "preset": preset,
+            "segments": segments,
+            "status": QUEUED,
+            "progress": 0.0,
+            "fps": None,
+            "eta": None,
+            "duration": None,
+            "pid": None,
+            "owner": None,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "error": None,
+        }
+        self.start()
+        await self._transact(lambda state: state["jobs"].__setitem__(job["id"], dict(job)))
+        self._wake.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Current record of a job, or None if there is no such job."""
+        state, _ = await self._transact()
+        return state["jobs"].get(job_id)
+
+    async def list_jobs(self) -> List[dict]:
+        """Current records of all jobs (finished ones only up to MAX_FINISHED_JOBS)."""
+        state, _ = await self._transact()
+        return list(state["jobs"].values())
+
+    async def wait(self, job_id: str) -> Optional[dict]:
+        """Wait until a job has finished, failed or been cancelled, and return its record."""
+        while True:
+            job = await self.get(job_id)
+            if job is None or job["status"] not in (QUEUED, RUNNING):
+                return job
+            await asyncio.sleep(POLL_INTERVAL / 4)
+
+    def command(self, job: dict) -> List[str]:
+        return [
+            "ffmpeg", "-hide_banner", "-nostats", "-y",
+            "-progress", "pipe:1",
+            "-i", job["input"],
+            *job["encode_args"],
+            job["output"]
+        ]
+
+    async def _execute(self, job: dict):
+        try:
+            await self._run(job)
+        except Exception as e:
+            job.update(status=FAILED, error=str(e), finished=time.time())
+        finally:
+            # Write the final record before the job stops being this process's to report
+            await self._transact()
+            del self._running[job["id"]]
+            # A pool slot is free
+            self._wake.set()
+
+    async def _run(self, job: dict):
+        job["duration"] = await probe_duration(job["input"])
+        try:
+            if job.get("segments"):
+                await self._run_segmented(job)
+            else:
+                await self._exec(job, self.command(job), functools.partial(self._update_progress, job))
+        except FileNotFoundError:
+            job.update(status=FAILED, error="FFmpeg not found. Please make sure FFmpeg is installed and available in your PATH")
+        except FFmpegError as e:
+            if job["status"] != CANCELLED:
+                job.update(status=FAILED, error=str(e))
+        else:
+            if job["status"] != CANCELLED:
+                job.update(status=DONE, progress=100.0)
+        if job["status"] != CANCELLED:
+            job["finished"] = time.time()
+        elif job["started"]:
+            # cancel() called in another worker process cannot remove the partial output itself
+            with contextlib.suppress(OSError):
+                os.remove(job["output"])
+        job.update(pid=None, eta=None)
+
+    async def _run_segmented(self, job: dict):
+        """
+        Split the video at keyframes, encode the chunks in parallel and join them.
+
+        The video stream is cut with stream copy (so every chunk starts on a
+        keyframe), up to segments["workers"] ffmpeg processes encode the chunks,
+        and the encoded chunks are concatenated without re-encoding while the
+        audio is encoded once from the original, which avoids gaps at the
+        chunk boundaries.
+        """
+        plan = job["segments"]
+        chunk_seconds = segment_seconds(job["duration"], plan["workers"])
+        work_dir = tempfile.mkdtemp(prefix=f".ffmpeg-{job['id']}-", dir=os.path.dirname(job["output"]) or None)
+        try:
+            await self._exec(job, [
+                "ffmpeg", "-hide_banner", "-nostats", "-y",
+                "-i", job["input"],
+                "-map", "0:v:0", "-c", "copy",
+                "-f", "segment", "-segment_time", f"{chunk_seconds:.3f}", "-reset_timestamps", "1",
+                os.path.join(work_dir, "src_%05d.mkv")
+            ])
+            chunks = sorted(name for name in os.listdir(work_dir) if name.startswith("src_"))
+            plan["count"] = len(chunks)
+
+            # Seconds of output written per chunk; their sum drives the job's progress
+            encoded = {}
+            slots = asyncio.Semaphore(plan["workers"])
+
+            def on_chunk_progress(chunk, out_time, fps, speed):
+                encoded[chunk] = out_time or 0.0
+                if job["duration"]:
+                    done = min(sum(encoded.values()), job["duration"])
+                    job["progress"] = round(done / job["duration"] * 100, 1)
+                    elapsed = time.time() - job["started"]
+                    if done:
+                        job["eta"] = round(elapsed * (job["duration"] - done) / done, 1)
+
+            async def encode(chunk):
+                async with slots:
+                    await self._exec(job, [
+                        "ffmpeg", "-hide_banner", "-nostats", "-y",
+                        "-progress", "pipe:1",
+                        "-i", os.path.join(work_dir, chunk),
+                        *plan["video_args"], "-an",
+                        os.path.join(work_dir, "enc_" + chunk[len("src_"):])
+                    ], functools.partial(on_chunk_progress, chunk))
+
+            tasks = [asyncio.create_task(encode(chunk)) for chunk in chunks]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # One failed chunk fails the job; stop the other encoders
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+            list_path = os.path.join(work_dir, "chunks.txt")
+            with open(list_path, "w") as list_file:
+                for chunk in chunks:
+                    list_file.write(f"file 'enc_{chunk[len('src_'):]}'\n")
+            await self._exec(job, [
+                "ffmpeg", "-hide_banner", "-nostats", "-y",
+                "-f", "concat", "-safe", "0", "-i", list_path,
+                "-i", job["input"],
+                "-map", "0:v", "-map", "1:a?",
+                "-c:v", "copy", *plan["audio_args"],
+                job["output"]
+            ])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def _exec(self, job: dict, command: List[str], on_progress: Optional[Callable] = None):
+        """
+        Run one ffmpeg process for a job and wait for it.
+
+        Raises:
+            FFmpegError: ffmpeg failed, or the job was cancelled
+        """
+        if job["status"] == CANCELLED:
+            raise FFmpegError("cancelled")
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=self.work_dir,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        processes = self._processes.setdefault(job["id"], set())
+        processes.add(process)
+        job["pid"] = process.pid
+
+        # Keep only the tail of stderr for error reports, but always keep reading it
+        stderr_tail = collections.deque(maxlen=20)
+        try:
+            await asyncio.gather(
+                self._read_progress(process.stdout, on_progress),
+                self._drain(process.stderr, stderr_tail),
+            )
+            returncode = await process.wait()
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            processes.discard(process)
+            if not processes:
+                self._processes.pop(job["id"], None)
+
+        if returncode != 0:
+            raise FFmpegError("\n".join(stderr_tail) or f"ffmpeg exited with code {returncode}")
+
+    async def _drain(self, stream: asyncio.StreamReader, tail: collections.deque):
+        async for line in stream:
+            tail.append(line.decode(errors="replace").rstrip())
+
+    def _update_progress(self, job: dict, out_time: Optional[float], fps: Optional[float], speed: Optional[float]):
+        if fps is not None:
+            job["fps"] = fps
+        duration = job["duration"]
+        if out_time is not None and duration:
+            job["progress"] = round(min(100.0, out_time / duration * 100), 1)
+            if speed:
+                job["eta"] = round(max(0.0, duration - out_time) / speed, 1)
+
+    async def _read_progress(self, stream: asyncio.StreamReader, on_progress: Optional[Callable]):
+        """Parse ffmpeg's key=value progress blocks and pass (out_time, fps, speed) to on_progress."""
+        block = {}
+        async for raw in stream:
+            key, _, value = raw.decode(errors="replace").strip().partition("=")
+            block[key] = value
+            if key != "progress" or on_progress is None:
+                continue
+            # "progress=continue|end" closes one block
+            out_time_us = block.get("out_time_us") or block.get("out_time_ms")
+            try:
+                # ffmpeg reports slightly negative times while the encoder starts up
+                out_time = max(0.0, int(out_time_us) / 1_000_000)
+            except (TypeError, ValueError):
+                out_time = None
+            try:
+                fps = float(block.get("fps", ""))
+            except ValueError:
+                fps = None
+            try:
+                speed = float(block.get("speed", "").rstrip("x"))
+            except ValueError:
+                speed = None
+            block = {}
+            on_progress(out_time, fps, speed)
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Cancel a queued or running job and remove its partial output.
+
+        A job running in another worker process is marked cancelled in the
+        state file; that process stops ffmpeg and removes the output on its
+        next poll.
+
+        Returns:
+            The job record, or None if there is no such job
+        """
+        self.start()
+
+        def mark_cancelled(state):
+            job = state["jobs"].get(job_id)
+            if job is not None and job["status"] in (QUEUED, RUNNING):
+                job.update(status=CANCELLED, finished=time.time())
+                return True
+            return False
+
+        state, cancelled = await self._transact(mark_cancelled)
+        job = state["jobs"].get(job_id)
+        if not cancelled:
+            return job
+        # _transact terminated ffmpeg if the job runs in this process; wait for it to exit
+        processes = list(self._processes.get(job_id, ()))
+        for process in processes:
+            try:
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        if processes:
+            try:
+                os.remove(job["output"])
+            except OSError:
+                pass
+        return job
+
+    async def active_outputs(self) -> set:
+        return {job["output"] for job in await self.list_jobs() if job["status"] in (QUEUED, RUNNING)}
+
+
+def describe_job(job: dict) -> str:
+    """One-line human readable status of a job."""
+    name = os.path.basename(job["input"])
+    output = os.path.basename(job["output"])
+    line = f"- [{job['id']}] {name} -> {output}"
+    if job.get("preset"):
+        line += f" ({job['preset']}{', segment-parallel' if job.get('segments') else ''})"
+    line += f": {job['status']}"
+    if job["status"] == RUNNING:
+        line += f" {job['progress']:.1f}%"
+        if job["fps"]:
+            line += f", {job['fps']:.0f} fps"
+        if job["eta"] is not None:
+            line += f", ETA {job['eta']:.0f}s"
+    elif job["status"] == DONE and job["started"] and job["finished"]:
+        line += f" in {job['finished'] - job['started']:.1f}s"
+        if job.get("segments"):
+            line += f" ({job['segments'].get('count', '?')} segments on {job['segments']['workers']} encoders)"
+    elif job["status"] == FAILED and job["error"]:
+        line += f"\n    {job['error'].splitlines()[-1]}"
+    return line
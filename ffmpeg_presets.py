@@ -0,0 +1,114 @@
+import functools
+import os
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+# Named encoding presets. "video" is the software encode; presets marked
+# "hardware" switch to a hardware H.264 encoder when ffmpeg offers one.
+PRESETS: Dict[str, dict] = {
+    "fast": {
+        "description": "H.264 veryfast, CRF 23 - quick previews and sharing; hardware encoder when available",
+        "video": ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p"],
+        "audio": ["-c:a", "aac", "-b:a", "128k"],
+        "hardware": True,
+    },
+    "balanced": {
+        "description": "H.264 medium, CRF 20 - good quality at a reasonable size and speed",
+        "video": ["-c:v", "libx264", "-preset", "medium", "-crf", "20", "-pix_fmt", "yuv420p"],
+        "audio": ["-c:a", "aac", "-b:a", "160k"],
+        "hardware": False,
+    },
+    "archival": {
+        "description": "H.265 slow, CRF 18 - near-transparent quality for long-term storage",
+        "video": ["-c:v", "libx265", "-preset", "slow", "-crf", "18", "-tag:v", "hvc1", "-pix_fmt", "yuv420p"],
+        "audio": ["-c:a", "aac", "-b:a", "256k"],
+        "hardware": False,
+    },
+}
+
+DEFAULT_PRESET = "balanced"
+
+# Hardware H.264 encoders in order of preference, with comparable rate control
+HW_ENCODERS: Dict[str, List[str]] = {
+    "h264_videotoolbox": ["-c:v", "h264_videotoolbox", "-q:v", "60"],
+    "h264_nvenc": ["-c:v", "h264_nvenc", "-preset", "p2", "-cq", "23"],
+    "h264_qsv": ["-c:v", "h264_qsv", "-preset", "veryfast", "-global_quality", "23"],
+}
+
+# Segment-parallel mode never cuts chunks shorter than this (seconds)
+MIN_SEGMENT_SECONDS = 10.0
+# Chunk length when the input duration is unknown (seconds)
+DEFAULT_SEGMENT_SECONDS = 30.0
+
+
+@functools.lru_cache(maxsize=1)
+def available_encoders() -> frozenset:
+    """Names of the encoders compiled into the local ffmpeg (blocking, cached)."""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True, text=True, timeout=10
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return frozenset()
+    names = set()
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if len(fields) >= 2 and len(fields[0]) == 6:
+            names.add(fields[1])
+    return frozenset(names)
+
+
+def hardware_encoder() -> Optional[str]:
+    """
+    Preferred hardware H.264 encoder, or None.
+
+    Set FFMPEG_HWACCEL=0 to always encode in software.
+    """
+    if os.environ.get("FFMPEG_HWACCEL", "1") == "0":
+        return None
+    encoders = available_encoders()
+    return next((name for name in HW_ENCODERS if name in encoders), None)
+
+
+def video_args(preset: str, threads: Optional[int] = None) -> List[str]:
+    """
+    ffmpeg video options for a preset.
+
+    Args:
+        preset: One of PRESETS
+        threads: Encoder threads for software encoders (optional, defaults to every core)
+
+    Returns:
+        Options to place between the input and the output
+    """
+    spec = PRESETS[preset]
+    if spec["hardware"]:
+        encoder = hardware_encoder()
+        if encoder:
+            return list(HW_ENCODERS[encoder])
+    return spec["video"] + ["-threads", str(threads or os.cpu_count() or 1)]
+
+
+def audio_args(preset: str) -> List[str]:
+    return list(PRESETS[preset]["audio"])
+
+
+def segment_layout(cores: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Parallel encoders and threads per encoder for segment-parallel mode.
+
+    Encoders scale sublinearly with threads, so several narrow encodes keep
+    more cores busy than one wide one; every chunk still gets two threads
+    on machines with enough cores.
+    """
+    cores = cores or os.cpu_count() or 1
+    workers = max(2, cores // 2)
+    return workers, max(1, cores // workers)
+
+
+def segment_seconds(duration: Optional[float], workers: int) -> float:
+    """Chunk length giving each encoder about two chunks, so uneven chunks balance out."""
+    if not duration:
+        return DEFAULT_SEGMENT_SECONDS
+    return max(MIN_SEGMENT_SECONDS, duration / (workers * 2))
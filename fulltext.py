@@ -0,0 +1,498 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import pypdf
+
+try:
+    import fcntl
+except ImportError:  # Windows: downloads are only coordinated within one process
+    fcntl = None
+
+from metrics import Metrics
+from text_search import Bm25Index, tokenize
+
+# Ingestion states
+QUEUED = "queued"
+DOWNLOADING = "downloading"
+EXTRACTING = "extracting"
+DONE = "done"
+FAILED = "failed"
+
+# Target size of one stored text chunk, in characters
+CHUNK_CHARS = 2000
+# Attempts per download; each retry resumes where the last one stopped
+DOWNLOAD_ATTEMPTS = 4
+DEFAULT_MAX_DOWNLOADS = 4
+# Downloaded bytes collected before they are handed to a thread to be written
+WRITE_BUFFER_BYTES = 256 * 1024
+# Seconds between attempts to take a paper's download lock held by another process
+LOCK_POLL_INTERVAL = 0.5
+
+# Lines that start a section: numbered headings ("3 Method", "2.1. Data",
+# "IV. RESULTS") whose title starts with a capital, so wrapped body lines
+# such as "10 ms and the latency" are not mistaken for one, and the
+# unnumbered headings papers commonly use, in any case
+HEADING_RE = re.compile(
+    r"^(?:(?:\d{1,2}(?:\.\d{1,2})*\.?|[IVX]{1,5}\.)\s+[A-Z][^.!?]{2,70}"
+    r"|(?i:abstract|introduction|related work|background|conclusions?|discussion"
+    r"|references|bibliography|acknowledge?ments?)"
+    r"|(?i:appendix)(?:\s+[A-Z0-9].{0,60})?)$"
+)
+
+
+class FulltextError(Exception):
+    """A paper's PDF could not be downloaded or read."""
+
+
+def is_heading(line: str) -> bool:
+    return len(line) <= 80 and bool(HEADING_RE.match(line))
+
+
+class _ChunkWriter:
+    """
+    Appends extracted text to a file and cuts it into chunks.
+
+    Chunks end at a section heading, or at the first paragraph or sentence
+    end once they reach chunk_chars; each one records its byte offset and
+    length in the file, the page it starts on and the section it belongs to.
+    """
+
+    def __init__(self, text_file, chunk_chars: int):
+        self.file = text_file
+        self.chunk_chars = chunk_chars
+        self.offset = 0
+        self.chunks: List[dict] = []
+        self.sections: List[dict] = []
+        self.section = ""
+        self._lines: List[str] = []
+        self._size = 0
+        self._page = 1
+
+    def add_page(self, page: int, text: str):
+        for line in text.splitlines():
+            line = line.strip()
+            if is_heading(line):
+                self.flush()
+                self.section = line
+                self.sections.append({"title": line, "chunk": len(self.chunks), "page": page})
+            if not self._lines:
+                self._page = page
+            self._lines.append(line)
+            self._size += len(line) + 1
+            if self._size >= self.chunk_chars and (not line or line.endswith(".")) or self._size >= 2 * self.chunk_chars:
+                self.flush()
+
+    def flush(self):
+        if not self._lines:
+            return
+        data = ("\n".join(self._lines) + "\n").encode("utf-8")
+        self.file.write(data)
+        self.chunks.append({"offset": self.offset, "length": len(data), "page": self._page, "section": self.section})
+        self.offset += len(data)
+        self._lines = []
+        self._size = 0
+
+
+class FulltextStore:
+    """
+    Extracted paper text, chunked and indexed by byte offset.
+
+    Every paper gets <directory>/<paper ID>.txt with the plain text and
+    <paper ID>.json with its chunk table (offset, length, page, section) and
+    section outline, so a tool can read a few passages with seek() instead
+    of loading the whole paper. Text files are kept next to the paper
+    records of either storage backend, under papers/fulltext by default.
+    """
+
+    def __init__(self, directory: str, chunk_chars: int = CHUNK_CHARS):
+        self.directory = directory
+        self.chunk_chars = chunk_chars
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, paper_id: str, suffix: str) -> str:
+        # Old-style arXiv IDs contain a slash (e.g. "hep-th/9901001v1")
+        return os.path.join(self.directory, paper_id.replace("/", "_") + suffix)
+
+    def pdf_path(self, paper_id: str) -> str:
+        """Where a PDF is downloaded to; it is deleted once its text is stored."""
+        return self._path(paper_id, ".pdf.part")
+
+    def try_lock(self, paper_id: str):
+        """
+        Take the paper's download lock without waiting.
+
+        Every server process downloading into the same directory uses the
+        same lock file, so only one of them appends to a paper's partial PDF.
+
+        Returns:
+            The open lock file (closing it releases the lock), or None if
+            another process holds the lock
+        """
+        lock_file = open(self._path(paper_id, ".lock"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                return None
+        return lock_file
+
+    def get_index(self, paper_id: str) -> Optional[dict]:
+        """The chunk table of a paper, or None if its text is not stored."""
+        try:
+            with open(self._path(paper_id, ".json"), "r") as index_file:
+                return json.load(index_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def extract(self, paper_id: str, pdf_path: str, url: str = "") -> dict:
+        """
+        Extract the text of a PDF page by page into chunks.
+
+        Only one page's text is held in memory at a time. The chunk table is
+        written last, so a paper counts as stored only once its text is complete.
+
+        Returns:
+            The chunk table
+        """
+        text_path = self._path(paper_id, ".txt")
+        tmp_path = f"{text_path}.{os.getpid()}.tmp"
+        try:
+            with open(pdf_path, "rb") as pdf_file, open(tmp_path, "wb") as text_file:
+                reader = pypdf.PdfReader(pdf_file, strict=False)
+                writer = _ChunkWriter(text_file, self.chunk_chars)
+                for number, page in enumerate(reader.pages, 1):
+                    writer.add_page(number, page.extract_text() or "")
+                writer.flush()
+                pages = len(reader.pages)
+        except Exception as e:
+            # pypdf raises more than PyPdfError on damaged files; none of them may leave the tmp file behind
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise FulltextError(f"Could not read the PDF of {paper_id}: {str(e) or type(e).__name__}") from e
+        os.replace(tmp_path, text_path)
+
+        index = {
+            "paper_id": paper_id,
+            "url": url,
+            "pages": pages,
+            "bytes": writer.offset,
+            "created": time.time(),
+            "chunks": writer.chunks,
+            "sections": writer.sections,
+        }
+        index_path = self._path(paper_id, ".json")
+        with open(f"{index_path}.tmp", "w") as index_file:
+            json.dump(index, index_file)
+        os.replace(f"{index_path}.tmp", index_path)
+        return index
+
+    def read_chunks(self, paper_id: str, chunk_numbers: List[int], index: Optional[dict] = None) -> List[str]:
+        """Text of the given chunks, each read with one seek."""
+        index = index or self.get_index(paper_id)
+        if index is None:
+            return []
+        texts = []
+        with open(self._path(paper_id, ".txt"), "rb") as text_file:
+            for number in chunk_numbers:
+                chunk = index["chunks"][number]
+                text_file.seek(chunk["offset"])
+                texts.append(text_file.read(chunk["length"]).decode("utf-8", errors="replace"))
+        return texts
+
+    def _chunk_index(self, paper_id: str) -> Bm25Index:
+        text_path = self._path(paper_id, ".txt")
+        return _load_chunk_index(text_path, os.stat(text_path).st_mtime_ns)
+
+    def select(self, paper_id: str, query: str = "", section: str = "",
+               max_chars: int = 6000) -> Optional[Tuple[dict, List[Tuple[dict, str]]]]:
+        """
+        Pick the passages of a paper worth returning.
+
+        Args:
+            paper_id: ID of the paper
+            query: Rank chunks against this text with BM25, best first
+            section: Return the chunks of the first section whose title contains this
+            max_chars: Stop adding chunks once this much text is selected
+
+        Returns:
+            (chunk table, [(chunk, text), ...]), or None if the paper's text is not stored
+        """
+        index = self.get_index(paper_id)
+        if index is None:
+            return None
+        chunks = index["chunks"]
+        if query:
+            numbers = [int(number) for number, _ in self._chunk_index(paper_id).search(query, len(chunks))]
+        elif section:
+            wanted = section.lower()
+            starts = [entry["chunk"] for entry in index["sections"]]
+            start = next((entry["chunk"] for entry in index["sections"] if wanted in entry["title"].lower()), None)
+            if start is None:
+                return index, []
+            end = min([chunk for chunk in starts if chunk > start] + [len(chunks)])
+            numbers = list(range(start, end))
+        else:
+            numbers = list(range(len(chunks)))
+
+        selected = []
+        used = 0
+        for number in numbers:
+            if selected and used + chunks[number]["length"] > max_chars:
+                break
+            selected.append(number)
+            used += chunks[number]["length"]
+        return index, list(zip((chunks[number] for number in selected), self.read_chunks(paper_id, selected, index)))
+
+
+@functools.lru_cache(maxsize=32)
+def _load_chunk_index(text_path: str, mtime_ns: int) -> Bm25Index:
+    """BM25 index over the chunks of one text file, rebuilt only when the file changes."""
+    with open(text_path[:-len(".txt")] + ".json", "r") as index_file:
+        chunks = json.load(index_file)["chunks"]
+    index = Bm25Index()
+    with open(text_path, "rb") as text_file:
+        for number, chunk in enumerate(chunks):
+            text_file.seek(chunk["offset"])
+            text = text_file.read(chunk["length"]).decode("utf-8", errors="replace")
+            index.add(str(number), tokenize(chunk["section"]) + tokenize(text))
+    return index
+
+
+class FulltextPipeline:
+    """
+    Downloads paper PDFs on a bounded pool of asyncio workers and stores their text.
+
+    All downloads share one pooled httpx.AsyncClient, so connections to the
+    PDF host are kept alive and reused, and at most max_downloads run at
+    once. Responses are streamed to disk through run_blocking in
+    WRITE_BUFFER_BYTES pieces; an interrupted download keeps its partial
+    file and the next attempt (or the next server run) continues it with an
+    HTTP Range request. A per-paper file lock (see FulltextStore.try_lock)
+    keeps several server processes from writing the same partial file; the
+    one that waited then finds the text already stored. Text extraction
+    runs through run_blocking (a thread by default) so it never stalls the
+    event loop. Requests for a paper that is already queued share its
+    download. Pass any httpx transport as transport to test against a
+    local stand-in instead of arXiv.
+
+    With metrics set, downloads, resumed downloads and downloaded bytes are
+    counted and the download and extract phases are timed.
+    """
+
+    def __init__(
+        self,
+        store: FulltextStore,
+        max_downloads: Optional[int] = None,
+        run_blocking: Optional[Callable] = None,
+        metrics: Optional[Metrics] = None,
+        timeout: float = 60.0,
+        retry_delay: float = 1.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.store = store
+        self.max_downloads = max_downloads or DEFAULT_MAX_DOWNLOADS
+        self.run_blocking = run_blocking or asyncio.to_thread
+        self.metrics = metrics
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.transport = transport
+        # paper ID -> {status, error, bytes, resumed, started, finished}
+        self.status: Dict[str, dict] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def start(self):
+        """Start the workers and the HTTP client (needs the running event loop); safe to call repeatedly."""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=self.max_downloads, max_keepalive_connections=self.max_downloads),
+            follow_redirects=True,
+            transport=self.transport,
+        )
+        # Workers serve every caller, so they must not inherit the context of the one that started them
+        self._workers = [contextvars.Context().run(asyncio.create_task, self._worker())
+                         for _ in range(self.max_downloads)]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+        self._queue = None
+        self._workers = []
+        self._client = None
+
+    def submit(self, paper_id: str, url: str) -> asyncio.Future:
+        """
+        Queue one paper for ingestion unless it is queued already.
+
+        Returns:
+            Future resolving to the paper's chunk table (FulltextError on failure)
+        """
+        self.start()
+        future = self._pending.get(paper_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            # Background submissions may never be awaited; do not warn about their errors
+            future.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._pending[paper_id] = future
+            self.status[paper_id] = {"status": QUEUED, "error": None, "bytes": 0, "resumed": False,
+                                     "started": None, "finished": None}
+            self._queue.put_nowait((paper_id, url))
+        return future
+
+    async def _worker(self):
+        while True:
+            paper_id, url = await self._queue.get()
+            future = self._pending[paper_id]
+            status = self.status[paper_id]
+            try:
+                index = await self._ingest(paper_id, url, status)
+            except Exception as e:
+                status.update(status=FAILED, error=str(e), finished=time.time())
+                if not future.done():
+                    future.set_exception(e if isinstance(e, FulltextError) else FulltextError(str(e)))
+            else:
+                status.update(status=DONE, finished=time.time())
+                if not future.done():
+                    future.set_result(index)
+            finally:
+                del self._pending[paper_id]
+                self._queue.task_done()
+
+    async def _ingest(self, paper_id: str, url: str, status: dict) -> dict:
+        status["started"] = time.time()
+        lock_file = await self._lock(paper_id)
+        try:
+            return await self._ingest_locked(paper_id, url, status)
+        finally:
+            lock_file.close()
+
+    async def _lock(self, paper_id: str):
+        """Wait for the paper's download lock without tying up the loop or a thread."""
+        while True:
+            lock_file = await self.run_blocking(self.store.try_lock, paper_id)
+            if lock_file is not None:
+                return lock_file
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+    async def _ingest_locked(self, paper_id: str, url: str, status: dict) -> dict:
+        # Another process may have stored the text while this one waited for the lock
+        index = await self.run_blocking(self.store.get_index, paper_id)
+        if index is not None:
+            return index
+        if not url:
+            raise FulltextError(f"No PDF URL is stored for paper {paper_id}")
+
+        pdf_path = self.store.pdf_path(paper_id)
+        status["status"] = DOWNLOADING
+        with self._span("download"):
+            await self._download(url, pdf_path, status)
+        status["status"] = EXTRACTING
+        try:
+            with self._span("extract"):
+                index = await self.run_blocking(self.store.extract, paper_id, pdf_path, url)
+        except FulltextError:
+            # The bytes are bad (e.g. an HTML error page served with 200); resuming them would fail
+            # the same way, so the next attempt has to download the file from the start
+            with contextlib.suppress(FileNotFoundError):
+                await self.run_blocking(os.remove, pdf_path)
+            raise
+        await self.run_blocking(os.remove, pdf_path)
+        return index
+
+    async def _download(self, url: str, path: str, status: dict):
+        """Stream url into path, resuming from whatever part of the file is already there."""
+        for attempt in range(DOWNLOAD_ATTEMPTS):
+            offset = await self.run_blocking(_file_size, path)
+            # Range offsets count bytes of the file itself, so ask for it unencoded
+            headers = {"Accept-Encoding": "identity"}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+            status["resumed"] = status["resumed"] or offset > 0
+            try:
+                async with self._client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 416 and offset:
+                        # Nothing left to fetch: the previous attempt got the whole file
+                        return
+                    response.raise_for_status()
+                    # A server that ignores Range sends the whole file again
+                    mode = "ab" if response.status_code == 206 else "wb"
+                    if offset and mode == "ab":
+                        self._count("fulltext_resumed")
+                    if mode == "wb":
+                        status["bytes"] = 0
+                    pdf_file = await self.run_blocking(open, path, mode)
+                    buffer = bytearray()
+                    try:
+                        async for block in response.aiter_bytes():
+                            buffer += block
+                            status["bytes"] += len(block)
+                            self._count("fulltext_bytes", len(block))
+                            if len(buffer) >= WRITE_BUFFER_BYTES:
+                                await self.run_blocking(pdf_file.write, bytes(buffer))
+                                buffer.clear()
+                    finally:
+                        # Keep what arrived before a dropped connection, so the retry resumes after it
+                        await self.run_blocking(_write_and_close, pdf_file, bytes(buffer))
+                self._count("fulltext_downloads")
+                return
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code < 500 or attempt == DOWNLOAD_ATTEMPTS - 1:
+                    raise FulltextError(f"Downloading {url} failed: HTTP {e.response.status_code}") from e
+            except httpx.TransportError as e:
+                if attempt == DOWNLOAD_ATTEMPTS - 1:
+                    raise FulltextError(f"Downloading {url} failed: {str(e) or type(e).__name__}") from e
+            await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    def _count(self, name: str, amount: int = 1):
+        if self.metrics is not None:
+            self.metrics.count(name, amount)
+
+    def _span(self, phase: str):
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.span("fulltext", phase=phase)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_and_close(file, data: bytes):
+    with file:
+        file.write(data)
+
+
+def open_fulltext_pipeline(paper_dir: str, run_blocking: Optional[Callable] = None,
+                           metrics: Optional[Metrics] = None) -> FulltextPipeline:
+    """
+    Pipeline storing text under FULLTEXT_DIR (default <paper_dir>/fulltext).
+
+    FULLTEXT_MAX_DOWNLOADS sets the number of concurrent downloads (default 4).
+    """
+    store = FulltextStore(os.environ.get("FULLTEXT_DIR", os.path.join(paper_dir, "fulltext")))
+    return FulltextPipeline(
+        store,
+        max_downloads=int(os.environ.get("FULLTEXT_MAX_DOWNLOADS", 0)) or None,
+        run_blocking=run_blocking,
+        metrics=metrics,
+    )
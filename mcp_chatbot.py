@@ -1,12 +1,22 @@
 from dotenv import load_dotenv
-from anthropic import Anthropic
-from mcp import ClientSession, StdioServerParameters
+from anthropic import AsyncAnthropic
+from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
 from contextlib import AsyncExitStack
+from collections import OrderedDict
+from pydantic import AnyUrl
+from urllib.parse import quote
 import ollama
+import argparse
 import json
+import os
 import asyncio
+import time
 import nest_asyncio
+from batch_mode import StubOllama, format_summary, load_queries, query_trace, run_batch
+from context_budget import ContextBudget, fixed_overhead, result_text
+from tool_router import ToolRouter
+from metrics import export, format_stats, open_metrics
 
 nest_asyncio.apply()
 
@@ -16,206 +26,626 @@ SYSTEM_PROMPT = """
 You are an AI assistant for Tool Calling.
 
 Before you help a user, you need to work with tools to interact with Our Database
+
+When looking for papers, call search_local first: it searches the papers that are
+already stored and answers instantly. Only fall back to search_papers (arXiv) when
+the local results do not cover the question.
         """
 
+# Seconds to wait for a single tool call before reporting it as failed
+TOOL_CALL_TIMEOUT = 120
+# Maximum number of tool-calling rounds the local model may take for one query
+MAX_TOOL_STEPS = 10
+# Keep the local model (and its prompt cache) loaded between rounds
+OLLAMA_KEEP_ALIVE = "10m"
+# Seconds a server may take to spawn and initialize before it is skipped
+SERVER_START_TIMEOUT = 60
+# Tool/prompt/resource catalogs of previously started servers, keyed by server command
+CATALOG_CACHE_PATH = ".mcp_catalog_cache.json"
+# Resource contents kept locally until the server reports a change
+RESOURCE_CACHE_SIZE = 128
+# Characters of each tool result kept in a query trace
+TRACE_RESULT_CHARS = 500
+
+def _catalog_key(server_config):
+    return json.dumps(
+        {key: server_config.get(key) for key in ("command", "args", "env")},
+        sort_keys=True
+    )
+
+def _read_catalog_cache():
+    try:
+        with open(CATALOG_CACHE_PATH, "r") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def load_cached_catalog(server_config):
+    """Return the cached catalog for a server command, or None if it was never started."""
+    return _read_catalog_cache().get(_catalog_key(server_config))
+
+def save_cached_catalog(server_config, catalog):
+    """Store a server's catalog; the entry is replaced whenever the server reports new contents or version."""
+    cache = _read_catalog_cache()
+    key = _catalog_key(server_config)
+    if cache.get(key) == catalog:
+        return
+    cache[key] = catalog
+    tmp_path = f"{CATALOG_CACHE_PATH}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(cache, file, indent=2)
+    os.replace(tmp_path, CATALOG_CACHE_PATH)
+
 class MCP_ChatBot:
-    def __init__(self):
-        self.exit_stack = AsyncExitStack()
-        self.anthropic = Anthropic()
-        # Tools list required for Anthropic API
+    def __init__(self, stream=True, lazy=False, route_tools=True):
+        self.anthropic = AsyncAnthropic()
+        self.ollama = ollama.AsyncClient()
+        # Print tokens as they arrive and start tool calls as soon as their block is complete
+        self.stream = stream
+        # Only spawn a server when one of its tools, prompts or resources is first used
+        self.lazy = lazy
+        # One entry per model round-trip: backend, time to first token, total latency, tool calls
+        self.turn_metrics = []
+        # Latency histograms of model calls, tool calls and server start-up (see /stats)
+        self.metrics = open_metrics("chatbot")
+        # Tool name -> name of the server providing it
+        self.tool_server = {}
+        # Offer each query only the tools that match it instead of the whole catalog
+        self.route_tools = route_tools
+        self.router = ToolRouter()
+        # Tools in Anthropic format (name, description, input_schema)
         self.available_tools = []
+        # The same tools in Ollama's function format, by name
+        self.ollama_tools = {}
         # Prompts list for quick display 
         self.available_prompts = []
         # Sessions dict maps tool/prompt names or resource URIs to MCP client sessions
         self.sessions = {}
+        # Lazily started servers: tool/prompt names or resource URIs -> server name
+        self.server_of = {}
+        # Config of servers that are advertised from the catalog cache but not started yet
+        self.lazy_servers = {}
+        self._server_locks = {}
+        # One task per running server; it owns the server's transport and session
+        self._server_tasks = []
+        self._shutdown = asyncio.Event()
+        # Tool names -> (system, tools) sent to Anthropic; cleared when the tool catalog changes
+        self._anthropic_requests = {}
+        # Resource URI -> text, least recently used first; entries are dropped on resources/updated
+        self.resource_cache = OrderedDict()
+        # Sessions whose server supports resource subscriptions
+        self._subscribable = set()
+        # Resource URIs (without query string) subscribed to, and those a server refused
+        self._subscribed = set()
+        self._unsubscribable = set()
+        # Resource URI -> number of updates received, to spot one that arrives during a read
+        self._resource_versions = {}
+
+    async def _run_server(self, server_params, ready):
+        """
+        Keep one server connection open until cleanup.
+
+        The stdio transport and the session are entered and exited in this task,
+        which is what their task groups require, so servers can be started
+        concurrently and independently of each other.
+        """
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(stdio_client(server_params))
+                session = await stack.enter_async_context(
+                    ClientSession(read, write, message_handler=self._on_server_message)
+                )
+                init_result = await session.initialize()
+                ready.set_result((session, init_result))
+                await self._shutdown.wait()
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+
+    async def _start_session(self, server_config):
+        server_params = StdioServerParameters(**server_config)
+        ready = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(self._run_server(server_params, ready))
+        self._server_tasks.append(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(ready), SERVER_START_TIMEOUT)
+        except BaseException:
+            task.cancel()
+            raise
+
+    async def _fetch_catalog(self, session, init_result):
+        """List tools, prompts and resources of a connected server concurrently."""
+        capabilities = init_result.capabilities
+
+        async def empty():
+            return None
+
+        tools, prompts, resources = await asyncio.gather(
+            session.list_tools() if capabilities.tools else empty(),
+            session.list_prompts() if capabilities.prompts else empty(),
+            session.list_resources() if capabilities.resources else empty(),
+        )
+        return {
+            "version": init_result.serverInfo.version,
+            "tools": [
+                {
+                    "name": tool.name,
+                    "description": tool.description,
+                    "input_schema": tool.inputSchema
+                }
+                for tool in (tools.tools if tools else [])
+            ],
+            "prompts": [
+                {
+                    "name": prompt.name,
+                    "description": prompt.description,
+                    "arguments": [argument.model_dump() for argument in prompt.arguments or []]
+                }
+                for prompt in (prompts.prompts if prompts else [])
+            ],
+            "resources": [str(resource.uri) for resource in (resources.resources if resources else [])],
+        }
+
+    def _register(self, catalog, session=None, server_name=None):
+        """
+        Advertise a server's catalog.
+
+        With a session the names are routed to it directly; without one they are
+        remembered as belonging to server_name, which is started on first use.
+        """
+        known_tools = {tool['name'] for tool in self.available_tools}
+        known_prompts = {prompt['name'] for prompt in self.available_prompts}
+        for tool in catalog["tools"]:
+            if tool["name"] not in known_tools:
+                self._anthropic_requests.clear()
+                self.available_tools.append({
+                    "name": tool["name"],
+                    "description": tool["description"],
+                    "input_schema": tool["input_schema"]
+                })
+                # local tools interface
+                self.ollama_tools[tool["name"]] = {
+                    'type': 'function',
+                    'function': {
+                        "name": tool["name"],
+                        "description": tool["description"],
+                        'parameters': tool["input_schema"]
+                    }
+                }
+                self.router.add(tool["name"], tool["description"], tool["input_schema"])
+        for prompt in catalog["prompts"]:
+            if prompt["name"] not in known_prompts:
+                self.available_prompts.append(prompt)
+        for tool in catalog["tools"]:
+            self.tool_server.setdefault(tool["name"], server_name)
+        names = [tool["name"] for tool in catalog["tools"]]
+        names += [prompt["name"] for prompt in catalog["prompts"]]
+        names += catalog["resources"]
+        for name in names:
+            if session is not None:
+                self.sessions[name] = session
+                self.server_of.pop(name, None)
+            else:
+                self.server_of[name] = server_name
 
     async def connect_to_server(self, server_name, server_config):
         try:
-            server_params = StdioServerParameters(**server_config)
-            stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
-            read, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(
-                ClientSession(read, write)
-            )
-            await session.initialize()
-            
-            
-            try:
-                # List available tools
-                response = await session.list_tools()
-                for tool in response.tools:
-                    self.sessions[tool.name] = session
-                    self.available_tools.append({
-                        "name": tool.name,
-                        "description": tool.description,
-                        "input_schema": tool.inputSchema,
-                        # local tools interface
-                        'type': 'function',
-                        'function': {
-                            "name": tool.name,
-                            "description": tool.description,
-                            'parameters': tool.inputSchema
-                        },
-                    })
-            
-                # List available prompts
-                prompts_response = await session.list_prompts()
-                if prompts_response and prompts_response.prompts:
-                    for prompt in prompts_response.prompts:
-                        self.sessions[prompt.name] = session
-                        self.available_prompts.append({
-                            "name": prompt.name,
-                            "description": prompt.description,
-                            "arguments": prompt.arguments
-                        })
-                # List available resources
-                resources_response = await session.list_resources()
-                if resources_response and resources_response.resources:
-                    for resource in resources_response.resources:
-                        resource_uri = str(resource.uri)
-                        self.sessions[resource_uri] = session
-            
-            except Exception as e:
-                print(f"Error {e}")
-                
+            with self.metrics.span("server_start", server=server_name):
+                session, init_result = await self._start_session(server_config)
+                catalog = await self._fetch_catalog(session, init_result)
+            resources = init_result.capabilities.resources
+            if resources is not None and resources.subscribe:
+                self._subscribable.add(session)
+            self._register(catalog, session=session, server_name=server_name)
+            save_cached_catalog(server_config, catalog)
         except Exception as e:
-            print(f"Error connecting to {server_name}: {e}")
+            print(f"Error connecting to {server_name}: {e!r}")
 
     async def connect_to_servers(self):
         try:
             with open("server_config.json", "r") as file:
                 data = json.load(file)
             servers = data.get("mcpServers", {})
-            for server_name, server_config in servers.items():
-                await self.connect_to_server(server_name, server_config)
         except Exception as e:
             print(f"Error loading server config: {e}")
             raise
+
+        eager = {}
+        for server_name, server_config in servers.items():
+            catalog = load_cached_catalog(server_config) if self.lazy else None
+            if catalog is None:
+                eager[server_name] = server_config
+            else:
+                # Advertise the cached catalog now, spawn the server on first use
+                self.lazy_servers[server_name] = server_config
+                self._register(catalog, server_name=server_name)
+
+        # Servers start concurrently; a slow or failing one does not hold up the rest
+        await asyncio.gather(*(
+            self.connect_to_server(server_name, server_config)
+            for server_name, server_config in eager.items()
+        ))
+
+    async def get_session(self, name):
+        """Return the session serving a tool, prompt or resource, starting a lazy server if needed."""
+        session = self.sessions.get(name)
+        if session is not None:
+            return session
+        server_name = self.server_of.get(name)
+        if server_name is None:
+            return None
+        lock = self._server_locks.setdefault(server_name, asyncio.Lock())
+        async with lock:
+            server_config = self.lazy_servers.pop(server_name, None)
+            if server_config is not None:
+                print(f"Starting server '{server_name}'...")
+                await self.connect_to_server(server_name, server_config)
+        return self.sessions.get(name)
+
+    async def call_tool(self, tool_name, arguments, timeout=TOOL_CALL_TIMEOUT):
+        """
+        Call a tool on the server that provides it.
+        
+        Returns:
+            (content, is_error) tuple; unknown tools, timeouts and failures are
+            reported as error content instead of raised, so one failing call does
+            not abort the other calls of the same turn.
+        """
+        started = time.perf_counter()
+        content, is_error = await self._call_tool(tool_name, arguments, timeout)
+        trace = query_trace.get()
+        if trace is not None:
+            text = result_text(content)
+            trace['tool_calls'].append({
+                'tool': tool_name,
+                'arguments': arguments,
+                'seconds': time.perf_counter() - started,
+                'is_error': is_error,
+                'result_chars': len(text),
+                'result': text[:TRACE_RESULT_CHARS]
+            })
+        return content, is_error
+    
+    async def _call_tool(self, tool_name, arguments, timeout):
+        session = await self.get_session(tool_name)
+        if not session:
+            print(f"Tool '{tool_name}' not found.")
+            return f"Tool '{tool_name}' not found.", True
+        
+        labels = {'tool': tool_name, 'server': self.tool_server.get(tool_name, '?')}
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                session.call_tool(tool_name, arguments=arguments), timeout
+            )
+        except asyncio.TimeoutError:
+            self.metrics.observe('tool_call', time.perf_counter() - started, True, **labels)
+            print(f"Tool '{tool_name}' timed out after {timeout}s.")
+            return f"Tool '{tool_name}' timed out after {timeout} seconds.", True
+        except Exception as e:
+            self.metrics.observe('tool_call', time.perf_counter() - started, True, **labels)
+            print(f"Error calling tool '{tool_name}': {e}")
+            return f"Error calling tool '{tool_name}': {e}", True
+        self.metrics.observe('tool_call', time.perf_counter() - started, bool(result.isError), **labels)
+        return result.content, bool(result.isError)
+    
+    def record_turn(self, backend, started, first_token, tool_calls, input_tokens=None, tokens_saved=0,
+                    cache_read_tokens=None, cache_creation_tokens=None, tools_offered=None, tokens_compacted=0):
+        """Remember the latency and input size of one model round-trip."""
+        finished = time.perf_counter()
+        self.metrics.observe('llm', finished - started, backend=backend)
+        self.metrics.observe('llm_first_token', (first_token or finished) - started, backend=backend)
+        if tokens_compacted:
+            # Compaction shortened the history before this turn; /stats shows the running totals
+            self.metrics.count('compactions', backend=backend)
+            self.metrics.count('tokens_saved', tokens_compacted, backend=backend)
+        turn = {
+            'backend': backend,
+            'ttft': (first_token or finished) - started,
+            'total': finished - started,
+            'tool_calls': tool_calls,
+            # Input tokens reported by the backend, and the estimated tokens compaction kept out of them
+            'input_tokens': input_tokens,
+            'tokens_saved': tokens_saved,
+            # Prompt cache hits and writes (Anthropic only); input_tokens excludes both
+            'cache_read_tokens': cache_read_tokens,
+            'cache_creation_tokens': cache_creation_tokens,
+            # Size of the routed tool subset sent with the request
+            'tools_offered': tools_offered
+        }
+        self.turn_metrics.append(turn)
+        trace = query_trace.get()
+        if trace is not None:
+            trace['turns'].append(turn)
+    
+    def select_tools(self, query, offered=None):
+        """
+        Names of the tools to offer for a query (all of them when routing is off).
+        
+        Called again after every tool round with that round's text and the
+        tools offered so far: those stay on offer, since the model may still
+        need them, and whatever the new text matches is added.
+        """
+        names = [tool['name'] for tool in self.available_tools]
+        if not self.route_tools:
+            return names
+        if offered is None:
+            return self.router.select(query, names)
+        selected = self.router.select(query, names, default=offered)
+        return offered + [name for name in selected if name not in offered]
+    
+    def anthropic_request(self, tool_names):
+        """
+        System prompt and tools for the Anthropic API.
+        
+        Both are identical on every call with the same tools, so they end with
+        a cache breakpoint and are served from Anthropic's prompt cache after
+        the first request. Tools are sorted by name: servers connect
+        concurrently, and the order in which they finish must not change the
+        cached prefix.
+        """
+        key = tuple(sorted(tool_names))
+        request = self._anthropic_requests.get(key)
+        if request is None:
+            by_name = {tool['name']: tool for tool in self.available_tools}
+            system = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+            tools = [by_name[name] for name in key]
+            if tools:
+                tools[-1] = {**tools[-1], "cache_control": {"type": "ephemeral"}}
+            request = self._anthropic_requests[key] = (system, tools)
+        return request
     
     async def process_query(self, query):
-        messages = [{'role':'user', 'content':query}]
+        """Answer a query with Claude, calling tools until it stops; returns the final answer text."""
+        messages = [{'role':'user', 'content':[{'type': 'text', 'text': query}]}]
+        # Old tool results are compacted once the history outgrows the token budget
+        context = ContextBudget()
+        offered = self.select_tools(query)
+        system, tools = self.anthropic_request(offered)
+        overhead = fixed_overhead(SYSTEM_PROMPT, tools)
         
         while True:
-            response = self.anthropic.messages.create(
-                max_tokens = 2024,
-                model = 'claude-3-7-sonnet-20250219', 
-                tools = self.available_tools,
-                messages = messages
-            )
+            tokens_compacted = context.compact(messages, overhead)
+            tokens_saved = context.saved(messages)
+            mark_cache_breakpoints(messages)
+            started = time.perf_counter()
+            first_token = None
+            # (tool_use block, task running the call) in the order the model emitted them
+            pending = []
             
-            assistant_content = []
-            has_tool_use = False
+            try:
+                if self.stream:
+                    async with self.anthropic.messages.stream(
+                        max_tokens = 2024,
+                        model = 'claude-3-7-sonnet-20250219', 
+                        system = system,
+                        tools = tools,
+                        messages = messages
+                    ) as stream:
+                        async for event in stream:
+                            if first_token is None and event.type in ('text', 'input_json'):
+                                first_token = time.perf_counter()
+                            if event.type == 'text':
+                                print(event.text, end='', flush=True)
+                            elif event.type == 'content_block_stop' and event.content_block.type == 'tool_use':
+                                # The tool input is complete, start the call while the model keeps streaming
+                                block = event.content_block
+                                pending.append((block, asyncio.create_task(self.call_tool(block.name, block.input))))
+                        response = await stream.get_final_message()
+                    print()
+                else:
+                    response = await self.anthropic.messages.create(
+                        max_tokens = 2024,
+                        model = 'claude-3-7-sonnet-20250219', 
+                        system = system,
+                        tools = tools,
+                        messages = messages
+                    )
+                    first_token = time.perf_counter()
+                    for content in response.content:
+                        if content.type == 'text':
+                            print(content.text)
+                        elif content.type == 'tool_use':
+                            pending.append((content, asyncio.create_task(self.call_tool(content.name, content.input))))
+            except BaseException:
+                for _, task in pending:
+                    task.cancel()
+                raise
+            usage = response.usage
+            self.record_turn('anthropic', started, first_token, len(pending),
+                             usage.input_tokens, tokens_saved,
+                             usage.cache_read_input_tokens or 0, usage.cache_creation_input_tokens or 0,
+                             len(tools), tokens_compacted)
+            print(f"[tokens: {usage.input_tokens} uncached, {usage.cache_read_input_tokens or 0} cache hit, "
+                  f"{usage.cache_creation_input_tokens or 0} cache write, {tokens_saved} saved by compaction]")
             
-            for content in response.content:
-                if content.type == 'text':
-                    print(content.text)
-                    assistant_content.append(content)
-                elif content.type == 'tool_use':
-                    has_tool_use = True
-                    assistant_content.append(content)
-                    messages.append({'role':'assistant', 'content':assistant_content})
-                    
-                    # Get session and call tool
-                    session = self.sessions.get(content.name)
-                    if not session:
-                        print(f"Tool '{content.name}' not found.")
-                        break
-                        
-                    result = await session.call_tool(content.name, arguments=content.input)
-                    messages.append({
-                        "role": "user", 
-                        "content": [
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": content.id,
-                                "content": result.content
-                            }
-                        ]
-                    })
+            # One assistant message per turn, holding every block the model produced
+            messages.append({'role':'assistant', 'content':response.content})
             
             # Exit loop if no tool was used
-            if not has_tool_use:
-                break
+            if not pending:
+                return "".join(block.text for block in response.content if block.type == 'text')
+            
+            # Tool calls of this turn run concurrently; results keep the request order
+            results = await asyncio.gather(*(task for _, task in pending))
+            messages.append({
+                "role": "user", 
+                "content": [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": tool_use.id,
+                        "content": content,
+                        "is_error": is_error
+                    }
+                    for (tool_use, _), (content, is_error) in zip(pending, results)
+                ]
+            })
+            
+            # The results may call for a tool the query itself did not match
+            round_text = "\n".join([block.text for block in response.content if block.type == 'text']
+                                   + [result_text(content) for content, _ in results])
+            offered = self.select_tools(round_text, offered)
+            system, tools = self.anthropic_request(offered)
+            overhead = fixed_overhead(SYSTEM_PROMPT, tools)
     
     async def process_query_local(self, query):
+        """Answer a query with the local Ollama model, calling tools until it stops; returns the final answer text."""
         messages = [{'role': 'user', 'content': query}]
-
-        # print("------------available_tools - START-----------")
-        # print(self.available_tools)
-        # print("-------------available_tools - END------------")
+        steps = 0
+        # The local model has a small context window; keep the history within budget
+        context = ContextBudget()
+        offered = self.select_tools(query)
+        tools = [self.ollama_tools[name] for name in offered]
+        overhead = fixed_overhead(None, tools)
 
         while True:
-            response = ollama.chat(
+            tokens_compacted = context.compact(messages, overhead)
+            tokens_saved = context.saved(messages)
+            started = time.perf_counter()
+            input_tokens = None
+            first_token = None
+            content = ""
+            tool_calls = []
+            # Tasks for tool calls, started as soon as a chunk announces them
+            pending = []
+
+            chunks = await self.ollama.chat(
                 model = 'ai-assistant-tool-calling',
                 messages = messages,
-                tools = self.available_tools,
-                # tools=[],
-                stream = False
+                tools = tools,
+                stream = self.stream,
+                keep_alive = OLLAMA_KEEP_ALIVE
             )
-            # If using requests.post, do: response = response.json()
+            if not self.stream:
+                chunks = [chunks]
+
+            try:
+                async for chunk in _iterate(chunks):
+                    msg = chunk.get("message", {})
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    text = msg.get("content", "")
+                    if text:
+                        content += text
+                        print(text, end='', flush=True)
+                    if chunk.get("done"):
+                        input_tokens = chunk.get("prompt_eval_count")
+                    for tool_call in msg.get("tool_calls") or []:
+                        fn = tool_call.get("function", {})
+                        tool_calls.append(tool_call)
+                        pending.append(asyncio.create_task(
+                            self.call_tool(fn.get("name"), fn.get("arguments", {}))
+                        ))
+            except BaseException:
+                for task in pending:
+                    task.cancel()
+                raise
+            if content:
+                print()
+            self.record_turn('ollama', started, first_token, len(pending), input_tokens, tokens_saved,
+                             tools_offered=len(tools), tokens_compacted=tokens_compacted)
 
-            msg = response.get("message", {})
-            tool_calls = msg.get("tool_calls", [])
-            content = msg.get("content", "")
+            # Append-only history: every round shares the previous prompt as its
+            # prefix, so Ollama can reuse the cached context of the loaded model
+            messages.append({'role': 'assistant', 'content': content, 'tool_calls': tool_calls})
 
-            # print("------------response - START-----------")
-            # print(response.message)
-            # print("-------------response - END------------")
+            # Exit loop if no tool was called
+            if not tool_calls:
+                return content
 
-            if content:
-                print(content)
-
-            if tool_calls:
-                for tool_call in tool_calls:
-                    fn = tool_call.get("function", {})
-                    tool_name = fn.get("name")
-                    arguments = fn.get("arguments", {})
-                    session = self.sessions.get(tool_name)
-                    if not session:
-                        print(f"Tool '{tool_name}' not found.")
-                        continue
-
-                    # print("------------arguments - START-----------")
-                    # print(arguments)
-                    # print("-------------arguments - END------------")
-                    # print("------------tool_name - START-----------")
-                    # print(tool_name)
-                    # print("-------------tool_name - END------------")
-                    # print("------------call_tool - START-----------")
-                    result = await session.call_tool(tool_name, arguments=arguments)
-                    # print("-------------call_tool - END------------")
-                    # print("------------result - START-----------")
-                    # print(result.content[0].text)
-                    # print("-------------result - END------------")
-                    # # Add tool result to messages for next round
-                    # messages.append({
-                    #     "role": "user",
-                    #     "content": [
-                    #         {
-                    #             "type": "tool_result",
-                    #             "tool_use_id": tool_call.get("id", tool_name),
-                    #             "content": result.content[0].text
-                    #         }
-                    #     ]
-                    # })
-                    # print("------------messages - START-----------")
-                    # print(messages)
-                    # print("-------------messages - END------------")
-
-                    # print("------------messages - START-----------")
-                    print(result.content[0].text)
-            break
+            steps += 1
+            results = await asyncio.gather(*pending)
+            round_texts = [content]
+            for tool_call, (result, is_error) in zip(tool_calls, results):
+                fn = tool_call.get("function", {})
+                if is_error:
+                    text = result
+                else:
+                    text = "\n".join(item.text if hasattr(item, 'text') else str(item) for item in result)
+                round_texts.append(text)
+                # Add tool result to messages for next round
+                messages.append({
+                    'role': 'tool',
+                    'content': text,
+                    'tool_name': fn.get("name")
+                })
+
+            if steps >= MAX_TOOL_STEPS:
+                print(f"Stopped after {MAX_TOOL_STEPS} tool rounds without a final answer.")
+                return content
+
+            # The results may call for a tool the query itself did not match
+            offered = self.select_tools("\n".join(round_texts), offered)
+            tools = [self.ollama_tools[name] for name in offered]
+            overhead = fixed_overhead(None, tools)
+
+    async def _on_server_message(self, message):
+        """Drop cached resources the server reports as changed."""
+        if not isinstance(message, types.ServerNotification):
+            return
+        if isinstance(message.root, types.ResourceUpdatedNotification):
+            self.invalidate_resource(str(message.root.params.uri))
+        elif isinstance(message.root, types.ResourceListChangedNotification):
+            self.resource_cache.clear()
+
+    def invalidate_resource(self, uri):
+        """Forget every cached page of a resource (all query strings of the URI)."""
+        base = uri.partition("?")[0]
+        self._resource_versions[base] = self._resource_versions.get(base, 0) + 1
+        for cached_uri in [cached_uri for cached_uri in self.resource_cache if cached_uri.partition("?")[0] == base]:
+            del self.resource_cache[cached_uri]
+
+    async def _subscribe(self, session, uri):
+        """Subscribe to updates of uri once; returns whether the server will report its changes."""
+        if uri in self._subscribed:
+            return True
+        if session not in self._subscribable or uri in self._unsubscribable:
+            return False
+        try:
+            await session.subscribe_resource(AnyUrl(uri))
+        except Exception:
+            self._unsubscribable.add(uri)
+            return False
+        self._subscribed.add(uri)
+        return True
+
+    async def read_resource(self, session, resource_uri):
+        """
+        Text of a resource, from the local cache while the server has not reported a change.
+
+        Only resources the server accepted a subscription for are cached, so
+        every cached entry is dropped by the server's next resources/updated
+        notification for it.
+        """
+        cached = self.resource_cache.get(resource_uri)
+        if cached is not None:
+            self.resource_cache.move_to_end(resource_uri)
+            self.metrics.count("resource_cache", result="hit")
+            return cached
+        
+        base = resource_uri.partition("?")[0]
+        cacheable = await self._subscribe(session, base)
+        version = self._resource_versions.get(base, 0)
+        result = await session.read_resource(uri=resource_uri)
+        text = result.contents[0].text if result and result.contents else None
+        self.metrics.count("resource_cache", result="miss" if cacheable else "uncached")
+        # An update that arrived while reading may already be reflected, or may not
+        if cacheable and text is not None and self._resource_versions.get(base, 0) == version:
+            self.resource_cache[resource_uri] = text
+            if len(self.resource_cache) > RESOURCE_CACHE_SIZE:
+                self.resource_cache.popitem(last=False)
+        return text
 
     async def get_resource(self, resource_uri):
-        session = self.sessions.get(resource_uri)
+        session = await self.get_session(resource_uri)
         
         # Fallback for papers URIs - try any papers resource session
         if not session and resource_uri.startswith("papers://"):
-            for uri, sess in self.sessions.items():
+            for uri in list(self.sessions) + list(self.server_of):
                 if uri.startswith("papers://"):
-                    session = sess
+                    session = await self.get_session(uri)
                     break
             
         if not session:
@@ -223,11 +653,11 @@ class MCP_ChatBot:
             return
         
         try:
-            result = await session.read_resource(uri=resource_uri)
-            if result and result.contents:
+            text = await self.read_resource(session, resource_uri)
+            if text is not None:
                 print(f"\nResource: {resource_uri}")
                 print("Content:")
-                print(result.contents[0].text)
+                print(text)
             else:
                 print("No content available.")
         except Exception as e:
@@ -278,7 +708,7 @@ class MCP_ChatBot:
     
     async def execute_prompt(self, prompt_name, args):
         """Execute a prompt with the given arguments."""
-        session = self.sessions.get(prompt_name)
+        session = await self.get_session(prompt_name)
         if not session:
             print(f"Prompt '{prompt_name}' not found.")
             return
@@ -303,6 +733,34 @@ class MCP_ChatBot:
         except Exception as e:
             print(f"Error: {e}")
     
+    async def server_stats(self):
+        """Metric rows of every running server that publishes a stats:// resource."""
+        rows = []
+        for uri, session in list(self.sessions.items()):
+            if not uri.startswith("stats://"):
+                continue
+            try:
+                result = await session.read_resource(uri=uri)
+                rows += json.loads(result.contents[0].text)
+            except Exception as e:
+                print(f"Could not read {uri}: {e}")
+        return rows
+    
+    async def show_stats(self, args):
+        """Print latency statistics of this chatbot and its servers, or export them with /stats export <file>."""
+        rows = self.metrics.snapshot() + await self.server_stats()
+        if args and args[0] == 'export':
+            if len(args) < 2:
+                print("Usage: /stats export <file.jsonl|file.prom>")
+                return
+            export(rows, args[1])
+            print(f"Wrote {len(rows)} metrics to {args[1]}")
+            return
+        if not rows:
+            print("No measurements yet.")
+            return
+        print(format_stats(rows))
+    
     async def show_help(self):
         """Show help information about available commands."""
         help_text = """
@@ -311,7 +769,9 @@ Available Commands:
 
 Resource Commands:
   @folders                    - Show available paper topics/folders
-  @<topic>                   - Search papers in a specific topic
+  @<topic>                   - Show papers in a topic (e.g. @LLM reasoning; suggests close names)
+  @<topic>?page=N&limit=K    - Page through a topic (optional: &fields=title,authors)
+                              Pages are cached until the server reports a change
 
 Prompt Commands:
   /prompts                   - List all available prompts
@@ -321,6 +781,10 @@ Prompt Commands:
 Tool Commands:
   /tools                     - List all available tools with descriptions
 
+Statistics Commands:
+  /stats                     - Latency percentiles of model calls, tool calls and server phases
+  /stats export <file>       - Save them as JSON lines (.jsonl) or OpenMetrics text (other names)
+
 General Commands:
   /help                      - Show this help message
   quit                       - Exit the chatbot
@@ -350,7 +814,9 @@ Regular queries will be processed by Claude with access to all available tools.
                     if topic == "folders":
                         resource_uri = "papers://folders"
                     else:
-                        resource_uri = f"papers://{topic}"
+                        # The server maps the folder name onto a matching stored topic
+                        name, sep, params = topic.partition("?")
+                        resource_uri = f"papers://{quote(name.lower().replace(' ', '_'))}{sep}{params}"
                     await self.get_resource(resource_uri)
                     continue
                 
@@ -365,6 +831,8 @@ Regular queries will be processed by Claude with access to all available tools.
                         await self.list_tools()
                     elif command == '/prompts':
                         await self.list_prompts()
+                    elif command == '/stats':
+                        await self.show_stats(parts[1:])
                     elif command == '/prompt':
                         if len(parts) < 2:
                             print("Usage: /prompt <name> <arg1=value1> <arg2=value2>")
@@ -391,14 +859,70 @@ Regular queries will be processed by Claude with access to all available tools.
                 print(f"\nError: {str(e)}")
     
     async def cleanup(self):
-        await self.exit_stack.aclose()
+        self._shutdown.set()
+        await asyncio.gather(*self._server_tasks, return_exceptions=True)
+
+
+def mark_cache_breakpoints(messages, keep=2):
+    """
+    Put Anthropic cache breakpoints on the last blocks of the newest user messages.
+    
+    With the system prompt and tools that makes four breakpoints, the API
+    maximum. Each round reads the history cached by the previous one and
+    writes the extended prefix for the next; older marks are removed.
+    """
+    user_blocks = [
+        message['content'][-1] for message in messages
+        if message['role'] == 'user' and isinstance(message['content'], list) and message['content']
+    ]
+    for block in user_blocks[:-keep]:
+        block.pop('cache_control', None)
+    for block in user_blocks[-keep:]:
+        block['cache_control'] = {'type': 'ephemeral'}
+
+
+async def _iterate(chunks):
+    """Iterate over a streamed (async) or complete (list) Ollama response alike."""
+    if hasattr(chunks, '__aiter__'):
+        async for chunk in chunks:
+            yield chunk
+    else:
+        for chunk in chunks:
+            yield chunk
 
 
 async def main():
-    chatbot = MCP_ChatBot()
+    parser = argparse.ArgumentParser(description="MCP chatbot")
+    parser.add_argument("--batch", metavar="QUERIES_JSONL",
+                        help="Answer the queries of a JSONL file without prompting, then exit")
+    parser.add_argument("--output", default="batch_results.jsonl",
+                        help="JSONL file for per-query answers, tool traces and timings")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries in flight at once in batch mode")
+    parser.add_argument("--backend", choices=["ollama", "anthropic", "stub"], default="ollama",
+                        help="Model for batch queries; 'stub' answers offline and deterministically")
+    parser.add_argument("--stub-latency", type=float, default=0.0,
+                        help="Seconds the stub backend waits per model call")
+    args = parser.parse_args()
+
+    chatbot = MCP_ChatBot(
+        lazy=os.environ.get("MCP_LAZY_SERVERS", "") == "1",
+        route_tools=os.environ.get("MCP_TOOL_ROUTING", "1") != "0"
+    )
     try:
         await chatbot.connect_to_servers()
-        await chatbot.chat_loop()
+        if not args.batch:
+            await chatbot.chat_loop()
+            return
+        queries = load_queries(args.batch)
+        if args.backend == "stub":
+            chatbot.ollama = StubOllama(args.stub_latency)
+        print(f"Running {len(queries)} queries from {args.batch} with {args.backend} "
+              f"at concurrency {args.concurrency}...")
+        summary = await run_batch(chatbot, queries, args.output, args.concurrency, args.backend)
+        print(format_summary(summary))
+        print(f"Results written to {args.output}")
+        print()
+        print(format_stats(chatbot.metrics.snapshot()))
     finally:
         await chatbot.cleanup()
 
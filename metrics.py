@@ -0,0 +1,213 @@
+import bisect
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds (the last bucket is +Inf)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Recent samples kept per histogram for percentiles
+RESERVOIR_SIZE = 2048
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def percentile(samples: Iterable[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile: the smallest sample with at least pct% of the samples at or below it."""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class Histogram:
+    """Duration histogram with fixed buckets plus a window of recent samples for percentiles."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.errors = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, seconds: float, error: bool = False):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.errors += error
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        return percentile(self.recent, pct)
+
+
+class Metrics:
+    """
+    Thread-safe span timings and event counters.
+
+    span() times a block of code into a histogram keyed by span name and
+    labels (e.g. tool and server); count() increments a counter. snapshot()
+    returns plain rows that format_stats(), to_openmetrics() and to_jsonl()
+    turn into a table, OpenMetrics text or JSON lines. With event_log set,
+    every finished span is also appended to that file as one JSON line for
+    offline analysis.
+    """
+
+    def __init__(self, namespace: str, event_log: Optional[str] = None):
+        self.namespace = namespace
+        self.event_log = event_log
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Tuple[str, Labels]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, seconds: float, error: bool = False, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds, error)
+        if self.event_log:
+            event = {"ts": time.time(), "service": self.namespace, "span": name,
+                     "seconds": round(seconds, 6), "error": error, **labels}
+            with self._lock, open(self.event_log, "a") as log:
+                log.write(json.dumps(event) + "\n")
+
+    @contextlib.contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """Time the enclosed block (including awaits) as one sample of span name."""
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, error, **labels)
+
+    def count(self, name: str, amount: int = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self) -> List[dict]:
+        """One row per histogram and counter, ready for JSON."""
+        rows = []
+        with self._lock:
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                rows.append({
+                    "type": "histogram",
+                    "service": self.namespace,
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "errors": histogram.errors,
+                    "sum": histogram.total,
+                    "min": histogram.min,
+                    "max": histogram.max,
+                    "p50": histogram.percentile(50),
+                    "p95": histogram.percentile(95),
+                    "p99": histogram.percentile(99),
+                    "buckets": histogram.buckets.copy(),
+                })
+            for (name, labels), value in sorted(self._counters.items()):
+                rows.append({"type": "counter", "service": self.namespace, "name": name,
+                             "labels": dict(labels), "value": value})
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+
+def _row_name(row: dict) -> str:
+    labels = ",".join(f"{key}={value}" for key, value in row["labels"].items())
+    return f"{row['service']}.{row['name']}" + (f"[{labels}]" if labels else "")
+
+
+def format_stats(rows: List[dict]) -> str:
+    """Human readable table of snapshot rows: spans with count and latency percentiles, then counters."""
+    histograms = [row for row in rows if row["type"] == "histogram"]
+    width = max([len(_row_name(row)) for row in histograms] + [4])
+    lines = [f"{'span':<{width}} {'count':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+    for row in histograms:
+        lines.append(f"{_row_name(row):<{width}} {row['count']:>6} {row['errors']:>4} {_ms(row['p50']):>9} "
+                     f"{_ms(row['p95']):>9} {_ms(row['p99']):>9} {_ms(row['max']):>9}")
+    counters = [row for row in rows if row["type"] == "counter"]
+    if counters:
+        lines.append("")
+        for row in counters:
+            lines.append(f"{_row_name(row)}: {row['value']}")
+    return "\n".join(lines)
+
+
+def _label_text(labels: dict, extra: str = "") -> str:
+    parts = [f'{key}="{str(value)}"' for key, value in labels.items()]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def to_openmetrics(rows: List[dict]) -> str:
+    """Snapshot rows in OpenMetrics text format (one histogram and one counter family per service)."""
+    lines = []
+    services = sorted({row["service"] for row in rows})
+    for service in services:
+        histograms = [row for row in rows if row["service"] == service and row["type"] == "histogram"]
+        if histograms:
+            family = f"{service}_span_seconds"
+            lines.append(f"# TYPE {family} histogram")
+            lines.append(f"# UNIT {family} seconds")
+            for row in histograms:
+                labels = {"span": row["name"], **row["labels"]}
+                cumulative = 0
+                for bound, bucket in zip(BUCKETS + (float("inf"),), row["buckets"]):
+                    cumulative += bucket
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = _label_text(labels, 'le="' + le + '"')
+                    lines.append(f"{family}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{family}_count{_label_text(labels)} {row['count']}")
+                lines.append(f"{family}_sum{_label_text(labels)} {row['sum']}")
+        counters = [row for row in rows if row["service"] == service and row["type"] == "counter"]
+        if counters:
+            family = f"{service}_events"
+            lines.append(f"# TYPE {family} counter")
+            for row in counters:
+                labels = {"event": row["name"], **row["labels"]}
+                lines.append(f"{family}_total{_label_text(labels)} {row['value']}")
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def to_jsonl(rows: List[dict]) -> str:
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def export(rows: List[dict], path: str):
+    """Write snapshot rows to path: JSON lines for .jsonl, OpenMetrics text otherwise."""
+    text = to_jsonl(rows) if path.endswith(".jsonl") else to_openmetrics(rows)
+    with open(path, "w") as file:
+        file.write(text)
+
+
+def open_metrics(namespace: str) -> Metrics:
+    """Metrics for one service; METRICS_EVENT_LOG names a JSONL file that receives every span."""
+    return Metrics(namespace, os.environ.get("METRICS_EVENT_LOG") or None)
@@ -0,0 +1,641 @@
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process writers are serialized
+    fcntl = None
+
+from text_search import Bm25Index, fts5_query, paper_terms
+
+
+class PaperStore:
+    """
+    Storage backend for paper records grouped by topic.
+
+    A paper record is the dict written by search_papers (title, authors,
+    summary, pdf_url, published). Topics are folder-style names such as
+    "llm_reasoning".
+    """
+
+    def add_papers(self, topic: str, papers_info: Dict[str, dict]):
+        """Merge paper records into a topic, replacing records with the same ID."""
+        raise NotImplementedError
+
+    def add_papers_bulk(self, topic_papers: Dict[str, Dict[str, dict]]):
+        """Merge records into several topics at once ({topic: {paper ID: record}})."""
+        for topic, papers_info in topic_papers.items():
+            self.add_papers(topic, papers_info)
+
+    def delete_topic(self, topic: str):
+        """Remove a topic; papers that belong to no other topic are removed with it."""
+        raise NotImplementedError
+
+    def get_paper(self, paper_id: str) -> Optional[Tuple[str, dict]]:
+        """Return (topic, record) for a paper ID, or None if it is not stored."""
+        raise NotImplementedError
+
+    def get_topic(self, topic: str) -> Optional[Dict[str, dict]]:
+        """Return all records of a topic keyed by paper ID, or None if the topic is unknown."""
+        raise NotImplementedError
+
+    def get_topic_page(self, topic: str, offset: int, limit: int) -> Optional[Tuple[int, Dict[str, dict]]]:
+        """
+        Return one slice of a topic in insertion order.
+
+        Returns:
+            (total number of papers in the topic, records of the slice keyed by
+            paper ID), or None if the topic is unknown
+        """
+        papers_info = self.get_topic(topic)
+        if papers_info is None:
+            return None
+        return len(papers_info), dict(itertools.islice(papers_info.items(), offset, offset + limit))
+
+    def topic_version(self, topic: str) -> Optional[int]:
+        """Opaque value that changes whenever a topic's papers change; None if the topic is unknown."""
+        raise NotImplementedError
+
+    def list_topics(self) -> List[str]:
+        """Return the names of all topics that hold at least one paper."""
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str, dict, float]]:
+        """
+        Full-text search over stored titles, summaries and authors.
+
+        Returns:
+            Up to limit (paper ID, topic, record, score) tuples, best match first
+        """
+        raise NotImplementedError
+
+    def location(self, topic: str) -> str:
+        """Human readable description of where a topic is stored."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# Minimum seconds between directory scans caused by lookups of unknown paper IDs
+REFRESH_INTERVAL = 5.0
+
+
+class PaperIndex:
+    """
+    In-memory index from paper ID to (topic, paper record).
+
+    Each topic's papers_info.json is parsed once and remembered together with
+    its modification time. A lookup that hits the index only stats the owning
+    files; a file is re-parsed only when its mtime has changed. Writes through
+    update() are indexed immediately; topics written by other processes are
+    picked up by a directory scan, which a miss triggers at most once per
+    REFRESH_INTERVAL.
+    """
+
+    def __init__(self, paper_dir: str):
+        self.paper_dir = paper_dir
+        self._lock = threading.RLock()
+        # topic -> (mtime_ns, contents of that topic's papers_info.json)
+        self._files: Dict[str, Tuple[int, Dict[str, dict]]] = {}
+        # paper ID -> every topic holding it, in the order they were indexed
+        self._papers: Dict[str, List[str]] = {}
+        # time.monotonic() of the last directory scan
+        self._last_refresh = 0.0
+        # Full-text index over every paper currently in _papers
+        self.text_index = Bm25Index()
+
+    def file_path(self, topic: str) -> str:
+        return os.path.join(self.paper_dir, topic, "papers_info.json")
+
+    def _mtime(self, topic: str) -> Optional[int]:
+        try:
+            return os.stat(self.file_path(topic)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _drop(self, topic: str):
+        _, papers_info = self._files.pop(topic, (None, {}))
+        for paper_id in papers_info:
+            topics = self._papers.get(paper_id)
+            if topics is None or topic not in topics:
+                continue
+            topics.remove(topic)
+            if not topics:
+                # No other topic holds the paper
+                del self._papers[paper_id]
+                self.text_index.remove(paper_id)
+
+    def _load(self, topic: str, mtime: int, strict: bool = False):
+        file_path = self.file_path(topic)
+        try:
+            with open(file_path, "r") as json_file:
+                papers_info = json.load(json_file)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            self._drop(topic)
+            if strict:
+                raise
+            print(f"Error reading {file_path}: {str(e)}")
+            return
+        self.update(topic, papers_info, mtime)
+
+    def update(self, topic: str, papers_info: Dict[str, dict], mtime: Optional[int] = None):
+        """
+        Replace the indexed contents of one topic.
+
+        Args:
+            topic: Topic folder name
+            papers_info: Full contents of the topic's papers_info.json
+            mtime: Modification time (ns) of the file the contents came from
+        """
+        with self._lock:
+            if mtime is None:
+                mtime = self._mtime(topic)
+            self._drop(topic)
+            self._files[topic] = (mtime, papers_info)
+            for paper_id, paper_info in papers_info.items():
+                self._papers.setdefault(paper_id, []).append(topic)
+                self.text_index.add(paper_id, paper_terms(paper_info))
+
+    def remove(self, topic: str):
+        with self._lock:
+            self._drop(topic)
+
+    def refresh(self):
+        """Re-parse only the topic files that were added, changed or removed."""
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            seen = set()
+            if os.path.isdir(self.paper_dir):
+                with os.scandir(self.paper_dir) as entries:
+                    for entry in entries:
+                        if not entry.is_dir():
+                            continue
+                        mtime = self._mtime(entry.name)
+                        if mtime is None:
+                            continue
+                        seen.add(entry.name)
+                        cached = self._files.get(entry.name)
+                        if cached is None or cached[0] != mtime:
+                            self._load(entry.name, mtime)
+            for topic in list(self._files):
+                if topic not in seen:
+                    self._drop(topic)
+
+    def topic(self, topic: str) -> Optional[Dict[str, dict]]:
+        """
+        Return the contents of one topic file, re-reading it only if it changed.
+
+        Raises json.JSONDecodeError if the file exists but is corrupted.
+        """
+        with self._lock:
+            mtime = self._mtime(topic)
+            if mtime is None:
+                self._drop(topic)
+                return None
+            cached = self._files.get(topic)
+            if cached is None or cached[0] != mtime:
+                self._load(topic, mtime, strict=True)
+            return self._files[topic][1]
+
+    def mtime(self, topic: str) -> Optional[int]:
+        return self._mtime(topic)
+
+    def topics(self) -> List[str]:
+        with self._lock:
+            self.refresh()
+            return list(self._files)
+
+    def get(self, paper_id: str) -> Optional[Tuple[str, dict]]:
+        """
+        Look up a paper by ID.
+
+        Args:
+            paper_id: The ID of the paper to look for
+
+        Returns:
+            (topic, paper record) tuple, or None if the paper is not stored;
+            the topic is the first one indexed of those holding the paper
+        """
+        with self._lock:
+            for topic in list(self._papers.get(paper_id, ())):
+                mtime = self._mtime(topic)
+                if mtime != self._files[topic][0]:
+                    # An owning file changed on disk, reload just that file
+                    if mtime is None:
+                        self._drop(topic)
+                    else:
+                        self._load(topic, mtime)
+            if paper_id not in self._papers and time.monotonic() - self._last_refresh >= REFRESH_INTERVAL:
+                # Unknown ID: pick up topics other processes wrote since the last scan
+                self.refresh()
+            topics = self._papers.get(paper_id)
+            if not topics:
+                return None
+            return topics[0], self._files[topics[0]][1][paper_id]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str, dict, float]]:
+        """Rank indexed papers against a free-text query."""
+        with self._lock:
+            results = []
+            for paper_id, score in self.text_index.search(query, limit):
+                topic = self._papers[paper_id][0]
+                results.append((paper_id, topic, self._files[topic][1][paper_id], score))
+            return results
+
+
+@contextlib.contextmanager
+def _file_lock(lock_path: str):
+    """Exclusive advisory lock shared by every process using the same lock file."""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class JsonPaperStore(PaperStore):
+    """
+    The original layout: one papers/<topic>/papers_info.json file per topic.
+
+    Reads go through a PaperIndex. Writes merge into the topic file and
+    replace it atomically so readers never see a half-written file. The
+    read-merge-write cycle holds a per-topic file lock, so several server
+    processes can share one papers/ tree without losing each other's updates.
+    """
+
+    def __init__(self, paper_dir: str):
+        self.paper_dir = paper_dir
+        self.index = PaperIndex(paper_dir)
+        self.index.refresh()
+        self._write_lock = threading.Lock()
+
+    def add_papers(self, topic: str, papers_info: Dict[str, dict]):
+        path = os.path.join(self.paper_dir, topic)
+        os.makedirs(path, exist_ok=True)
+        with self._write_lock, _file_lock(os.path.join(path, ".papers_info.lock")):
+            file_path = self.index.file_path(topic)
+
+            # Try to load existing papers info (re-read if another process changed it)
+            try:
+                existing = dict(self.index.topic(topic) or {})
+            except json.JSONDecodeError:
+                existing = {}
+            existing.update(papers_info)
+
+            tmp_path = f"{file_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as json_file:
+                json.dump(existing, json_file, indent=2)
+            os.replace(tmp_path, file_path)
+            self.index.update(topic, existing)
+
+    def delete_topic(self, topic: str):
+        path = os.path.join(self.paper_dir, topic)
+        lock_path = os.path.join(path, ".papers_info.lock")
+        if not os.path.isdir(path):
+            return
+        with self._write_lock, _file_lock(lock_path):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.index.file_path(topic))
+            self.index.remove(topic)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(lock_path)
+        # Leave the folder alone if anything else was stored in it
+        with contextlib.suppress(OSError):
+            os.rmdir(path)
+
+    def get_paper(self, paper_id: str) -> Optional[Tuple[str, dict]]:
+        return self.index.get(paper_id)
+
+    def get_topic(self, topic: str) -> Optional[Dict[str, dict]]:
+        return self.index.topic(topic)
+
+    def topic_version(self, topic: str) -> Optional[int]:
+        return self.index.mtime(topic)
+
+    def list_topics(self) -> List[str]:
+        return self.index.topics()
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str, dict, float]]:
+        return self.index.search(query, limit)
+
+    def location(self, topic: str) -> str:
+        return self.index.file_path(topic)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    paper_id  TEXT PRIMARY KEY,
+    title     TEXT NOT NULL,
+    summary   TEXT NOT NULL,
+    pdf_url   TEXT,
+    published TEXT
+);
+CREATE TABLE IF NOT EXISTS authors (
+    paper_id TEXT NOT NULL REFERENCES papers(paper_id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name     TEXT NOT NULL,
+    PRIMARY KEY (paper_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS authors_name ON authors(name);
+CREATE TABLE IF NOT EXISTS topic_papers (
+    topic    TEXT NOT NULL,
+    paper_id TEXT NOT NULL REFERENCES papers(paper_id) ON DELETE CASCADE,
+    seq      INTEGER NOT NULL,
+    PRIMARY KEY (topic, paper_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS topic_papers_paper ON topic_papers(paper_id);
+CREATE INDEX IF NOT EXISTS topic_papers_order ON topic_papers(topic, seq);
+CREATE TABLE IF NOT EXISTS topic_versions (
+    topic   TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+-- No stemming, like text_search.tokenize(), so both stores match the same papers
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    paper_id UNINDEXED, title, summary, authors, tokenize = 'unicode61'
+);
+"""
+
+
+class SqlitePaperStore(PaperStore):
+    """
+    Single-file SQLite store in WAL mode.
+
+    Papers, authors and topic membership live in separate indexed tables, so
+    adding papers to a topic touches only the new rows and every read is an
+    indexed query. WAL lets readers proceed while a writer commits, and
+    concurrent writers are serialized by SQLite instead of overwriting each
+    other's files.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # sqlite3 connections must not be shared between threads
+        self._local = threading.local()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Older databases indexed the text with the porter stemmer; rebuild it without
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'papers_fts'").fetchone()
+            if row is not None and "porter" in row[0]:
+                conn.execute("DROP TABLE papers_fts")
+        conn.executescript(SCHEMA)
+        # Databases created before the full-text table existed, or rebuilt above, need a backfill
+        if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM papers_fts)").fetchone()[0]:
+            with conn:
+                self._index_text(conn, [row[0] for row in conn.execute("SELECT paper_id FROM papers")])
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def add_papers(self, topic: str, papers_info: Dict[str, dict]):
+        conn = self._connect()
+        with conn:
+            # Take the write lock up front so concurrent processes cannot interleave
+            conn.execute("BEGIN IMMEDIATE")
+            self._insert(conn, topic, papers_info)
+
+    def add_papers_bulk(self, topic_papers: Dict[str, Dict[str, dict]]):
+        # Every topic lands in one transaction, i.e. one WAL commit
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for topic, papers_info in topic_papers.items():
+                self._insert(conn, topic, papers_info)
+
+    def _insert(self, conn: sqlite3.Connection, topic: str, papers_info: Dict[str, dict]):
+        conn.executemany(
+            "INSERT INTO papers (paper_id, title, summary, pdf_url, published) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(paper_id) DO UPDATE SET title=excluded.title, "
+            "summary=excluded.summary, pdf_url=excluded.pdf_url, published=excluded.published",
+            [
+                (paper_id, info["title"], info["summary"], info.get("pdf_url"), info.get("published"))
+                for paper_id, info in papers_info.items()
+            ],
+        )
+        conn.executemany(
+            "DELETE FROM authors WHERE paper_id = ?",
+            [(paper_id,) for paper_id in papers_info],
+        )
+        conn.executemany(
+            "INSERT INTO authors (paper_id, position, name) VALUES (?, ?, ?)",
+            [
+                (paper_id, position, name)
+                for paper_id, info in papers_info.items()
+                for position, name in enumerate(info.get("authors", []))
+            ],
+        )
+        next_seq = conn.execute(
+            "SELECT COALESCE(MAX(seq), -1) + 1 FROM topic_papers WHERE topic = ?", (topic,)
+        ).fetchone()[0]
+        conn.executemany(
+            "INSERT OR IGNORE INTO topic_papers (topic, paper_id, seq) VALUES (?, ?, ?)",
+            [(topic, paper_id, next_seq + i) for i, paper_id in enumerate(papers_info)],
+        )
+        self._index_text(conn, list(papers_info))
+        conn.execute(
+            "INSERT INTO topic_versions (topic, version) VALUES (?, 1) "
+            "ON CONFLICT(topic) DO UPDATE SET version = version + 1",
+            (topic,),
+        )
+
+    def delete_topic(self, topic: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            paper_ids = [
+                row[0] for row in conn.execute("SELECT paper_id FROM topic_papers WHERE topic = ?", (topic,))
+            ]
+            conn.execute("DELETE FROM topic_papers WHERE topic = ?", (topic,))
+            orphans = [
+                (paper_id,) for paper_id in paper_ids
+                if conn.execute("SELECT 1 FROM topic_papers WHERE paper_id = ? LIMIT 1", (paper_id,)).fetchone() is None
+            ]
+            # Authors go with their papers (ON DELETE CASCADE)
+            conn.executemany("DELETE FROM papers WHERE paper_id = ?", orphans)
+            conn.executemany("DELETE FROM papers_fts WHERE paper_id = ?", orphans)
+            # The version row stays, so a topic recreated later never reuses an old version
+            conn.execute("UPDATE topic_versions SET version = version + 1 WHERE topic = ?", (topic,))
+
+    def _index_text(self, conn: sqlite3.Connection, paper_ids: List[str]):
+        conn.executemany("DELETE FROM papers_fts WHERE paper_id = ?", [(paper_id,) for paper_id in paper_ids])
+        conn.executemany(
+            "INSERT INTO papers_fts (paper_id, title, summary, authors) VALUES (?, ?, ?, ?)",
+            [
+                (paper_id, info["title"], info["summary"], " ".join(info["authors"]))
+                for paper_id, info in self._records(conn, paper_ids).items()
+            ],
+        )
+
+    def _records(self, conn: sqlite3.Connection, paper_ids: List[str]) -> Dict[str, dict]:
+        records = {}
+        for chunk_start in range(0, len(paper_ids), 500):
+            chunk = paper_ids[chunk_start:chunk_start + 500]
+            marks = ",".join("?" * len(chunk))
+            for paper_id, title, summary, pdf_url, published in conn.execute(
+                f"SELECT paper_id, title, summary, pdf_url, published FROM papers WHERE paper_id IN ({marks})",
+                chunk,
+            ):
+                records[paper_id] = {
+                    "title": title,
+                    "authors": [],
+                    "summary": summary,
+                    "pdf_url": pdf_url,
+                    "published": published,
+                }
+            for paper_id, name in conn.execute(
+                f"SELECT paper_id, name FROM authors WHERE paper_id IN ({marks}) ORDER BY paper_id, position",
+                chunk,
+            ):
+                records[paper_id]["authors"].append(name)
+        return {paper_id: records[paper_id] for paper_id in paper_ids if paper_id in records}
+
+    def get_paper(self, paper_id: str) -> Optional[Tuple[str, dict]]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT topic FROM topic_papers WHERE paper_id = ? LIMIT 1", (paper_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = self._records(conn, [paper_id]).get(paper_id)
+        return (row[0], record) if record is not None else None
+
+    def get_topic(self, topic: str) -> Optional[Dict[str, dict]]:
+        conn = self._connect()
+        paper_ids = [
+            row[0] for row in conn.execute(
+                "SELECT paper_id FROM topic_papers WHERE topic = ? ORDER BY seq", (topic,)
+            )
+        ]
+        if not paper_ids:
+            return None
+        return self._records(conn, paper_ids)
+
+    def get_topic_page(self, topic: str, offset: int, limit: int) -> Optional[Tuple[int, Dict[str, dict]]]:
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM topic_papers WHERE topic = ?", (topic,)).fetchone()[0]
+        if not total:
+            return None
+        paper_ids = [
+            row[0] for row in conn.execute(
+                "SELECT paper_id FROM topic_papers WHERE topic = ? ORDER BY seq LIMIT ? OFFSET ?",
+                (topic, limit, offset),
+            )
+        ]
+        return total, self._records(conn, paper_ids)
+
+    def topic_version(self, topic: str) -> Optional[int]:
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT (SELECT version FROM topic_versions WHERE topic = ?), "
+            "EXISTS (SELECT 1 FROM topic_papers WHERE topic = ?)",
+            (topic, topic),
+        ).fetchone()
+        if not row[1]:
+            return None
+        # Topics imported before versions were tracked start at 0
+        return row[0] or 0
+
+    def list_topics(self) -> List[str]:
+        conn = self._connect()
+        return [row[0] for row in conn.execute("SELECT DISTINCT topic FROM topic_papers ORDER BY topic")]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, str, dict, float]]:
+        match = fts5_query(query)
+        if not match:
+            return []
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT f.paper_id, -bm25(papers_fts, 0.0, 2.0, 1.0, 1.0) AS score, "
+            "(SELECT topic FROM topic_papers t WHERE t.paper_id = f.paper_id LIMIT 1) "
+            "FROM papers_fts f WHERE papers_fts MATCH ? ORDER BY score DESC LIMIT ?",
+            (match, limit),
+        ).fetchall()
+        records = self._records(conn, [row[0] for row in rows])
+        return [
+            (paper_id, topic, records[paper_id], score)
+            for paper_id, score, topic in rows
+            if paper_id in records
+        ]
+
+    def location(self, topic: str) -> str:
+        return f"{self.db_path} (topic '{topic}')"
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def migrate_json_tree(paper_dir: str, store: PaperStore) -> Tuple[int, int]:
+    """
+    Import every papers/<topic>/papers_info.json file into another store.
+
+    Args:
+        paper_dir: Root of the JSON tree (usually "papers")
+        store: Destination store
+
+    Returns:
+        (number of topics, number of paper records) imported
+    """
+    source = PaperIndex(paper_dir)
+    topics = papers = 0
+    for topic in source.topics():
+        papers_info = source.topic(topic) or {}
+        store.add_papers(topic, papers_info)
+        topics += 1
+        papers += len(papers_info)
+    return topics, papers
+
+
+def open_paper_store(paper_dir: str) -> PaperStore:
+    """
+    Open the backend selected by the PAPER_STORE environment variable.
+
+    PAPER_STORE=json (default) keeps one JSON file per topic under paper_dir.
+    PAPER_STORE=sqlite uses PAPER_DB (default <paper_dir>/papers.db).
+    """
+    backend = os.environ.get("PAPER_STORE", "json").lower()
+    if backend == "json":
+        return JsonPaperStore(paper_dir)
+    if backend == "sqlite":
+        return SqlitePaperStore(os.environ.get("PAPER_DB", os.path.join(paper_dir, "papers.db")))
+    raise ValueError(f"Unknown PAPER_STORE backend: {backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paper store maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Import papers/*/papers_info.json into SQLite")
+    migrate.add_argument("--paper-dir", default="papers")
+    migrate.add_argument("--db", default=os.path.join("papers", "papers.db"))
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        sqlite_store = SqlitePaperStore(args.db)
+        n_topics, n_papers = migrate_json_tree(args.paper_dir, sqlite_store)
+        sqlite_store.close()
+        print(f"Imported {n_papers} papers from {n_topics} topics into {args.db}")
@@ -1,9 +1,27 @@
-import arxiv
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
 import json
 import os
-import subprocess
-from typing import List
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, quote, unquote
 from mcp.server.fastmcp import FastMCP
+from pydantic import AnyUrl
+from arxiv_cache import open_arxiv_cache
+from ffmpeg_jobs import FFmpegJobManager, describe_job
+from fulltext import FulltextError, open_fulltext_pipeline
+from metrics import open_metrics
+from ffmpeg_presets import DEFAULT_PRESET, PRESETS, audio_args, segment_layout, video_args
+from paper_store import open_paper_store
+from topics import TopicResolver, topic_folder
+from vector_index import open_vector_index
+from video_index import SORT_FIELDS, VideoIndex, describe_video, modified_at
 
 PAPER_DIR = "papers"
 FFMPEG_DIR = "/Users/trdo/Desktop"
@@ -11,19 +29,102 @@ FFMPEG_DIR = "/Users/trdo/Desktop"
 # Initialize FastMCP server
 mcp = FastMCP("research")
 
+# Span timings and counters of this process, served by the stats://research resource
+metrics = open_metrics("research")
+
+# Paper storage backend, selected with the PAPER_STORE environment variable
+paper_store = open_paper_store(PAPER_DIR)
+# Maps requested topics onto existing folders ("Computers" -> computer); merge_topics adds aliases
+topic_resolver = TopicResolver(os.environ.get("TOPIC_ALIASES_PATH", os.path.join(PAPER_DIR, "topic_aliases.json")))
+# Memory-mapped TF-IDF vectors of every stored paper for find_related_papers
+vector_index = open_vector_index(PAPER_DIR)
+MAX_RELATED_PAPERS = 50
+# Shared arXiv client with a persistent TTL/LRU response cache
+arxiv_cache = open_arxiv_cache(PAPER_DIR, metrics)
+
+# FFmpeg conversions run as jobs on a bounded pool shared by all worker processes through
+# the state file, so they survive restarts
+ffmpeg_jobs = FFmpegJobManager(
+    FFMPEG_DIR,
+    os.environ.get("FFMPEG_JOBS_PATH", "ffmpeg_jobs.json"),
+    int(os.environ.get("FFMPEG_MAX_JOBS", 0)) or None
+)
+
+# Cached listing of FFMPEG_DIR with ffprobe metadata, refreshed by mtime on every use
+video_index = VideoIndex(FFMPEG_DIR, os.environ.get("VIDEO_INDEX_PATH", "video_index.json"))
+DEFAULT_VIDEO_PAGE_SIZE = 50
+MAX_VIDEO_PAGE_SIZE = 500
+
+# Bounded pool for blocking work (arXiv HTTP, file and database I/O), so one
+# slow tool call does not stall the event loop that serves every other request
+TOOL_WORKERS = int(os.environ.get("RESEARCH_TOOL_WORKERS", 8))
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="research-tool")
+
+# Tool or resource handling the current request, used to label its phases
+_current_handler = contextvars.ContextVar("current_handler", default="-")
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking callable on the tool thread pool and await its result.
+    
+    Time spent waiting for a free thread and running the call are recorded
+    as separate spans, labelled with the calling tool and the callable
+    (e.g. ArxivSearchCache.search for network, PaperStore.add_papers for disk).
+    """
+    loop = asyncio.get_running_loop()
+    handler = _current_handler.get()
+    call = getattr(func, "__qualname__", repr(func))
+    queued = time.perf_counter()
+    
+    def run():
+        metrics.observe("executor_wait", time.perf_counter() - queued, handler=handler)
+        with metrics.span("blocking", handler=handler, call=call):
+            return func(*args, **kwargs)
+    
+    return await loop.run_in_executor(_tool_executor, run)
+
+# Paper PDFs are downloaded concurrently and stored as chunked text under papers/fulltext
+fulltext = open_fulltext_pipeline(PAPER_DIR, run_blocking, metrics)
+# Queue the full text of every paper search_papers stores (FULLTEXT_PREFETCH=1)
+FULLTEXT_PREFETCH = os.environ.get("FULLTEXT_PREFETCH", "0") == "1"
+# Longest fetch_paper_fulltext waits for a download before asking the model to try again
+FULLTEXT_WAIT_SECONDS = float(os.environ.get("FULLTEXT_WAIT_SECONDS", 60))
+DEFAULT_FULLTEXT_CHARS = 6000
+MAX_FULLTEXT_CHARS = 40000
+
+def timed(kind):
+    """Record every call of an async tool or resource handler as a span of this kind."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = _current_handler.set(func.__name__)
+            try:
+                with metrics.span(kind, handler=func.__name__):
+                    return await func(*args, **kwargs)
+            finally:
+                _current_handler.reset(token)
+        return wrapper
+    return decorator
+
 @mcp.tool()
-def convert_video_ffmpeg(input_filename: str, output_filename: str = "") -> str:
+@timed("tool")
+async def convert_video_ffmpeg(input_filename: str, output_filename: str = "", preset: str = DEFAULT_PRESET, segment_parallel: bool = False) -> str:
     """
-    Convert a video file using FFmpeg with high quality settings.
+    Convert a video file using FFmpeg with a named encoding preset.
     
     Args:
         input_filename: Name of the input video file (e.g., "input.mov")
         output_filename: Name of the output video file (optional, defaults to input name with .mp4 extension)
+        preset: "fast" (quick H.264, hardware encoder when available), "balanced" (H.264, default) or "archival" (high quality H.265)
+        segment_parallel: Split long videos at keyframes and encode the chunks in parallel (default: False)
         
     Returns:
         Success or error message with command output
     """
     
+    if preset not in PRESETS:
+        return f"Error: Unknown preset '{preset}'. Available presets: {', '.join(PRESETS)}"
+    
     # Set default output filename if not provided
     if not output_filename:
         name, _ = os.path.splitext(input_filename)
@@ -34,89 +135,91 @@ def convert_video_ffmpeg(input_filename: str, output_filename: str = "") -> str:
     output_path = os.path.join(FFMPEG_DIR, output_filename)
     
     # Check if input file exists
-    if not os.path.exists(input_path):
+    if not await run_blocking(os.path.exists, input_path):
         return f"Error: Input file '{input_filename}' not found in {FFMPEG_DIR}"
     
     # Check if output file already exists
-    if os.path.exists(output_path):
+    if await run_blocking(os.path.exists, output_path):
         return f"Output file '{output_filename}' already exists. Please choose a different name or remove the existing file."
     
-    # Construct the ffmpeg command
-    cmd = [
-        "ffmpeg",
-        "-i", input_path,
-        "-qscale", "0",
-        output_path
-    ]
+    # Another queued or running job may already be writing this file
+    if output_path in await ffmpeg_jobs.active_outputs():
+        return f"Output file '{output_filename}' is already being written by another conversion job."
     
     try:
-        # Start the ffmpeg process without waiting for completion
-        process = subprocess.Popen(
-            cmd,
-            cwd=FFMPEG_DIR,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        # Queue the conversion; it runs on the job pool without blocking this call
+        if segment_parallel:
+            workers, threads = segment_layout()
+            video = await run_blocking(video_args, preset, threads)
+            segments = {"workers": workers, "video_args": video, "audio_args": audio_args(preset)}
+            job = await ffmpeg_jobs.submit(input_path, output_path, video + audio_args(preset), preset, segments)
+            plan = f"Segment-parallel: {workers} encoders, {threads} threads each\nEncoder options: {' '.join(video)}"
+        else:
+            video = await run_blocking(video_args, preset)
+            job = await ffmpeg_jobs.submit(input_path, output_path, video + audio_args(preset), preset)
+            plan = f"Command: {' '.join(ffmpeg_jobs.command(job))}"
         
-        # Return immediately with process started message
-        return f"FFmpeg conversion started for '{input_filename}' -> '{output_filename}'\nProcess ID: {process.pid}\nCommand: {' '.join(cmd)}\n\nThe conversion is running in the background. Use check_conversion_status() to monitor progress."
+        # Return immediately with the job ID
+        return f"FFmpeg conversion queued for '{input_filename}' -> '{output_filename}' with the {preset} preset\nJob ID: {job['id']}\n{plan}\n\nThe conversion runs in the background. Use check_conversion_status() to monitor progress or cancel_conversion('{job['id']}') to stop it."
         
-    except FileNotFoundError:
-        return "Error: FFmpeg not found. Please make sure FFmpeg is installed and available in your PATH"
     except Exception as e:
         return f"Error starting FFmpeg: {str(e)}"
 
+def _recent_video_files(limit: int = 10) -> str:
+    """Describe the most recently modified video files in FFMPEG_DIR."""
+    if not os.path.exists(FFMPEG_DIR):
+        return ""
+    
+    # Sort by modification time (newest first); no ffprobe needed for this summary
+    _, files = video_index.query(sort_by="mtime", descending=True, limit=limit, probe=False)
+    
+    lines = ""
+    for entry in files:
+        size_mb = entry["size"] / (1024 * 1024)
+        mod_date = datetime.fromtimestamp(modified_at(entry)).strftime("%Y-%m-%d %H:%M:%S")
+        lines += f"- {entry['name']} ({size_mb:.1f} MB) - Modified: {mod_date}\n"
+    return lines
+
 @mcp.tool()
-def check_conversion_status() -> str:
+@timed("tool")
+async def check_conversion_status(job_id: str = "") -> str:
     """
-    Check the status of any running FFmpeg processes and list completed conversions.
+    Check the progress of FFmpeg conversion jobs and list recent video files.
     
+    Args:
+        job_id: Only report this job (optional, defaults to all recent jobs)
+        
     Returns:
-        Status of FFmpeg processes and recent conversions
+        Per-job status with percent done, fps and ETA, plus recent files
     """
     
     try:
-        # Check for running ffmpeg processes
-        result = subprocess.run(
-            ["pgrep", "-f", "ffmpeg"],
-            capture_output=True,
-            text=True
-        )
+        # Resume jobs restored from a previous run
+        ffmpeg_jobs.start()
         
-        status_msg = "=== FFmpeg Process Status ===\n"
+        status_msg = "=== FFmpeg Jobs ===\n"
         
-        if result.returncode == 0 and result.stdout.strip():
-            pids = result.stdout.strip().split('\n')
-            status_msg += f"Running FFmpeg processes: {len(pids)}\n"
-            for pid in pids:
-                status_msg += f"- Process ID: {pid}\n"
+        if job_id:
+            job = await ffmpeg_jobs.get(job_id)
+            if job is None:
+                return f"Error: No conversion job with ID '{job_id}'"
+            jobs = [job]
         else:
-            status_msg += "No FFmpeg processes currently running.\n"
+            # Active jobs first, then the most recent finished ones
+            jobs = sorted(
+                await ffmpeg_jobs.list_jobs(),
+                key=lambda job: (job["status"] not in ("queued", "running"), -job["created"])
+            )[:10]
+        
+        if jobs:
+            for job in jobs:
+                status_msg += describe_job(job) + "\n"
+        else:
+            status_msg += "No conversion jobs.\n"
         
         # List recent video files in the directory
         status_msg += f"\n=== Recent files in {FFMPEG_DIR} ===\n"
-        
-        video_extensions = ['.mov', '.mp4', '.avi', '.mkv', '.wmv', '.flv', '.webm', '.m4v']
-        files = []
-        
-        if os.path.exists(FFMPEG_DIR):
-            for file in os.listdir(FFMPEG_DIR):
-                if any(file.lower().endswith(ext) for ext in video_extensions):
-                    file_path = os.path.join(FFMPEG_DIR, file)
-                    modified_time = os.path.getmtime(file_path)
-                    files.append((file, modified_time))
-        
-        # Sort by modification time (newest first)
-        files.sort(key=lambda x: x[1], reverse=True)
-        
-        for file, mod_time in files[:10]:  # Show last 10 files
-            file_path = os.path.join(FFMPEG_DIR, file)
-            file_size = os.path.getsize(file_path)
-            size_mb = file_size / (1024 * 1024)
-            from datetime import datetime
-            mod_date = datetime.fromtimestamp(mod_time).strftime("%Y-%m-%d %H:%M:%S")
-            status_msg += f"- {file} ({size_mb:.1f} MB) - Modified: {mod_date}\n"
+        status_msg += await run_blocking(_recent_video_files, 10)
         
         return status_msg
         
@@ -124,98 +227,384 @@ def check_conversion_status() -> str:
         return f"Error checking conversion status: {str(e)}"
 
 @mcp.tool()
-def list_video_files() -> str:
+@timed("tool")
+async def cancel_conversion(job_id: str) -> str:
     """
-    List all video files in the FFmpeg working directory.
+    Cancel a queued or running FFmpeg conversion job and delete its partial output.
     
+    Args:
+        job_id: ID returned by convert_video_ffmpeg
+        
     Returns:
-        List of video files found in the directory
+        Final status of the job
     """
     
-    video_extensions = ['.mov', '.mp4', '.avi', '.mkv', '.wmv', '.flv', '.webm', '.m4v']
-    
+    job = await ffmpeg_jobs.cancel(job_id)
+    if job is None:
+        return f"Error: No conversion job with ID '{job_id}'"
+    if job["status"] != "cancelled":
+        return f"Job '{job_id}' already finished: {job['status']}"
+    return f"Cancelled conversion job '{job_id}'."
+
+def _list_video_files(pattern: str, codec: str, min_duration: float, max_duration: float,
+                      sort_by: str, descending: bool, page: int, limit: int) -> str:
+    """Blocking implementation of list_video_files."""
     try:
         if not os.path.exists(FFMPEG_DIR):
             return f"Error: Directory {FFMPEG_DIR} does not exist"
+        if sort_by not in SORT_FIELDS:
+            return f"Error: sort_by must be one of {', '.join(SORT_FIELDS)}"
+        if page < 1 or not 1 <= limit <= MAX_VIDEO_PAGE_SIZE:
+            return f"Error: page must be >= 1 and limit between 1 and {MAX_VIDEO_PAGE_SIZE}"
         
-        files = os.listdir(FFMPEG_DIR)
-        video_files = [f for f in files if any(f.lower().endswith(ext) for ext in video_extensions)]
+        offset = (page - 1) * limit
+        total, video_files = video_index.query(
+            pattern, codec, min_duration, max_duration, sort_by, descending, offset, limit
+        )
         
         if video_files:
-            result = f"Video files found in {FFMPEG_DIR}:\n"
-            for i, file in enumerate(video_files, 1):
-                file_path = os.path.join(FFMPEG_DIR, file)
-                file_size = os.path.getsize(file_path)
-                size_mb = file_size / (1024 * 1024)
-                result += f"{i}. {file} ({size_mb:.1f} MB)\n"
+            result = f"Video files found in {FFMPEG_DIR} ({offset + 1}-{offset + len(video_files)} of {total}):\n"
+            for i, entry in enumerate(video_files, offset + 1):
+                result += f"{i}. {describe_video(entry)}\n"
+            if offset + len(video_files) < total:
+                result += f"\nNext page: page={page + 1}\n"
             return result
+        elif total:
+            return f"No video files on page {page} ({total} matching files)"
         else:
             return f"No video files found in {FFMPEG_DIR}"
             
     except Exception as e:
         return f"Error listing video files: {str(e)}"
+
+@mcp.tool()
+@timed("tool")
+async def list_video_files(
+    pattern: str = "",
+    codec: str = "",
+    min_duration: float = 0,
+    max_duration: float = 0,
+    sort_by: str = "name",
+    descending: bool = False,
+    page: int = 1,
+    limit: int = DEFAULT_VIDEO_PAGE_SIZE
+) -> str:
+    """
+    List video files in the FFmpeg working directory with duration, codec and resolution.
+    
+    Args:
+        pattern: File name pattern such as "*.mov" or "clip_*" (optional)
+        codec: Only list files with this video codec, e.g. "h264" or "hevc" (optional)
+        min_duration: Only list files at least this many seconds long (optional)
+        max_duration: Only list files at most this many seconds long (optional)
+        sort_by: "name", "size", "mtime" or "duration" (default: "name")
+        descending: Reverse the sort order (default: False)
+        page: Page number, starting at 1 (default: 1)
+        limit: Files per page (default: 50)
+    
+    Returns:
+        One page of matching video files
+    """
+    
+    return await run_blocking(
+        _list_video_files, pattern, codec, min_duration, max_duration, sort_by, descending, page, limit
+    )
     
+def _paper_info(paper: dict) -> dict:
+    """The stored form of a paper record returned by the arXiv cache."""
+    return {
+        'title': paper['title'],
+        'authors': paper['authors'],
+        'summary': paper['summary'],
+        'pdf_url': paper['pdf_url'],
+        'published': paper['published']
+    }
+
+def _resolve_topic(topic: str) -> str:
+    """Folder holding a requested topic's papers (blocking)."""
+    # Requests naming a stored folder skip listing every topic
+    for name in (topic_folder(topic), topic.lower().replace(" ", "_")):
+        if paper_store.topic_version(name) is not None:
+            return name
+    return topic_resolver.resolve(topic, paper_store.list_topics())
+
+def _topic_not_found(topic: str) -> str:
+    """Hint for a topic without papers, naming a similar stored topic if there is one (blocking)."""
+    similar = topic_resolver.similar(topic, paper_store.list_topics())
+    if similar is not None:
+        return f"Did you mean '{similar}'? Use papers://{similar}, or search_papers to fetch papers on this topic."
+    return "Try searching for papers on this topic first."
+
+# Subscribed sessions per papers:// resource (URI of the resolved topic folder,
+# without query string), each with the URIs it subscribed under
+_subscriptions: Dict[str, weakref.WeakKeyDictionary] = {}
+
+async def _subscription_key(uri: str) -> str:
+    if uri == "papers://folders":
+        return uri
+    return f"papers://{await run_blocking(_resolve_topic, unquote(uri[len('papers://'):]))}"
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_resource(uri: AnyUrl) -> None:
+    """Remember the calling session so it is told when the resource changes."""
+    uri = str(uri).partition("?")[0]
+    if not uri.startswith("papers://"):
+        raise ValueError(f"Resource {uri} does not support subscriptions")
+    sessions = _subscriptions.setdefault(await _subscription_key(uri), weakref.WeakKeyDictionary())
+    sessions.setdefault(mcp._mcp_server.request_context.session, set()).add(uri)
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_resource(uri: AnyUrl) -> None:
+    uri = str(uri).partition("?")[0]
+    session = mcp._mcp_server.request_context.session
+    # The topic may have been merged since, so look under every key
+    for sessions in _subscriptions.values():
+        sessions.get(session, set()).discard(uri)
+
+_get_capabilities = mcp._mcp_server.get_capabilities
+
+def _get_capabilities_with_subscribe(notification_options, experimental_capabilities):
+    """
+    Advertise resource subscriptions, which the low-level server never does on its own.
+    
+    Stateless HTTP has no session to notify, so subscriptions stay off there.
+    """
+    capabilities = _get_capabilities(notification_options, experimental_capabilities)
+    if capabilities.resources is not None and not mcp.settings.stateless_http:
+        capabilities.resources.subscribe = True
+    return capabilities
+
+mcp._mcp_server.get_capabilities = _get_capabilities_with_subscribe
+
+async def notify_resources_updated(uris: List[str]):
+    """Send resources/updated to every session subscribed to one of uris (resolved folder URIs)."""
+    for uri in uris:
+        sessions = _subscriptions.get(uri, {})
+        for session, requested in list(sessions.items()):
+            try:
+                for requested_uri in list(requested):
+                    await session.send_resource_updated(AnyUrl(requested_uri))
+            except Exception:
+                # The client went away without unsubscribing
+                sessions.pop(session, None)
+
+async def _changed_topic_uris(topic_dirs: List[str]) -> List[str]:
+    """Resource URIs that change when papers are added to topic_dirs (call before adding them)."""
+    uris = [f"papers://{topic_dir}" for topic_dir in topic_dirs]
+    for topic_dir in topic_dirs:
+        if await run_blocking(paper_store.topic_version, topic_dir) is None:
+            # A new topic also changes the folder list
+            uris.append("papers://folders")
+            break
+    return uris
+
 @mcp.tool()
-def search_papers(topic: str, max_results: int = 5) -> List[str]:
+@timed("tool")
+async def search_papers(topic: str, max_results: int = 5, refresh: bool = False) -> List[str]:
     """
     Search for papers on arXiv based on a topic and store their information.
     
+    A topic whose folder (a stored folder with the same words after
+    normalization, e.g. "computer" for "Computers", or the folder
+    merge_topics merged it into) already holds max_results papers is
+    answered from the stored papers without searching arXiv again.
+    
     Args:
         topic: The topic to search for
         max_results: Maximum number of results to retrieve (default: 5)
+        refresh: Search arXiv even if the topic already has enough stored papers (default: False)
         
     Returns:
         List of paper IDs found in the search
     """
     
-    # Use arxiv to find the papers 
-    client = arxiv.Client()
-
-    # Search for the most relevant articles matching the queried topic
-    search = arxiv.Search(
-        query = topic,
-        max_results = max_results,
-        sort_by = arxiv.SortCriterion.Relevance
-    )
-
-    papers = client.results(search)
-    
-    # Create directory for this topic
-    path = os.path.join(PAPER_DIR, topic.lower().replace(" ", "_"))
-    os.makedirs(path, exist_ok=True)
+    topic_dir = await run_blocking(_resolve_topic, topic)
+    if not refresh:
+        stored = await run_blocking(paper_store.get_topic_page, topic_dir, 0, max_results)
+        if stored is not None and stored[0] >= max_results:
+            metrics.count("topic_corpus", result="hit")
+            return list(stored[1])
+        metrics.count("topic_corpus", result="miss")
     
-    file_path = os.path.join(path, "papers_info.json")
-
-    # Try to load existing papers info
-    try:
-        with open(file_path, "r") as json_file:
-            papers_info = json.load(json_file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        papers_info = {}
+    # Use arxiv to find the most relevant papers, reusing cached responses
+    papers = await run_blocking(arxiv_cache.search, topic, max_results)
 
     # Process each paper and add to papers_info  
     paper_ids = []
+    papers_info = {}
     for paper in papers:
-        paper_ids.append(paper.get_short_id())
-        paper_info = {
-            'title': paper.title,
-            'authors': [author.name for author in paper.authors],
-            'summary': paper.summary,
-            'pdf_url': paper.pdf_url,
-            'published': str(paper.published.date())
-        }
-        papers_info[paper.get_short_id()] = paper_info
+        paper_ids.append(paper['paper_id'])
+        papers_info[paper['paper_id']] = _paper_info(paper)
+    
+    # Merge the new records into the topic's stored papers
+    changed = await _changed_topic_uris([topic_dir])
+    await run_blocking(paper_store.add_papers, topic_dir, papers_info)
+    await run_blocking(vector_index.add, papers_info)
+    await notify_resources_updated(changed)
     
-    # Save updated papers_info to json file
-    with open(file_path, "w") as json_file:
-        json.dump(papers_info, json_file, indent=2)
+    print(f"Results are saved in: {paper_store.location(topic_dir)}")
     
-    print(f"Results are saved in: {file_path}")
+    if FULLTEXT_PREFETCH:
+        for paper_id, paper_info in papers_info.items():
+            fulltext.submit(paper_id, paper_info['pdf_url'])
     
     return paper_ids
 
+# Topics of one search_papers_batch call fetched at the same time; the arXiv
+# cache's ARXIV_MAX_CONCURRENCY / ARXIV_MIN_INTERVAL still bound upstream traffic
+BATCH_FETCH_CONCURRENCY = int(os.environ.get("RESEARCH_BATCH_CONCURRENCY", 4))
+# arXiv IDs requested per upstream call
+ID_BATCH_SIZE = 100
+
+@mcp.tool()
+@timed("tool")
+async def search_papers_batch(topics: Optional[List[str]] = None, paper_ids: Optional[List[str]] = None,
+                              max_results: int = 5, id_topic: str = "arxiv_ids", refresh: bool = False) -> str:
+    """
+    Search arXiv for many topics and/or fetch many arXiv IDs in one call, storing everything.
+    
+    Prefer this over repeated search_papers calls when seeding several topics.
+    
+    Args:
+        topics: Topics to search for (each stored under its own topic, or the matching stored one)
+        paper_ids: arXiv IDs to fetch directly (e.g. "2311.09277v1")
+        max_results: Maximum number of results per topic (default: 5)
+        id_topic: Topic under which papers fetched by ID are stored (default: "arxiv_ids")
+        refresh: Search arXiv even for topics that already have enough stored papers (default: False)
+        
+    Returns:
+        JSON summary with the paper IDs found per topic and counts of unique and shared papers
+    """
+    topics = list(dict.fromkeys(topics or []))
+    paper_ids = list(dict.fromkeys(paper_ids or []))
+    if not topics and not paper_ids:
+        return "Nothing to do: pass a list of topics and/or paper_ids."
+    
+    semaphore = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+    
+    async def fetch(func, *args):
+        async with semaphore:
+            try:
+                return await run_blocking(func, *args)
+            except Exception as e:
+                return e
+    
+    summary = {}
+    requests = []
+    for topic in topics:
+        topic_dir = await run_blocking(_resolve_topic, topic)
+        stored = None if refresh else await run_blocking(paper_store.get_topic_page, topic_dir, 0, max_results)
+        if stored is not None and stored[0] >= max_results:
+            # Already stored: no arXiv call and nothing to write
+            metrics.count("topic_corpus", result="hit")
+            summary[topic_dir] = {'paper_ids': list(stored[1]), 'stored': True}
+        else:
+            if not refresh:
+                metrics.count("topic_corpus", result="miss")
+            requests.append((topic_dir, arxiv_cache.search, (topic, max_results)))
+    requests += [
+        (id_topic, arxiv_cache.fetch_ids, (paper_ids[i:i + ID_BATCH_SIZE],))
+        for i in range(0, len(paper_ids), ID_BATCH_SIZE)
+    ]
+    results = await asyncio.gather(*(fetch(func, *args) for _, func, args in requests))
+    
+    # Merge per topic; a paper found under several topics is converted once and shared
+    topic_papers = {}
+    records = {}
+    for (topic_dir, _, _), result in zip(requests, results):
+        entry = summary.setdefault(topic_dir, {'paper_ids': []})
+        if isinstance(result, Exception):
+            entry['error'] = str(result)
+            continue
+        papers_info = topic_papers.setdefault(topic_dir, {})
+        for paper in result:
+            paper_id = paper['paper_id']
+            if paper_id not in records:
+                records[paper_id] = _paper_info(paper)
+            papers_info[paper_id] = records[paper_id]
+            entry['paper_ids'].append(paper_id)
+    
+    # One batched write for the whole call
+    changed = await _changed_topic_uris(list(topic_papers))
+    await run_blocking(paper_store.add_papers_bulk, topic_papers)
+    await run_blocking(vector_index.add, records)
+    await notify_resources_updated(changed)
+    
+    if FULLTEXT_PREFETCH:
+        for paper_id, paper_info in records.items():
+            fulltext.submit(paper_id, paper_info['pdf_url'])
+    
+    found = sum(len(papers_info) for papers_info in topic_papers.values())
+    return json.dumps({
+        'topics': summary,
+        'unique_papers': len(records),
+        'shared_papers': found - len(records)
+    })
+
+def _merge_topics(sources: List[str], target: str) -> dict:
+    """Blocking implementation of merge_topics."""
+    existing = paper_store.list_topics()
+    missing = [source for source in sources if source not in existing]
+    if missing:
+        raise ValueError(f"Unknown topics: {', '.join(missing)}")
+    sizes = {source: paper_store.get_topic_page(source, 0, 1)[0] for source in sources}
+    target = topic_folder(target) if target else max(sources, key=lambda source: (sizes[source], -len(source)))
+    moved = {}
+    for source in sources:
+        if source != target:
+            moved[source] = paper_store.get_topic(source) or {}
+    if not moved:
+        raise ValueError(f"Nothing to merge into {target}")
+    # Copy into the target first, so no paper is ever missing from the store
+    paper_store.add_papers_bulk({target: {
+        paper_id: paper_info for papers_info in moved.values() for paper_id, paper_info in papers_info.items()
+    }})
+    for source in moved:
+        paper_store.delete_topic(source)
+        topic_resolver.add_alias(source, target)
+    return {
+        'target': target,
+        'merged': {source: len(papers_info) for source, papers_info in moved.items()},
+        'papers': paper_store.get_topic_page(target, 0, 1)[0],
+    }
+
+@mcp.tool()
+@timed("tool")
+async def merge_topics(sources: Optional[List[str]] = None, target: str = "") -> str:
+    """
+    Merge stored topics that cover the same subject into one.
+    
+    Call without sources to list groups of topics that look like duplicates.
+    Merged topics keep working as names for the target topic.
+    
+    Args:
+        sources: Topic folders to merge, e.g. ["computer", "computers"] (optional)
+        target: Topic to merge them into (default: the source with the most papers)
+        
+    Returns:
+        JSON list of suggested merges, or a JSON summary of the merge
+    """
+    if not sources:
+        topics = await run_blocking(paper_store.list_topics)
+        return json.dumps(topic_resolver.duplicates(topics), indent=2)
+    
+    sources = list(dict.fromkeys(sources))
+    try:
+        summary = await run_blocking(_merge_topics, sources, target)
+    except ValueError as e:
+        return f"Error: {str(e)}"
+    
+    # Subscribers of a merged topic now follow the target
+    target_uri = f"papers://{summary['target']}"
+    for source in summary['merged']:
+        for session, requested in _subscriptions.pop(f"papers://{source}", {}).items():
+            _subscriptions.setdefault(target_uri, weakref.WeakKeyDictionary()).setdefault(session, set()).update(requested)
+    await notify_resources_updated([target_uri, "papers://folders"])
+    return json.dumps(summary, indent=2)
+
 @mcp.tool()
-def extract_info(paper_id: str) -> str:
+@timed("tool")
+async def extract_info(paper_id: str) -> str:
     """
     Search for information about a specific paper across all topic directories.
     
@@ -226,39 +615,223 @@ def extract_info(paper_id: str) -> str:
         JSON string with paper information if found, error message if not found
     """
  
-    for item in os.listdir(PAPER_DIR):
-        item_path = os.path.join(PAPER_DIR, item)
-        if os.path.isdir(item_path):
-            file_path = os.path.join(item_path, "papers_info.json")
-            if os.path.isfile(file_path):
-                try:
-                    with open(file_path, "r") as json_file:
-                        papers_info = json.load(json_file)
-                        if paper_id in papers_info:
-                            return json.dumps(papers_info[paper_id], indent=2)
-                except (FileNotFoundError, json.JSONDecodeError) as e:
-                    print(f"Error reading {file_path}: {str(e)}")
-                    continue
+    entry = await run_blocking(paper_store.get_paper, paper_id)
+    if entry is not None:
+        return json.dumps(entry[1], indent=2)
     
     return f"There's no saved information related to paper {paper_id}."
 
+def _format_fulltext(paper_id: str, title: str, index: dict, passages: list, query: str, section: str) -> str:
+    """Outline of a paper followed by the selected passages."""
+    lines = [
+        f"# {title} ({paper_id})",
+        f"{index['pages']} pages, {len(index['chunks'])} chunks, {index['bytes'] // 1024} KB of text",
+    ]
+    if index['sections']:
+        lines.append("Sections: " + "; ".join(f"{entry['title']} (p. {entry['page']})" for entry in index['sections']))
+    lines.append("")
+    if not passages:
+        if section:
+            lines.append(f"No section matching '{section}'. Pick one of the sections listed above.")
+        else:
+            lines.append(f"No passages match '{query}'.")
+        return "\n".join(lines)
+    
+    if query:
+        lines.append(f"Passages matching '{query}', best first:")
+    elif section:
+        lines.append(f"Section matching '{section}':")
+    else:
+        lines.append("Beginning of the paper (use query or section to read other parts):")
+    for chunk, text in passages:
+        lines.append(f"\n## {chunk['section'] or 'Front matter'} (page {chunk['page']})")
+        lines.append(text.strip())
+    return "\n".join(lines)
+
+@mcp.tool()
+@timed("tool")
+async def fetch_paper_fulltext(paper_id: str, query: str = "", section: str = "",
+                               max_chars: int = DEFAULT_FULLTEXT_CHARS) -> str:
+    """
+    Read the full text of a stored paper, returning only the relevant parts.
+    
+    The PDF is downloaded and indexed on first use; later calls read the
+    local copy. Without query or section, returns the paper's outline and
+    its beginning.
+    
+    Args:
+        paper_id: ID of a paper stored by search_papers
+        query: Return the passages that best match this text (optional)
+        section: Return the section whose title contains this, e.g. "Introduction" or "Method" (optional)
+        max_chars: Maximum characters of paper text to return (default: 6000)
+        
+    Returns:
+        Section outline followed by the selected passages, or an error message
+    """
+    if not 1 <= max_chars <= MAX_FULLTEXT_CHARS:
+        return f"Error: max_chars must be between 1 and {MAX_FULLTEXT_CHARS}"
+    
+    entry = await run_blocking(paper_store.get_paper, paper_id)
+    if entry is None:
+        return f"There's no saved information related to paper {paper_id}. Use search_papers to store it first."
+    paper_info = entry[1]
+    
+    if await run_blocking(fulltext.store.get_index, paper_id) is None:
+        try:
+            # shield: a timeout leaves the download running for the next call
+            await asyncio.wait_for(asyncio.shield(fulltext.submit(paper_id, paper_info.get('pdf_url'))),
+                                   FULLTEXT_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            received = fulltext.status.get(paper_id, {}).get('bytes', 0)
+            return f"The full text of {paper_id} is still downloading ({received // 1024} KB so far). Try again shortly."
+        except FulltextError as e:
+            return f"Error fetching the full text of {paper_id}: {str(e)}"
+    
+    selection = await run_blocking(fulltext.store.select, paper_id, query, section, max_chars)
+    if selection is None:
+        return f"Error: the stored text of {paper_id} is missing. Call fetch_paper_fulltext again to download it."
+    index, passages = selection
+    return _format_fulltext(paper_id, paper_info['title'], index, passages, query, section)
+
+@mcp.tool()
+@timed("tool")
+async def ingest_fulltext(topic: str = "", paper_ids: Optional[List[str]] = None) -> str:
+    """
+    Download and index the full text of stored papers in the background.
+    
+    Call with neither argument to see the progress of earlier requests.
+    
+    Args:
+        topic: Queue every stored paper of this topic (optional)
+        paper_ids: Queue these stored papers (optional)
+        
+    Returns:
+        JSON with the queued, already available and unknown paper IDs, or the status of every download
+    """
+    if not topic and not paper_ids:
+        return json.dumps({
+            paper_id: {key: status[key] for key in ('status', 'bytes', 'resumed', 'error')}
+            for paper_id, status in fulltext.status.items()
+        }, indent=2)
+    
+    papers = {}
+    unknown = []
+    if topic:
+        papers_info = await run_blocking(paper_store.get_topic, await run_blocking(_resolve_topic, topic))
+        if papers_info is None:
+            return f"No papers found for topic: {topic}. {await run_blocking(_topic_not_found, topic)}"
+        papers.update(papers_info)
+    for paper_id in paper_ids or []:
+        entry = await run_blocking(paper_store.get_paper, paper_id)
+        if entry is None:
+            unknown.append(paper_id)
+        else:
+            papers[paper_id] = entry[1]
+    
+    queued = []
+    available = []
+    for paper_id, paper_info in papers.items():
+        if await run_blocking(fulltext.store.get_index, paper_id) is not None:
+            available.append(paper_id)
+        else:
+            fulltext.submit(paper_id, paper_info.get('pdf_url'))
+            queued.append(paper_id)
+    
+    return json.dumps({'queued': queued, 'available': available, 'unknown': unknown}, indent=2)
+
+def _related_papers(paper_id: str, k: int) -> str:
+    """Blocking implementation of find_related_papers."""
+    if not vector_index.synced:
+        # Papers stored before the index existed are added once per process
+        vector_index.sync(paper_store)
+    related = vector_index.related(paper_id, k)
+    if related is None:
+        entry = paper_store.get_paper(paper_id)
+        if entry is None:
+            return f"There's no saved information related to paper {paper_id}."
+        vector_index.add({paper_id: entry[1]})
+        related = vector_index.related(paper_id, k)
+    
+    results = []
+    for related_id, score in related:
+        entry = paper_store.get_paper(related_id)
+        if entry is None:
+            continue
+        topic, paper_info = entry
+        results.append({
+            'paper_id': related_id,
+            'topic': topic,
+            'title': paper_info['title'],
+            'authors': paper_info['authors'],
+            'published': paper_info['published'],
+            'similarity': round(score, 3)
+        })
+    if not results:
+        return f"No other stored papers to compare {paper_id} with."
+    return json.dumps(results, indent=2)
+
+@mcp.tool()
+@timed("tool")
+async def find_related_papers(paper_id: str, k: int = 5) -> str:
+    """
+    Find the stored papers most similar to a stored paper, without contacting arXiv.
+    
+    Similarity is the cosine of TF-IDF vectors built from titles, summaries and authors.
+    
+    Args:
+        paper_id: ID of a stored paper
+        k: Number of related papers to return (default: 5)
+        
+    Returns:
+        JSON list of related papers with topic, title and similarity, most similar first
+    """
+    if not 1 <= k <= MAX_RELATED_PAPERS:
+        return f"Error: k must be between 1 and {MAX_RELATED_PAPERS}"
+    
+    return await run_blocking(_related_papers, paper_id, k)
+
+@mcp.tool()
+@timed("tool")
+async def search_local(query: str, max_results: int = 10) -> str:
+    """
+    Full-text search over papers already stored locally, without contacting arXiv.
+    
+    Try this before search_papers: if the stored papers already answer the
+    question there is no need for a slow arXiv round-trip.
+    
+    Args:
+        query: Free-text query matched against titles, summaries and authors
+        max_results: Maximum number of results to return (default: 10)
+        
+    Returns:
+        JSON string with the best matching papers, or a message if nothing matched
+    """
+    
+    results = await run_blocking(paper_store.search, query, max_results)
+    if not results:
+        return f"No stored papers match '{query}'. Use search_papers to fetch papers from arXiv."
+    
+    return json.dumps([
+        {
+            'paper_id': paper_id,
+            'topic': topic,
+            'title': paper_info['title'],
+            'authors': paper_info['authors'],
+            'published': paper_info['published'],
+            'score': round(score, 3)
+        }
+        for paper_id, topic, paper_info, score in results
+    ], indent=2)
+
 @mcp.resource("papers://folders")
-def get_available_folders() -> str:
+@timed("resource")
+async def get_available_folders() -> str:
     """
     List all available topic folders in the papers directory.
     
     This resource provides a simple list of all available topic folders.
     """
-    folders = []
-    
-    # Get all topic directories
-    if os.path.exists(PAPER_DIR):
-        for topic_dir in os.listdir(PAPER_DIR):
-            topic_path = os.path.join(PAPER_DIR, topic_dir)
-            if os.path.isdir(topic_path):
-                papers_file = os.path.join(topic_path, "papers_info.json")
-                if os.path.exists(papers_file):
-                    folders.append(topic_dir)
+    folders = await run_blocking(paper_store.list_topics)
     
     # Create a simple markdown list
     content = "# Available Topics\n\n"
@@ -271,41 +844,113 @@ def get_available_folders() -> str:
     
     return content
 
+# Fields a papers://{topic} page can project, in display order
+PAPER_FIELDS = ('title', 'authors', 'published', 'pdf_url', 'summary')
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+@functools.lru_cache(maxsize=256)
+def _render_topic_page(topic: str, topic_dir: str, version: int, page: int, limit: int, fields: tuple) -> str:
+    """
+    Render one page of a topic as markdown.
+
+    The topic's store version is part of the cache key, so a page is rendered
+    once per change of the topic and stale pages simply age out of the cache.
+    """
+    result = paper_store.get_topic_page(topic_dir, (page - 1) * limit, limit)
+    if result is None:
+        return f"# No papers found for topic: {topic}\n\nTry searching for papers on this topic first."
+    total, papers_data = result
+    pages = max(1, -(-total // limit))
+    first = (page - 1) * limit + 1
+    
+    # Create markdown content with paper details
+    parts = [
+        f"# Papers on {topic_dir.replace('_', ' ').title()}\n\n",
+        f"Total papers: {total}\n\n",
+        f"Page {page} of {pages} (papers {first}-{first + len(papers_data) - 1})\n\n" if papers_data
+        else f"Page {page} of {pages} is empty.\n\n",
+    ]
+    
+    for paper_id, paper_info in papers_data.items():
+        parts.append(f"## {paper_info['title'] if 'title' in fields else paper_id}\n")
+        parts.append(f"- **Paper ID**: {paper_id}\n")
+        if 'authors' in fields:
+            parts.append(f"- **Authors**: {', '.join(paper_info['authors'])}\n")
+        if 'published' in fields:
+            parts.append(f"- **Published**: {paper_info['published']}\n")
+        if 'pdf_url' in fields:
+            parts.append(f"- **PDF URL**: [{paper_info['pdf_url']}]({paper_info['pdf_url']})\n")
+        parts.append("\n")
+        if 'summary' in fields:
+            parts.append(f"### Summary\n{paper_info['summary'][:500]}...\n\n")
+        parts.append("---\n\n")
+    
+    if page < pages:
+        query = f"page={page + 1}&limit={limit}"
+        if fields != PAPER_FIELDS:
+            query += f"&fields={','.join(fields)}"
+        parts.append(f"Next page: papers://{quote(topic)}?{query}\n")
+    
+    return "".join(parts)
+
 @mcp.resource("papers://{topic}")
-def get_topic_papers(topic: str) -> str:
+@timed("resource")
+async def get_topic_papers(topic: str) -> str:
     """
-    Get detailed information about papers on a specific topic.
+    Get detailed information about papers on a specific topic, one page at a time.
+    
+    The URI accepts query parameters, e.g. papers://llm_reasoning?page=2&limit=10&fields=title,authors
     
     Args:
-        topic: The research topic to retrieve papers for
+        topic: The research topic to retrieve papers for, optionally followed by
+            ?page=N (default 1), &limit=K (default 20, max 100) and
+            &fields=comma-separated subset of title,authors,published,pdf_url,summary
     """
-    topic_dir = topic.lower().replace(" ", "_")
-    papers_file = os.path.join(PAPER_DIR, topic_dir, "papers_info.json")
+    topic, _, query = topic.partition("?")
+    # "#" and other reserved characters (e.g. "c#") arrive percent-encoded
+    topic = unquote(topic)
+    params = parse_qs(query)
+    try:
+        page = int(params.get('page', ['1'])[0])
+        limit = int(params.get('limit', [str(DEFAULT_PAGE_SIZE)])[0])
+    except ValueError:
+        return "# Invalid page request\n\npage and limit must be integers."
+    if page < 1 or not 1 <= limit <= MAX_PAGE_SIZE:
+        return f"# Invalid page request\n\npage must be >= 1 and limit between 1 and {MAX_PAGE_SIZE}."
+    if 'fields' in params:
+        requested = {field.strip() for field in params['fields'][0].split(',')}
+        unknown = requested - set(PAPER_FIELDS)
+        if unknown:
+            return f"# Invalid page request\n\nUnknown fields: {', '.join(sorted(unknown))}. Choose from {', '.join(PAPER_FIELDS)}."
+        fields = tuple(field for field in PAPER_FIELDS if field in requested)
+    else:
+        fields = PAPER_FIELDS
     
-    if not os.path.exists(papers_file):
-        return f"# No papers found for topic: {topic}\n\nTry searching for papers on this topic first."
+    topic_dir = await run_blocking(_resolve_topic, topic)
     
     try:
-        with open(papers_file, 'r') as f:
-            papers_data = json.load(f)
-        
-        # Create markdown content with paper details
-        content = f"# Papers on {topic.replace('_', ' ').title()}\n\n"
-        content += f"Total papers: {len(papers_data)}\n\n"
+        version = await run_blocking(paper_store.topic_version, topic_dir)
+        if version is None:
+            return f"# No papers found for topic: {topic}\n\n{await run_blocking(_topic_not_found, topic)}"
         
-        for paper_id, paper_info in papers_data.items():
-            content += f"## {paper_info['title']}\n"
-            content += f"- **Paper ID**: {paper_id}\n"
-            content += f"- **Authors**: {', '.join(paper_info['authors'])}\n"
-            content += f"- **Published**: {paper_info['published']}\n"
-            content += f"- **PDF URL**: [{paper_info['pdf_url']}]({paper_info['pdf_url']})\n\n"
-            content += f"### Summary\n{paper_info['summary'][:500]}...\n\n"
-            content += "---\n\n"
-        
-        return content
+        return await run_blocking(_render_topic_page, topic, topic_dir, version, page, limit, fields)
     except json.JSONDecodeError:
         return f"# Error reading papers data for {topic}\n\nThe papers data file is corrupted."
 
+@mcp.resource("stats://research")
+async def get_stats() -> str:
+    """
+    Latency histograms and counters of this server process as JSON rows.
+    
+    Spans: tool and resource (whole handler), executor_wait (queueing for a
+    worker thread), blocking (each blocking call, e.g. arXiv network or store
+    I/O), arxiv (network, records, cache_save phases) and fulltext
+    (download, extract phases). With several HTTP workers each process
+    reports its own numbers.
+    """
+    return json.dumps(metrics.snapshot())
+
 @mcp.prompt()
 def generate_search_prompt(topic: str, num_papers: int = 5) -> str:
     """Generate a prompt for Claude to find and discuss academic papers on a specific topic."""
@@ -332,6 +977,70 @@ Follow these instructions:
 
 Please present both detailed information about each paper and a high-level synthesis of the research landscape in {topic}."""
 
+def create_app():
+    """
+    ASGI app for the HTTP transports, used directly or as a uvicorn factory.
+
+    RESEARCH_TRANSPORT selects 'streamable-http' (default) or 'sse'. Each
+    uvicorn worker process imports this module and calls the factory, so the
+    settings travel through the environment.
+    """
+    transport = os.environ.get("RESEARCH_TRANSPORT", "streamable-http")
+    if transport == "sse":
+        app = mcp.sse_app()
+    else:
+        # Requests from one client may land on any worker, so keep no per-session state
+        mcp.settings.stateless_http = int(os.environ.get("RESEARCH_WORKERS", 1)) > 1
+        app = mcp.streamable_http_app()
+
+    inner_lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with inner_lifespan(app):
+            yield
+        # Graceful shutdown: stop downloads (partial files resume on the next start),
+        # let running tool calls finish, then release the store
+        await fulltext.close()
+        _tool_executor.shutdown(wait=True)
+        paper_store.close()
+
+    app.router.lifespan_context = lifespan
+    return app
+
 if __name__ == "__main__":
-    # Initialize and run the server
-    mcp.run(transport='stdio')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Research MCP server")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"],
+                        default=os.environ.get("RESEARCH_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.environ.get("RESEARCH_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("RESEARCH_PORT", 8001)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("RESEARCH_WORKERS", 1)),
+                        help="Worker processes for streamable-http (requires a stateless server)")
+    parser.add_argument("--keep-alive", type=int, default=int(os.environ.get("RESEARCH_KEEP_ALIVE", 30)),
+                        help="Seconds to keep idle HTTP connections open")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.environ.get("RESEARCH_GRACEFUL_TIMEOUT", 30)),
+                        help="Seconds to wait for in-flight requests on shutdown")
+    args = parser.parse_args()
+
+    if args.transport == "stdio":
+        # Initialize and run the server
+        mcp.run(transport='stdio')
+    else:
+        import uvicorn
+
+        if args.transport == "sse" and args.workers > 1:
+            parser.error("the sse transport keeps per-connection state; use streamable-http for --workers > 1")
+
+        # Worker processes rebuild the app from these variables
+        os.environ["RESEARCH_TRANSPORT"] = args.transport
+        os.environ["RESEARCH_WORKERS"] = str(args.workers)
+        uvicorn.run(
+            "research_server:create_app",
+            factory=True,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            timeout_keep_alive=args.keep_alive,
+            timeout_graceful_shutdown=args.graceful_timeout,
+            log_level="warning",
+        )
\ No newline at end of file
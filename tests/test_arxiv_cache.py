@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from arxiv_cache import ArxivSearchCache
+from bench_concurrency import StubPaper
+
+
+class CountingClient:
+    """arxiv.Client stand-in that records every upstream call; a set gate holds calls until it opens."""
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.calls = []
+        self.started = threading.Event()
+
+    def results(self, search):
+        self.calls.append(search.query)
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        return [StubPaper(search.query, i) for i in range(search.max_results)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_repeated_query_is_served_from_the_cache():
+    client = CountingClient()
+    cache = ArxivSearchCache(client=client)
+
+    first = cache.search("Graph Neural Networks", 3)
+    second = cache.search("  graph neural   networks ", 3)
+
+    assert second == first
+    assert client.calls == ["Graph Neural Networks"]
+    assert cache.stats()["hits"] == 1
+    # A different result count is a different request
+    cache.search("graph neural networks", 5)
+    assert len(client.calls) == 2
+
+
+def test_entries_expire_after_ttl():
+    client, clock = CountingClient(), Clock()
+    cache = ArxivSearchCache(client=client, ttl=60, clock=clock)
+
+    cache.search("transformers", 2)
+    clock.now += 59
+    cache.search("transformers", 2)
+    assert len(client.calls) == 1
+
+    clock.now += 2
+    cache.search("transformers", 2)
+    assert len(client.calls) == 2
+
+
+def test_least_recently_used_entry_is_evicted_by_count():
+    client = CountingClient()
+    cache = ArxivSearchCache(client=client, max_entries=2)
+
+    cache.search("a", 1)
+    cache.search("b", 1)
+    cache.search("a", 1)
+    cache.search("c", 1)
+
+    assert cache.stats()["entries"] == 2
+    # "b" was the least recently used; "a" stayed
+    cache.search("a", 1)
+    assert client.calls == ["a", "b", "c"]
+    cache.search("b", 1)
+    assert client.calls == ["a", "b", "c", "b"]
+
+
+def test_entries_are_evicted_by_size():
+    client = CountingClient()
+    probe = ArxivSearchCache(client=CountingClient())
+    probe.search("size probe", 2)
+    entry_bytes = probe.stats()["bytes"]
+    cache = ArxivSearchCache(client=client, max_bytes=int(entry_bytes * 2.5))
+
+    for query in ("size one", "size two", "size six"):
+        cache.search(query, 2)
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= int(entry_bytes * 2.5)
+    cache.search("size one", 2)
+    assert client.calls.count("size one") == 2
+
+
+def test_result_larger_than_the_cache_is_not_stored():
+    client = CountingClient()
+    cache = ArxivSearchCache(client=client, max_bytes=100)
+
+    cache.search("huge", 3)
+    cache.search("huge", 3)
+
+    assert cache.stats()["entries"] == 0
+    assert len(client.calls) == 2
+
+
+def test_concurrent_identical_queries_share_one_upstream_call():
+    gate = threading.Event()
+    client = CountingClient(gate)
+    cache = ArxivSearchCache(client=client, upstream_concurrency=4)
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(cache.search, "diffusion models", 3) for _ in range(8)]
+        client.started.wait(5)
+        # Let the other threads reach the cache before the first call returns
+        while cache.stats()["coalesced"] < 7:
+            time.sleep(0.01)
+        gate.set()
+        results = [future.result(5) for future in futures]
+
+    assert client.calls == ["diffusion models"]
+    assert all(result == results[0] for result in results)
+    assert cache.stats()["misses"] == 1
+
+
+def test_failed_upstream_call_is_not_cached():
+    class FailingClient(CountingClient):
+        def results(self, search):
+            super().results(search)
+            raise ConnectionError("arXiv unavailable")
+
+    client = FailingClient()
+    cache = ArxivSearchCache(client=client)
+
+    for _ in range(2):
+        try:
+            cache.search("flaky", 1)
+        except ConnectionError:
+            pass
+
+    assert len(client.calls) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_file_is_reloaded_without_expired_entries(tmp_path):
+    path = str(tmp_path / "arxiv_cache.json")
+    clock = Clock()
+    cache = ArxivSearchCache(client=CountingClient(), cache_path=path, ttl=60, clock=clock)
+    cache.search("old query", 2)
+    clock.now += 30
+    fresh = cache.search("new query", 2)
+    with open(path) as cache_file:
+        assert len(json.load(cache_file)) == 2
+
+    clock.now += 40
+    client = CountingClient()
+    reloaded = ArxivSearchCache(client=client, cache_path=path, ttl=60, clock=clock)
+
+    assert reloaded.stats()["entries"] == 1
+    assert reloaded.search("new query", 2) == fresh
+    assert client.calls == []
+    # The reloaded entry keeps its original expiry time
+    clock.now += 21
+    reloaded.search("new query", 2)
+    assert client.calls == ["new query"]
+
+
+def test_corrupt_cache_file_starts_empty(tmp_path, capsys):
+    path = tmp_path / "arxiv_cache.json"
+    path.write_text("{not json")
+
+    cache = ArxivSearchCache(client=CountingClient(), cache_path=str(path))
+
+    assert cache.stats()["entries"] == 0
+    assert "Error reading" in capsys.readouterr().out
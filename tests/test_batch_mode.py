@@ -0,0 +1,62 @@
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+from batch_mode import StubOllama, load_queries, run_batch
+from mcp_chatbot import MCP_ChatBot
+
+CATALOG = {
+    "tools": [{
+        "name": "search_papers",
+        "description": "Search for papers on arXiv based on a topic",
+        "input_schema": {"type": "object", "properties": {"topic": {"type": "string"}}, "required": ["topic"]},
+    }],
+    "prompts": [],
+    "resources": [],
+}
+
+
+class FakeSession:
+    """MCP session stand-in whose tool results echo the arguments after a random delay."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, arguments=None):
+        self.calls.append(arguments["topic"])
+        # Random delays interleave the queries, so results arrive out of order
+        await asyncio.sleep(random.uniform(0, 0.02))
+        return SimpleNamespace(content=[SimpleNamespace(text=f"papers about {arguments['topic']}")], isError=False)
+
+
+def test_concurrent_queries_keep_their_own_lines_and_traces(tmp_path, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "unused")
+    query_path = tmp_path / "queries.jsonl"
+    query_path.write_text("".join(
+        json.dumps({"request_id": f"q{i}", "title": f"topic {i}", "body": f"papers on subject {i}"}) + "\n"
+        for i in range(12)
+    ))
+    output_path = tmp_path / "results.jsonl"
+    session = FakeSession()
+    chatbot = MCP_ChatBot(route_tools=False)
+    chatbot.ollama = StubOllama(latency=0.005)
+    chatbot._register(CATALOG, session=session, server_name="research")
+    queries = load_queries(str(query_path))
+
+    summary = asyncio.run(run_batch(chatbot, queries, str(output_path), concurrency=4, backend="stub"))
+
+    lines = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert summary["queries"] == 12
+    assert summary["errors"] == 0
+    assert summary["tool_calls"] == 12
+    assert sorted(line["id"] for line in lines) == sorted(query["id"] for query in queries)
+    for line in lines:
+        # Every trace holds exactly this query's tool call and model turns
+        assert [call["arguments"]["topic"] for call in line["tool_calls"]] == [line["query"]]
+        assert line["tool_calls"][0]["result"] == f"papers about {line['query']}"
+        assert [turn["tool_calls"] for turn in line["turns"]] == [1, 0]
+        assert line["answer"].startswith(f"Stub answer to: {line['query']}")
+        assert f"papers about {line['query']}" in line["answer"]
+    assert sorted(session.calls) == sorted(query["query"] for query in queries)
+    assert len(chatbot.turn_metrics) == 24
@@ -0,0 +1,37 @@
+import time
+
+from context_budget import ContextBudget
+from mcp_chatbot import MCP_ChatBot
+
+
+def tool_round(text):
+    return [
+        {"role": "assistant", "content": "", "tool_calls": [{"function": {"name": "search_papers"}}]},
+        {"role": "tool", "content": text},
+    ]
+
+
+def test_compact_returns_only_the_savings_of_that_call():
+    context = ContextBudget(budget=300, keep_recent=1, summary_tokens=20)
+    messages = [{"role": "user", "content": "question"}] + tool_round("a" * 2000) + tool_round("b" * 400)
+
+    first = context.compact(messages)
+    assert first > 0
+    assert context.saved(messages) == first
+
+    # Nothing new to compact: the earlier savings are not reported again
+    assert context.compact(messages) == 0
+    assert context.saved(messages) == first
+
+
+def test_compactions_are_counted_once(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "unused")
+    chatbot = MCP_ChatBot(route_tools=False)
+    for tokens_saved, tokens_compacted in ((0, 0), (400, 400), (400, 0), (500, 100)):
+        chatbot.record_turn('ollama', time.perf_counter(), None, 0, tokens_saved=tokens_saved,
+                            tokens_compacted=tokens_compacted)
+
+    counters = {row["name"]: row["value"] for row in chatbot.metrics.snapshot() if row["type"] == "counter"}
+    assert [turn["tokens_saved"] for turn in chatbot.turn_metrics] == [0, 400, 400, 500]
+    assert counters["compactions"] == 2
+    assert counters["tokens_saved"] == 500
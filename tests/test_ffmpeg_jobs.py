@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import stat
+import sys
+import time
+
+import pytest
+
+import ffmpeg_jobs
+from ffmpeg_jobs import CANCELLED, DONE, FFmpegJobManager
+
+# Stand-in for ffmpeg/ffprobe: logs each run, reports progress, then writes the output
+FAKE_FFMPEG = f"""#!{sys.executable}
+import os, sys, time
+if os.path.basename(sys.argv[0]) == "ffprobe":
+    print("1.0")
+    sys.exit(0)
+output = sys.argv[-1]
+with open(os.environ["FAKE_FFMPEG_LOG"], "a") as log:
+    log.write(output + "\\n")
+for step in range(1, 5):
+    time.sleep(float(os.environ.get("FAKE_FFMPEG_SECONDS", "0.2")) / 4)
+    print(f"out_time_us={{step * 250000}}\\nprogress=continue", flush=True)
+with open(output, "w") as out:
+    out.write("video")
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name in ("ffmpeg", "ffprobe"):
+        path = bin_dir / name
+        path.write_text(FAKE_FFMPEG)
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    log = tmp_path / "runs.log"
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_FFMPEG_LOG", str(log))
+    monkeypatch.setattr(ffmpeg_jobs, "POLL_INTERVAL", 0.05)
+    return log
+
+
+def managers(tmp_path, count, max_jobs=2):
+    """Job managers of several worker processes sharing one state file."""
+    return [FFmpegJobManager(str(tmp_path), str(tmp_path / "jobs.json"), max_jobs) for _ in range(count)]
+
+
+def stop(*workers):
+    for manager in workers:
+        manager._poller.cancel()
+        for task in manager._tasks:
+            task.cancel()
+
+
+def test_each_job_runs_once_across_workers(tmp_path, fake_ffmpeg):
+    async def scenario():
+        first, second = managers(tmp_path, 2)
+        second.start()
+        jobs = [await first.submit("in.mov", str(tmp_path / f"out{i}.mp4"), []) for i in range(4)]
+        finished = [await second.wait(job["id"]) for job in jobs]
+        stop(first, second)
+        return finished
+
+    finished = asyncio.run(scenario())
+
+    assert [job["status"] for job in finished] == [DONE] * 4
+    runs = fake_ffmpeg.read_text().split()
+    assert sorted(runs) == sorted(job["output"] for job in finished)
+
+
+def test_running_jobs_stay_within_max_jobs(tmp_path, fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_SECONDS", "0.4")
+
+    async def scenario():
+        workers = managers(tmp_path, 3, max_jobs=2)
+        for manager in workers:
+            manager.start()
+        jobs = [await workers[0].submit("in.mov", str(tmp_path / f"out{i}.mp4"), []) for i in range(5)]
+        peak = 0
+        while any(job["status"] != DONE for job in await workers[1].list_jobs()):
+            peak = max(peak, sum(job["status"] == "running" for job in await workers[2].list_jobs()))
+            await asyncio.sleep(0.02)
+        stop(*workers)
+        return peak, len(jobs)
+
+    peak, count = asyncio.run(scenario())
+
+    assert peak == 2
+    assert len(fake_ffmpeg.read_text().split()) == count
+
+
+def test_cancel_from_another_worker(tmp_path, fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_SECONDS", "5")
+
+    async def scenario():
+        runner, other = managers(tmp_path, 2)
+        job = await runner.submit("in.mov", str(tmp_path / "out.mp4"), [])
+        while (await other.get(job["id"]))["status"] != "running" or not runner._processes:
+            await asyncio.sleep(0.02)
+        cancelled = await other.cancel(job["id"])
+        started = time.monotonic()
+        while runner._running:
+            await asyncio.sleep(0.02)
+        stop(runner, other)
+        return cancelled, (await other.get(job["id"])), time.monotonic() - started
+
+    cancelled, final, seconds = asyncio.run(scenario())
+
+    assert cancelled["status"] == CANCELLED
+    assert final["status"] == CANCELLED
+    # The runner stopped ffmpeg instead of letting it finish
+    assert seconds < 2
+    assert not os.path.exists(final["output"])
+
+
+def test_jobs_of_a_dead_worker_are_resumed_once(tmp_path, fake_ffmpeg):
+    job = {
+        "id": "abcd1234", "input": "in.mov", "output": str(tmp_path / "out.mp4"), "encode_args": [],
+        "preset": "", "segments": None, "status": "running", "progress": 40.0, "fps": None, "eta": None,
+        "duration": None, "pid": 1, "owner": "1-dead00", "created": time.time(), "started": time.time(),
+        "finished": None, "error": None,
+    }
+    stale = time.time() - ffmpeg_jobs.WORKER_TIMEOUT - 1
+    (tmp_path / "jobs.json").write_text(json.dumps({"jobs": {job["id"]: job}, "workers": {"1-dead00": stale}}))
+
+    async def scenario():
+        workers = managers(tmp_path, 3)
+        for manager in workers:
+            manager.start()
+        finished = await workers[0].wait(job["id"])
+        stop(*workers)
+        return finished
+
+    finished = asyncio.run(scenario())
+
+    assert finished["status"] == DONE
+    assert finished["restarted"]
+    assert fake_ffmpeg.read_text().split() == [job["output"]]
+
+
+def test_reads_the_unshared_state_layout(tmp_path, fake_ffmpeg):
+    job = {
+        "id": "abcd1234", "input": "in.mov", "output": str(tmp_path / "out.mp4"), "encode_args": [],
+        "preset": "", "segments": None, "status": "queued", "progress": 0.0, "fps": None, "eta": None,
+        "duration": None, "pid": None, "created": time.time(), "started": None, "finished": None, "error": None,
+    }
+    (tmp_path / "jobs.json").write_text(json.dumps({job["id"]: job}))
+
+    async def scenario():
+        manager, = managers(tmp_path, 1)
+        manager.start()
+        finished = await manager.wait(job["id"])
+        stop(manager)
+        return finished
+
+    assert asyncio.run(scenario())["status"] == DONE
+
+
+def test_finished_jobs_are_pruned(tmp_path, fake_ffmpeg, monkeypatch):
+    monkeypatch.setattr(ffmpeg_jobs, "MAX_FINISHED_JOBS", 3)
+    now = time.time()
+    jobs = {
+        f"job{i:05d}": {
+            "id": f"job{i:05d}", "input": "in.mov", "output": f"out{i}.mp4", "status": DONE,
+            "created": now - 100 + i, "finished": now - 50 + i,
+        }
+        for i in range(10)
+    }
+    (tmp_path / "jobs.json").write_text(json.dumps({"jobs": jobs, "workers": {}}))
+
+    remaining = asyncio.run(managers(tmp_path, 1)[0].list_jobs())
+
+    assert sorted(job["id"] for job in remaining) == ["job00007", "job00008", "job00009"]
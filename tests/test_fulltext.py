@@ -0,0 +1,180 @@
+import asyncio
+import io
+import os
+
+import httpx
+import pypdf
+import pytest
+
+from bench_fulltext import make_pdf, sample_paper, start_stand_in
+from fulltext import DONE, FulltextError, FulltextPipeline, FulltextStore
+
+PAPER_ID = "2401.00001v1"
+
+
+@pytest.fixture
+def stand_in():
+    servers = []
+
+    def start(files, flaky=False):
+        server = start_stand_in(files, latency=0, bandwidth=0, flaky=flaky)
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/pdf/"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def page_count(body):
+    return len(pypdf.PdfReader(io.BytesIO(body)).pages)
+
+
+def ingest(store, url, paper_id=PAPER_ID, transport=None):
+    async def run():
+        pipeline = FulltextPipeline(store, max_downloads=2, retry_delay=0.01, transport=transport)
+        try:
+            return await pipeline.submit(paper_id, url), pipeline.status[paper_id]
+        finally:
+            await pipeline.close()
+    return asyncio.run(run())
+
+
+def test_chunks_cover_the_text_file_by_offset(tmp_path, stand_in):
+    _, base = stand_in({PAPER_ID: sample_paper(1, n_pages=6)})
+    store = FulltextStore(str(tmp_path))
+    index, status = ingest(store, base + PAPER_ID)
+
+    assert status["status"] == DONE
+    with open(tmp_path / f"{PAPER_ID}.txt", "rb") as text_file:
+        data = text_file.read()
+    offset = 0
+    for chunk in index["chunks"]:
+        assert chunk["offset"] == offset
+        offset += chunk["length"]
+    assert offset == index["bytes"] == len(data)
+    numbers = list(range(len(index["chunks"])))
+    assert "".join(store.read_chunks(PAPER_ID, numbers)).encode("utf-8") == data
+    assert [entry["title"] for entry in index["sections"]][-2:] == ["5 Results", "6 Conclusion"]
+    # The downloaded PDF is removed once its text is stored
+    assert not os.path.exists(store.pdf_path(PAPER_ID))
+
+
+def test_select_by_section_and_query(tmp_path, stand_in):
+    _, base = stand_in({PAPER_ID: sample_paper(7, n_pages=6)})
+    store = FulltextStore(str(tmp_path))
+    ingest(store, base + PAPER_ID)
+
+    _, passages = store.select(PAPER_ID, section="experiments", max_chars=10 ** 6)
+    assert passages and all(chunk["section"] == "4 Experiments" for chunk, _ in passages)
+    _, passages = store.select(PAPER_ID, query="quokka throughput", max_chars=1)
+    assert "quokka benchmark" in passages[0][1]
+
+
+def test_body_lines_starting_with_a_number_are_not_headings(tmp_path):
+    pdf_path = tmp_path / "paper.pdf"
+    pdf_path.write_bytes(make_pdf([[
+        "1 Introduction",
+        "Every request of the benchmark completed within",
+        "10 ms and the latency of each request stayed flat across",
+        "2 Method",
+        "We ran the workload on",
+        "4 machines with identical configuration and disks",
+        "CONCLUSIONS",
+        "It works.",
+    ]]))
+    store = FulltextStore(str(tmp_path / "text"))
+
+    index = store.extract(PAPER_ID, str(pdf_path))
+
+    assert [entry["title"] for entry in index["sections"]] == ["1 Introduction", "2 Method", "CONCLUSIONS"]
+    text = "".join(store.read_chunks(PAPER_ID, range(len(index["chunks"]))))
+    assert "within\n10 ms and the latency" in text
+    assert [chunk["section"] for chunk in index["chunks"]] == ["1 Introduction", "2 Method", "CONCLUSIONS"]
+
+
+def test_cut_response_resumes_with_range(tmp_path, stand_in):
+    body = sample_paper(2, n_pages=8)
+    server, base = stand_in({PAPER_ID: body}, flaky=True)
+    index, status = ingest(FulltextStore(str(tmp_path / "flaky")), base + PAPER_ID)
+
+    assert status["resumed"] and server.ranged == 1
+    assert status["bytes"] == len(body)
+    _, clean_base = stand_in({PAPER_ID: body})
+    clean, _ = ingest(FulltextStore(str(tmp_path / "clean")), clean_base + PAPER_ID)
+    assert index["chunks"] == clean["chunks"]
+
+
+def test_416_means_the_partial_file_is_complete(tmp_path, stand_in):
+    body = sample_paper(3, n_pages=2)
+    server, base = stand_in({PAPER_ID: body})
+    store = FulltextStore(str(tmp_path))
+    # A previous run downloaded everything but stopped before extracting
+    with open(store.pdf_path(PAPER_ID), "wb") as pdf_file:
+        pdf_file.write(body)
+
+    index, status = ingest(store, base + PAPER_ID)
+
+    assert status["status"] == DONE and status["resumed"]
+    assert server.ranged == 0 and status["bytes"] == 0
+    assert index["pages"] == page_count(body)
+
+
+def test_corrupt_download_is_discarded_and_fetched_again(tmp_path, stand_in):
+    server, base = stand_in({PAPER_ID: b"<html><body>Rate limit exceeded</body></html>"})
+    store = FulltextStore(str(tmp_path))
+
+    with pytest.raises(FulltextError):
+        ingest(store, base + PAPER_ID)
+    # Neither the bad bytes nor a half-written text file are left behind
+    # Only the (empty) download lock file is left
+    assert [name for name in os.listdir(tmp_path) if not name.endswith(".lock")] == []
+
+    body = server.files[PAPER_ID] = sample_paper(4, n_pages=2)
+    index, status = ingest(store, base + PAPER_ID)
+    assert not status["resumed"] and index["pages"] == page_count(body)
+
+
+def test_server_ignoring_range_restarts_the_file(tmp_path):
+    body = sample_paper(5, n_pages=2)
+    half = len(body) // 2
+    requests = []
+
+    async def cut_off():
+        yield body[:half]
+        raise httpx.ReadError("connection reset")
+
+    def handler(request):
+        requests.append(request.headers.get("Range"))
+        # The first response breaks off halfway; the retry's Range header is ignored
+        return httpx.Response(200, content=cut_off() if len(requests) == 1 else body)
+
+    store = FulltextStore(str(tmp_path))
+    index, status = ingest(store, "http://arxiv.test/pdf/" + PAPER_ID, transport=httpx.MockTransport(handler))
+
+    assert requests == [None, f"bytes={half}-"]
+    assert status["bytes"] == len(body)
+    assert index["pages"] == page_count(body)
+
+
+def test_two_processes_download_a_paper_once(tmp_path, stand_in):
+    _, base = stand_in({PAPER_ID: sample_paper(4, n_pages=2)})
+    # Two pipelines on one directory stand for two server processes
+    first, second = FulltextStore(str(tmp_path)), FulltextStore(str(tmp_path))
+
+    async def run():
+        pipelines = [FulltextPipeline(store, max_downloads=1, retry_delay=0.01) for store in (first, second)]
+        try:
+            return await asyncio.gather(*(
+                pipeline.submit(PAPER_ID, base + PAPER_ID) for pipeline in pipelines
+            )), [pipeline.status[PAPER_ID] for pipeline in pipelines]
+        finally:
+            for pipeline in pipelines:
+                await pipeline.close()
+
+    (one, two), statuses = asyncio.run(run())
+
+    assert one == two
+    # The process that waited for the lock found the stored text instead of downloading again
+    assert sorted(status["bytes"] > 0 for status in statuses) == [False, True]
+
@@ -0,0 +1,23 @@
+from metrics import Histogram, percentile
+
+
+def test_percentile_is_nearest_rank():
+    samples = [0.5, 0.1, 0.4, 0.2, 0.3]
+
+    assert percentile(samples, 0) == 0.1
+    assert percentile(samples, 20) == 0.1
+    assert percentile(samples, 50) == 0.3
+    assert percentile(samples, 99) == 0.5
+    assert percentile(samples, 100) == 0.5
+    assert percentile([0.1, 0.2], 50) == 0.1
+    assert percentile([], 50) is None
+
+
+def test_histogram_uses_the_same_percentile():
+    histogram = Histogram()
+    samples = [i / 100 for i in range(1, 101)]
+    for seconds in reversed(samples):
+        histogram.observe(seconds)
+
+    for pct in (50, 95, 99):
+        assert histogram.percentile(pct) == percentile(samples, pct) == pct / 100
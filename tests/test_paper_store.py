@@ -0,0 +1,85 @@
+import json
+
+import paper_store
+from paper_store import JsonPaperStore
+
+RECORD = {
+    "title": "Computing machinery", "authors": ["A. Turing"], "summary": "Can machines think?",
+    "pdf_url": "http://arxiv.org/pdf/1310.7911v2", "published": "2013-10-29",
+}
+
+
+def write_topic(paper_dir, topic, papers_info):
+    folder = paper_dir / topic
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / "papers_info.json").write_text(json.dumps(papers_info))
+
+
+def test_paper_in_two_topics_survives_deleting_one(tmp_path):
+    store = JsonPaperStore(str(tmp_path))
+    store.add_papers("computer", {"1310.7911v2": RECORD})
+    store.add_papers("computers", {"1310.7911v2": RECORD, "2101.00001v1": dict(RECORD, title="Other")})
+
+    store.delete_topic("computers")
+
+    assert store.get_paper("1310.7911v2") == ("computer", RECORD)
+    assert store.get_paper("2101.00001v1") is None
+    assert [hit[0] for hit in store.search("machinery")] == ["1310.7911v2"]
+
+
+def test_misses_rescan_at_most_once_per_interval(tmp_path, monkeypatch):
+    store = JsonPaperStore(str(tmp_path))
+    scans = []
+    refresh = store.index.refresh
+    monkeypatch.setattr(store.index, "refresh", lambda: scans.append(1) or refresh())
+
+    for _ in range(100):
+        assert store.get_paper("0000.00000v1") is None
+    assert scans == []
+
+    # Written by another process; found once the interval has passed
+    write_topic(tmp_path, "elsewhere", {"1310.7911v2": RECORD})
+    monkeypatch.setattr(paper_store, "REFRESH_INTERVAL", 0)
+    assert store.get_paper("1310.7911v2") == ("elsewhere", RECORD)
+    assert scans == [1]
+
+
+def test_writes_are_visible_without_a_rescan(tmp_path):
+    store = JsonPaperStore(str(tmp_path))
+    store.add_papers("computer", {"1310.7911v2": RECORD})
+
+    assert store.get_paper("1310.7911v2") == ("computer", RECORD)
+
+
+def test_both_backends_match_the_same_papers(tmp_path):
+    papers = {
+        "2101.00001v1": dict(RECORD, title="Graph neural networks", summary="Networks of nodes."),
+        "2101.00002v1": dict(RECORD, title="A graph network", summary="One network, connected nodes."),
+        "2101.00003v1": dict(RECORD, title="Connecting machines", summary="Machines connect."),
+    }
+    json_store = JsonPaperStore(str(tmp_path / "json"))
+    sqlite_store = paper_store.SqlitePaperStore(str(tmp_path / "papers.db"))
+    for store in (json_store, sqlite_store):
+        store.add_papers("graphs", papers)
+
+    for query in ("networks", "network", "connected", "connect", "machines", "graph nodes"):
+        assert ({hit[0] for hit in json_store.search(query)}
+                == {hit[0] for hit in sqlite_store.search(query)}), query
+
+
+def test_porter_full_text_index_is_rebuilt(tmp_path):
+    path = str(tmp_path / "papers.db")
+    store = paper_store.SqlitePaperStore(path)
+    store.add_papers("computer", {"1310.7911v2": RECORD})
+    conn = store._connect()
+    with conn:
+        conn.execute("DROP TABLE papers_fts")
+        conn.execute("CREATE VIRTUAL TABLE papers_fts USING fts5("
+                     "paper_id UNINDEXED, title, summary, authors, tokenize = 'porter unicode61')")
+
+    reopened = paper_store.SqlitePaperStore(path)
+
+    assert "porter" not in reopened._connect().execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'papers_fts'").fetchone()[0]
+    assert [hit[0] for hit in reopened.search("machinery")] == ["1310.7911v2"]
+    assert reopened.search("machineri") == []
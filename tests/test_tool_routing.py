@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+from mcp_chatbot import MCP_ChatBot
+
+SCHEMA = {"type": "object", "properties": {"topic": {"type": "string"}}, "required": ["topic"]}
+# More tools than the router offers at once, each with words of its own
+TOOLS = {
+    "search_papers": "Search for papers on arXiv based on a topic",
+    "extract_info": "Extract details of one stored paper by identifier",
+    "list_topics": "List the stored topic folders",
+    "merge_topics": "Merge two stored topic folders",
+    "convert_video": "Convert a video file with ffmpeg",
+    "job_status": "Status of a background conversion job",
+    "cancel_job": "Cancel a background conversion job",
+    "fetch_fulltext": "Download the pdf of an arxiv paper",
+    "read_section": "Read one section of a downloaded pdf",
+    "semantic_search": "Find stored papers similar in meaning",
+}
+
+
+class ScriptedOllama:
+    """Ollama stand-in that makes the given tool calls in order, recording the tools offered each round."""
+
+    def __init__(self, calls):
+        self.calls = list(calls)
+        self.offered = []
+
+    async def chat(self, model, messages, tools, stream, keep_alive):
+        self.offered.append([tool["function"]["name"] for tool in tools])
+        if not self.calls:
+            return {"message": {"role": "assistant", "content": "done"}, "done": True}
+        name = self.calls.pop(0)
+        return {"message": {"role": "assistant", "content": "",
+                            "tool_calls": [{"function": {"name": name, "arguments": {"topic": "x"}}}]},
+                "done": True}
+
+
+class Session:
+    async def call_tool(self, name, arguments=None):
+        text = {"search_papers": "Found 2412.00001; extract details of a stored paper by identifier"}.get(name, "ok")
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], isError=False)
+
+
+def make_chatbot(monkeypatch, calls):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "unused")
+    chatbot = MCP_ChatBot(stream=False)
+    chatbot.router.max_tools = 2
+    chatbot.ollama = ScriptedOllama(calls)
+    catalog = {"tools": [{"name": name, "description": description, "input_schema": SCHEMA}
+                         for name, description in TOOLS.items()],
+               "prompts": [], "resources": []}
+    chatbot._register(catalog, session=Session(), server_name="research")
+    return chatbot
+
+
+def test_later_rounds_offer_tools_the_results_call_for(monkeypatch):
+    chatbot = make_chatbot(monkeypatch, ["search_papers", "extract_info"])
+
+    asyncio.run(chatbot.process_query_local("search arxiv papers on a topic"))
+
+    first, second, third = chatbot.ollama.offered
+    assert "search_papers" in first and "extract_info" not in first
+    # The search result mentions extracting details, so the next round offers that tool
+    assert second[:len(first)] == first
+    assert "extract_info" in second
+    assert third == second
+
+
+def test_round_text_matching_no_tool_keeps_the_offered_tools(monkeypatch):
+    chatbot = make_chatbot(monkeypatch, ["list_topics"])
+
+    asyncio.run(chatbot.process_query_local("list stored topic folders"))
+
+    first, second = chatbot.ollama.offered
+    assert second == first
+    assert len(first) < len(TOOLS)
@@ -0,0 +1,40 @@
+from topics import TopicResolver, topic_key
+
+
+def test_same_key_resolves_to_the_stored_folder():
+    resolver = TopicResolver()
+
+    assert resolver.resolve("Computers", ["computer"]) == "computer"
+    assert resolver.resolve("the computer", ["computer"]) == "computer"
+    assert resolver.resolve("LLMs", ["large_language_models"]) == "large_language_models"
+
+
+def test_exact_folder_wins_over_a_key_match():
+    resolver = TopicResolver()
+
+    assert resolver.resolve("computers", ["computer", "computers"]) == "computers"
+
+
+def test_different_keys_get_their_own_folder():
+    resolver = TopicResolver()
+    existing = ["computer", "data_structure", "bench_query_1"]
+
+    assert topic_key("structured data") != topic_key("data structure")
+    assert resolver.resolve("structured data", existing) == "structured_data"
+    assert resolver.resolve("bench query 12", existing) == "bench_query_12"
+    assert resolver.resolve("C#", existing) == "c#"
+
+
+def test_misspelling_is_only_suggested():
+    resolver = TopicResolver()
+    existing = ["reinforcement_learning"]
+
+    assert resolver.resolve("reinforcment learning", existing) == "reinforcment_learning"
+    assert resolver.similar("reinforcment learning", existing) == "reinforcement_learning"
+
+
+def test_alias_is_followed(tmp_path):
+    resolver = TopicResolver(str(tmp_path / "aliases.json"))
+    resolver.add_alias("computers", "computing")
+
+    assert TopicResolver(str(tmp_path / "aliases.json")).resolve("Computers", ["computer", "computing"]) == "computing"
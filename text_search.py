@@ -0,0 +1,124 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or that
+the their this to was were which with we our these those using based via
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase a string and split it into searchable terms."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def stem(term: str) -> str:
+    """Strip common English suffixes so "papers", "searching" and "converted" match their base forms."""
+    if len(term) > 4 and term.endswith("ies"):
+        return term[:-3] + "y"
+    if len(term) > 4 and term.endswith(("sses", "ches", "shes", "xes")):
+        return term[:-2]
+    if len(term) > 3 and term.endswith("s") and not term.endswith(("ss", "us", "is")):
+        term = term[:-1]
+    for suffix in ("ing", "ed"):
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            return term[:-len(suffix)]
+    # "file"/"files" and "create"/"created" end up as the same stem
+    if len(term) >= 4 and term.endswith("e"):
+        return term[:-1]
+    return term
+
+
+def paper_terms(paper_info: dict) -> List[str]:
+    """
+    Terms indexed for one paper record.
+
+    The title is counted twice so that title matches outrank matches that
+    only appear somewhere in a long abstract.
+    """
+    title = tokenize(paper_info.get("title", ""))
+    return (
+        title
+        + title
+        + tokenize(paper_info.get("summary", ""))
+        + tokenize(" ".join(paper_info.get("authors", [])))
+    )
+
+
+class Bm25Index:
+    """
+    Incremental in-memory inverted index ranked with Okapi BM25.
+
+    Documents can be added, replaced and removed one at a time; scoring
+    only visits the posting lists of the query terms.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {doc ID: term frequency}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # doc ID -> (document length, distinct terms)
+        self._docs: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def add(self, doc_id: str, terms: Iterable[str]):
+        """Index a document, replacing any earlier version with the same ID."""
+        self.remove(doc_id)
+        counts = Counter(terms)
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        length = sum(counts.values())
+        self._docs[doc_id] = (length, tuple(counts))
+        self._total_len += length
+
+    def remove(self, doc_id: str):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        length, terms = entry
+        self._total_len -= length
+        for term in terms:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank documents against a free-text query.
+
+        Returns:
+            Up to limit (doc ID, score) pairs, best match first
+        """
+        if not self._docs:
+            return []
+        n_docs = len(self._docs)
+        avg_len = self._total_len / n_docs
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                doc_len = self._docs[doc_id][0]
+                norm = tf + self.k1 * (1 - self.b + self.b * doc_len / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+
+def fts5_query(query: str) -> str:
+    """Turn free text into a safe SQLite FTS5 MATCH expression (terms OR-ed together)."""
+    return " OR ".join(f'"{term}"' for term in dict.fromkeys(tokenize(query)))
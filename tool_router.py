@@ -0,0 +1,72 @@
+from typing import Iterable, List, Optional
+
+from text_search import Bm25Index, stem, tokenize
+
+# Most tools offered to the model for one query
+ROUTER_MAX_TOOLS = 8
+# Tools scoring below this fraction of the best match are left out
+MIN_SCORE_RATIO = 0.2
+
+# Conversational words that say nothing about which tool is wanted
+ROUTER_STOPWORDS = frozenset("""
+about all any can could do does how me my please show tell there what when where
+which who why will would you your hello hi thanks
+""".split())
+
+
+def terms(text: str) -> List[str]:
+    return [stem(term) for term in tokenize(text) if term not in ROUTER_STOPWORDS]
+
+
+def tool_terms(name: str, description: str, input_schema: dict) -> List[str]:
+    """
+    Terms indexed for one tool.
+
+    The name counts three times and parameter names twice, so a query that
+    mentions a tool's subject outranks one that only shares words with a
+    long description.
+    """
+    words = terms(name) * 3 + terms(description or "")
+    for param_name, param in (input_schema or {}).get("properties", {}).items():
+        words += terms(param_name) * 2 + terms(param.get("description", ""))
+    return words
+
+
+class ToolRouter:
+    """
+    Chooses the tools worth sending to the model for a query.
+
+    Every tool's name, description and parameters are indexed with BM25 when
+    its server connects; select() ranks the catalog against the query and
+    keeps the best matches. Queries that match no tool get the full catalog,
+    so routing can only shrink the prompt, never hide the one tool needed.
+    The chatbot routes again on every tool round, so a tool that only the
+    results of earlier calls make relevant is still offered.
+    """
+
+    def __init__(self, max_tools: int = ROUTER_MAX_TOOLS, min_score_ratio: float = MIN_SCORE_RATIO):
+        self.max_tools = max_tools
+        self.min_score_ratio = min_score_ratio
+        self.index = Bm25Index()
+
+    def add(self, name: str, description: str, input_schema: dict):
+        self.index.add(name, tool_terms(name, description, input_schema))
+
+    def select(self, query: str, names: Iterable[str], default: Optional[List[str]] = None) -> List[str]:
+        """
+        Args:
+            query: The user's request, or the text of a later tool round
+            names: Names of all available tools
+            default: Returned when the query matches no tool (all names if None)
+
+        Returns:
+            Names of the tools to offer, best match first
+        """
+        names = list(names)
+        if len(names) <= self.max_tools:
+            return names
+        ranked = self.index.search(" ".join(terms(query)), limit=self.max_tools)
+        if not ranked:
+            return names if default is None else default
+        best = ranked[0][1]
+        return [name for name, score in ranked if score >= best * self.min_score_ratio]
@@ -0,0 +1,236 @@
+import difflib
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from text_search import STOPWORDS, stem
+
+# Abbreviations spelled out before topics are compared, so "llm reasoning"
+# and "large language model reasoning" share one folder
+ABBREVIATIONS = {
+    "ai": "artificial intelligence",
+    "cot": "chain of thought",
+    "cv": "computer vision",
+    "gnn": "graph neural network",
+    "gnns": "graph neural networks",
+    "llm": "large language model",
+    "llms": "large language models",
+    "ml": "machine learning",
+    "nlp": "natural language processing",
+    "rag": "retrieval augmented generation",
+    "rl": "reinforcement learning",
+    "rlhf": "reinforcement learning from human feedback",
+    "vlm": "vision language model",
+    "vlms": "vision language models",
+}
+
+# Words of a topic; trailing "+" and "#" stay part of the word ("c++", "c#")
+TOPIC_WORD_RE = re.compile(r"[a-z0-9]+[+#]*")
+
+# Similarity (difflib ratio) above which a word is treated as a misspelling of
+# another; words shorter than FUZZY_MIN_LENGTH or containing digits must match
+# exactly, so "gpt 3" / "gpt 4" and "cnn" / "rnn" stay apart
+FUZZY_CUTOFF = 0.88
+FUZZY_MIN_LENGTH = 5
+# Share of common words above which merge_topics suggests two topics as duplicates
+SUGGEST_MIN_OVERLAP = 0.5
+
+
+def topic_folder(topic: str) -> str:
+    """
+    Folder-style name of a topic: lowercase words joined by underscores ("LLM Reasoning" -> "llm_reasoning").
+
+    "+" and "#" are kept, so "C++" and "C#" get folders of their own.
+    """
+    return re.sub(r"[^a-z0-9+#]+", "_", topic.lower()).strip("_") or "untitled"
+
+
+def topic_key(topic: str) -> str:
+    """
+    Normalized form of a topic used to find similar stored topics.
+
+    Abbreviations are spelled out, stopwords dropped and words stemmed;
+    order and repeated words are kept, so "Computers" and "the computer"
+    share a key while "structured data" and "data structure" do not.
+    """
+    words = " ".join(ABBREVIATIONS.get(word, word) for word in TOPIC_WORD_RE.findall(topic.lower()))
+    # Unlike search terms, single characters count: "gpt 3" is not "gpt 4"
+    return " ".join(stem(term) for term in words.split() if term not in STOPWORDS)
+
+
+def misspelled(key: str, other: str, cutoff: float = FUZZY_CUTOFF) -> bool:
+    """True if two different topic keys differ only in the spelling of one long word at the same position."""
+    words, other_words = key.split(), other.split()
+    if len(words) != len(other_words):
+        return False
+    differing = [(word, other_word) for word, other_word in zip(words, other_words) if word != other_word]
+    if len(differing) != 1:
+        return False
+    word, other_word = differing[0]
+    if min(len(word), len(other_word)) < FUZZY_MIN_LENGTH or not (word + other_word).isalpha():
+        return False
+    return difflib.SequenceMatcher(None, word, other_word).ratio() >= cutoff
+
+
+class TopicResolver:
+    """
+    Maps requested topics onto topic folders.
+
+    resolve() returns the topic's own folder, one it was explicitly aliased
+    to by merge_topics (the alias table is saved to alias_path), or a stored
+    folder with exactly the same topic_key(), so "Computers" reuses
+    "computer". The key keeps word order, so this never joins topics that
+    differ in more than inflection, stopwords or abbreviations. similar()
+    additionally finds a stored topic with one misspelled word; that is
+    only ever suggested to callers, never resolved to.
+    """
+
+    def __init__(self, alias_path: Optional[str] = None, fuzzy_cutoff: float = FUZZY_CUTOFF):
+        self.alias_path = alias_path
+        self.fuzzy_cutoff = fuzzy_cutoff
+        # folder name of a merged topic -> folder it was merged into
+        self.aliases: Dict[str, str] = {}
+        # folder -> topic key, computed once per folder name
+        self._keys: Dict[str, str] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def key(self, folder: str) -> str:
+        key = self._keys.get(folder)
+        if key is None:
+            key = self._keys[folder] = topic_key(folder)
+        return key
+
+    def resolve(self, topic: str, existing: Iterable[str]) -> str:
+        """
+        Args:
+            topic: Topic as requested (free text or folder name)
+            existing: Folder names of the stored topics
+
+        Returns:
+            Folder the topic's papers belong in: an existing folder of that
+            name, the target of an alias, the first existing folder (by name)
+            with the same topic_key(), or else a new folder
+        """
+        folder = topic_folder(topic)
+        existing = set(existing)
+        # Folders named before topic_folder() existed may keep other characters
+        for name in (folder, topic.lower().replace(" ", "_")):
+            if name in existing:
+                return name
+        with self._lock:
+            self._load()
+            target = self.aliases.get(folder)
+        if target is not None:
+            return target
+        key = topic_key(topic)
+        if key:
+            for name in sorted(existing):
+                if self.key(name) == key:
+                    return name
+        return folder
+
+    def similar(self, topic: str, existing: Iterable[str]) -> Optional[str]:
+        """
+        A stored topic that is probably meant by topic, to suggest instead of using it.
+
+        Returns:
+            The first folder (by name) with the same topic_key(), else one whose
+            key differs by a single misspelled word, else None
+        """
+        key = topic_key(topic)
+        if not key:
+            return None
+        folder = topic_folder(topic)
+        candidates = [name for name in sorted(existing) if name != folder]
+        for name in candidates:
+            if self.key(name) == key:
+                return name
+        for name in candidates:
+            if misspelled(key, self.key(name), self.fuzzy_cutoff):
+                return name
+        return None
+
+    def add_alias(self, topic: str, folder: str):
+        """Resolve topic to folder from now on."""
+        source = topic_folder(topic)
+        with self._lock:
+            self._load()
+            for alias, target in list(self.aliases.items()):
+                # Topics that pointed at the merged folder follow it
+                if target == source:
+                    self.aliases[alias] = folder
+            self.aliases[source] = folder
+            self._save()
+
+    def duplicates(self, existing: Iterable[str]) -> List[dict]:
+        """
+        Groups of stored topics that look like the same subject.
+
+        Returns:
+            [{"topics": [...], "reason": ...}], folders with identical keys first,
+            then pairs sharing at least SUGGEST_MIN_OVERLAP of their words or
+            differing by one misspelled word
+        """
+        groups: Dict[str, List[str]] = {}
+        for name in sorted(existing):
+            groups.setdefault(self.key(name), []).append(name)
+        suggestions = [
+            {"topics": names, "reason": "same words after normalization"}
+            for names in groups.values() if len(names) > 1
+        ]
+
+        # Only compare keys that share a word
+        by_word: Dict[str, List[str]] = {}
+        for key in groups:
+            for word in key.split():
+                by_word.setdefault(word, []).append(key)
+        seen = set()
+        for keys in by_word.values():
+            for i, first in enumerate(keys):
+                for second in keys[i + 1:]:
+                    if (first, second) in seen:
+                        continue
+                    seen.add((first, second))
+                    first_words, second_words = set(first.split()), set(second.split())
+                    overlap = len(first_words & second_words) / len(first_words | second_words)
+                    if misspelled(first, second, self.fuzzy_cutoff):
+                        reason = "one word spelled differently"
+                    elif overlap >= SUGGEST_MIN_OVERLAP:
+                        reason = f"{overlap:.0%} of words shared"
+                    else:
+                        continue
+                    suggestions.append({"topics": groups[first] + groups[second], "reason": reason})
+        return suggestions
+
+    def _load(self):
+        """(Re)read the alias table if another process changed it."""
+        if not self.alias_path:
+            return
+        try:
+            mtime = os.stat(self.alias_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.alias_path, "r") as alias_file:
+                self.aliases = json.load(alias_file)
+            self._mtime = mtime
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading {self.alias_path}: {str(e)}")
+
+    def _save(self):
+        if not self.alias_path:
+            return
+        directory = os.path.dirname(self.alias_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.alias_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as alias_file:
+            json.dump(self.aliases, alias_file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.alias_path)
+        self._mtime = os.stat(self.alias_path).st_mtime_ns
@@ -0,0 +1,236 @@
+import functools
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from paper_store import PaperStore, _file_lock
+from text_search import paper_terms
+
+# Hashed feature dimensions per paper (float32, so 2 KB per paper at 512)
+VECTOR_DIM = 512
+INITIAL_CAPACITY = 1024
+# All row norms are recomputed with fresh IDF weights once the corpus has
+# grown by this fraction; rows added in between use the current weights
+RENORM_GROWTH = 0.1
+# Rows per block when recomputing norms, to bound temporary memory
+NORM_BLOCK_ROWS = 8192
+
+
+@functools.lru_cache(maxsize=1 << 17)
+def _term_hash(term: str) -> int:
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def hashed_vector(terms: List[str], dim: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Sublinear term frequencies hashed into dim buckets (written into out if given).
+
+    crc32 keeps bucket assignment stable across processes (unlike hash());
+    one hash bit picks the sign, so colliding terms tend to cancel out
+    instead of piling up.
+    """
+    vector = np.zeros(dim, dtype=np.float32) if out is None else out
+    for term, tf in Counter(terms).items():
+        h = _term_hash(term)
+        vector[h % dim] += (1.0 + math.log(tf)) * (1.0 if h & 0x80000000 else -1.0)
+    return vector
+
+
+class PaperVectorIndex:
+    """
+    TF-IDF style vectors of every stored paper in one memory-mapped matrix.
+
+    Row i of <directory>/vectors.f32 (float32, dim columns) holds the hashed
+    term frequencies of the paper on line i of ids.txt; df.npy counts the
+    papers with a non-zero value in each column. A similarity query weights
+    the paper's row with IDF squared, multiplies it with the whole matrix in
+    one vectorized operation and divides by the cached, IDF-weighted row
+    norms, which gives the cosine similarity to every paper at once.
+
+    add() writes new rows in place and appends their IDs, so updates cost
+    only the new papers. The matrix file grows by doubling. Writers hold a
+    file lock, and readers pick up rows other processes appended when
+    ids.txt grows.
+    """
+
+    def __init__(self, directory: str, dim: int = VECTOR_DIM):
+        self.directory = directory
+        self.dim = dim
+        os.makedirs(directory, exist_ok=True)
+        self.matrix_path = os.path.join(directory, "vectors.f32")
+        self.ids_path = os.path.join(directory, "ids.txt")
+        self.df_path = os.path.join(directory, "df.npy")
+        self.lock_path = os.path.join(directory, ".lock")
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.df = np.zeros(dim, dtype=np.int64)
+        self.synced = False
+        self._matrix = None
+        self._ids_size = 0
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._norm_count = 0
+        self._lock = threading.Lock()
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, paper_id: str) -> bool:
+        return paper_id in self.rows
+
+    def _open_matrix(self, rows: int):
+        """Map the matrix file, growing it by doubling until it holds rows rows."""
+        size = os.path.getsize(self.matrix_path) if os.path.exists(self.matrix_path) else 0
+        capacity = max(INITIAL_CAPACITY, size // (4 * self.dim))
+        while capacity < rows:
+            capacity *= 2
+        if size < capacity * 4 * self.dim:
+            with open(self.matrix_path, "ab") as matrix_file:
+                matrix_file.truncate(capacity * 4 * self.dim)
+        if self._matrix is None or self._matrix.shape[0] != capacity:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _refresh(self):
+        """Load IDs (and the rows behind them) that were appended since the last call, by any process."""
+        try:
+            size = os.path.getsize(self.ids_path)
+        except FileNotFoundError:
+            size = 0
+        if size != self._ids_size:
+            with open(self.ids_path, "rb") as ids_file:
+                ids_file.seek(self._ids_size)
+                data = ids_file.read(size - self._ids_size)
+            # Only complete lines: a writer may be halfway through appending
+            complete = data[:data.rfind(b"\n") + 1]
+            for paper_id in complete.decode("utf-8").splitlines():
+                self.rows[paper_id] = len(self.ids)
+                self.ids.append(paper_id)
+            self._ids_size += len(complete)
+            if os.path.exists(self.df_path):
+                self.df = np.load(self.df_path)
+        self._open_matrix(len(self.ids))
+
+    def add(self, papers_info: Dict[str, dict]):
+        """Insert or replace the vectors of paper records ({paper ID: record})."""
+        if not papers_info:
+            return
+        with self._lock, _file_lock(self.lock_path):
+            self._refresh()
+            new_ids = [paper_id for paper_id in papers_info if paper_id not in self.rows]
+            self._open_matrix(len(self.ids) + len(new_ids))
+            committed = len(self.ids)
+            vectors = np.zeros((len(papers_info), self.dim), dtype=np.float32)
+            rows = np.empty(len(papers_info), dtype=np.int64)
+            for i, (paper_id, paper_info) in enumerate(papers_info.items()):
+                hashed_vector(paper_terms(paper_info), self.dim, vectors[i])
+                row = self.rows.get(paper_id)
+                if row is None:
+                    row = self.rows[paper_id] = len(self.ids)
+                    self.ids.append(paper_id)
+                rows[i] = row
+            # Replaced rows stop counting towards the document frequencies
+            replaced = rows[rows < committed]
+            if len(replaced):
+                self.df -= np.count_nonzero(self._matrix[replaced], axis=0)
+            self._matrix[rows] = vectors
+            self.df += np.count_nonzero(vectors, axis=0)
+            known = rows < len(self._norms)
+            if known.any():
+                self._norms[rows[known]] = np.sqrt((vectors[known] * vectors[known]) @ (self._idf() ** 2))
+            self._matrix.flush()
+            # The ID file is the commit record: rows only count once their ID is appended
+            if new_ids:
+                with open(self.ids_path, "ab") as ids_file:
+                    ids_file.write("".join(f"{paper_id}\n" for paper_id in new_ids).encode("utf-8"))
+                self._ids_size = os.path.getsize(self.ids_path)
+            tmp_path = f"{self.df_path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, self.df)
+            os.replace(tmp_path, self.df_path)
+
+    def sync(self, store: PaperStore) -> int:
+        """
+        Add every paper of store that has no vector yet (e.g. after a migration).
+
+        Returns:
+            Number of papers added
+        """
+        missing = {}
+        for topic in store.list_topics():
+            for paper_id, paper_info in (store.get_topic(topic) or {}).items():
+                if paper_id not in self.rows:
+                    missing[paper_id] = paper_info
+        paper_ids = list(missing)
+        for start in range(0, len(paper_ids), 1000):
+            self.add({paper_id: missing[paper_id] for paper_id in paper_ids[start:start + 1000]})
+        self.synced = True
+        return len(missing)
+
+    def _idf(self) -> np.ndarray:
+        n = len(self.ids)
+        return (np.log((1 + n) / (1 + self.df)) + 1).astype(np.float32)
+
+    def _row_norms(self, idf_squared: np.ndarray) -> np.ndarray:
+        """IDF-weighted L2 norm of every row, updated only for rows added since the last call."""
+        count = len(self.ids)
+        if self._norm_count == 0 or count > self._norm_count * (1 + RENORM_GROWTH):
+            start = 0
+            self._norms = np.empty(count, dtype=np.float32)
+            self._norm_count = count
+        else:
+            start = len(self._norms)
+            self._norms = np.concatenate([self._norms, np.empty(count - start, dtype=np.float32)])
+        for block in range(start, count, NORM_BLOCK_ROWS):
+            rows = self._matrix[block:min(block + NORM_BLOCK_ROWS, count)]
+            self._norms[block:block + len(rows)] = np.sqrt((rows * rows) @ idf_squared)
+        return self._norms
+
+    def related(self, paper_id: str, k: int = 5) -> Optional[List[Tuple[str, float]]]:
+        """
+        The papers most similar to one stored paper.
+
+        Args:
+            paper_id: ID of a paper in the index
+            k: Number of papers to return
+
+        Returns:
+            Up to k (paper ID, cosine similarity) pairs with a positive
+            similarity, most similar first, or None if the paper is not in the index
+        """
+        with self._lock:
+            self._refresh()
+            row = self.rows.get(paper_id)
+            if row is None:
+                return None
+            count = len(self.ids)
+            idf_squared = self._idf() ** 2
+            norms = self._row_norms(idf_squared)
+            query = np.array(self._matrix[row])
+            query_norm = norms[row] or 1.0
+            scores = (self._matrix[:count] @ (query * idf_squared)) / (np.maximum(norms, 1e-12) * query_norm)
+            scores[row] = -np.inf
+            k = min(k, count - 1)
+            if k <= 0:
+                return []
+            top = np.argpartition(scores, count - k)[count - k:]
+            top = top[np.argsort(-scores[top])]
+            # Papers sharing no terms (or only colliding ones) are not related
+            return [(self.ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+def open_vector_index(paper_dir: str) -> PaperVectorIndex:
+    """
+    Index under VECTOR_INDEX_DIR (default <paper_dir>/vectors).
+
+    VECTOR_DIM changes the number of hashed features; an existing index must
+    be deleted before it can be rebuilt with a different value.
+    """
+    return PaperVectorIndex(
+        os.environ.get("VECTOR_INDEX_DIR", os.path.join(paper_dir, "vectors")),
+        int(os.environ.get("VECTOR_DIM", VECTOR_DIM)),
+    )
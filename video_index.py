@@ -0,0 +1,228 @@
+import fnmatch
+import json
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+VIDEO_EXTENSIONS = frozenset({'.mov', '.mp4', '.avi', '.mkv', '.wmv', '.flv', '.webm', '.m4v'})
+
+# Fields list_video_files can sort on; metadata fields need every file probed
+SORT_FIELDS = ("name", "size", "mtime", "duration")
+METADATA_FIELDS = frozenset({"duration", "codec", "width", "height"})
+
+
+def probe_metadata(path: str) -> Optional[dict]:
+    """
+    Duration, video codec and resolution of a media file according to ffprobe.
+
+    Returns:
+        Dict with duration (seconds), codec, width, height and bit_rate, or None
+        if ffprobe is missing or cannot read the file
+    """
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-print_format", "json",
+             "-show_entries", "format=duration,bit_rate:stream=codec_type,codec_name,width,height",
+             path],
+            capture_output=True, text=True, timeout=30
+        )
+        info = json.loads(result.stdout or "{}")
+    except (FileNotFoundError, subprocess.TimeoutExpired, json.JSONDecodeError):
+        return None
+    video = next((s for s in info.get("streams", []) if s.get("codec_type") == "video"), {})
+    fmt = info.get("format", {})
+    try:
+        duration = float(fmt["duration"])
+    except (KeyError, ValueError):
+        duration = None
+    if duration is None and not video:
+        return None
+    return {
+        "duration": duration,
+        "codec": video.get("codec_name"),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "bit_rate": int(fmt["bit_rate"]) if str(fmt.get("bit_rate", "")).isdigit() else None,
+    }
+
+
+class VideoIndex:
+    """
+    Persistent index of the video files in one directory.
+
+    refresh() makes a single os.scandir pass and keeps the size and mtime of
+    every video file; entries whose (size, mtime) did not change keep their
+    ffprobe metadata, so only new or modified files are probed again. Probing
+    is lazy: a listing probes the files it returns, and all files only when
+    it filters or sorts on metadata. The index is saved to index_path so the
+    metadata survives restarts. Pass any callable as probe to test without
+    ffprobe.
+    """
+
+    def __init__(self, directory: str, index_path: Optional[str] = None,
+                 probe: Callable[[str], Optional[dict]] = probe_metadata, probe_workers: int = 4):
+        self.directory = directory
+        self.index_path = index_path
+        self.probe = probe
+        self.probe_workers = probe_workers
+        # name -> {name, size, mtime_ns, probed, duration, codec, width, height, bit_rate}
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    def refresh(self):
+        """Bring the index in line with the directory (one scandir pass)."""
+        seen = set()
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if os.path.splitext(entry.name)[1].lower() not in VIDEO_EXTENSIONS:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                seen.add(entry.name)
+                cached = self.entries.get(entry.name)
+                if cached is not None and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+                    continue
+                self.entries[entry.name] = {
+                    "name": entry.name,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "probed": False,
+                }
+                self._dirty = True
+        for name in self.entries.keys() - seen:
+            del self.entries[name]
+            self._dirty = True
+
+    def _probe_all(self, entries: List[dict]):
+        pending = [entry for entry in entries if not entry["probed"]]
+        if not pending:
+            return
+        paths = [os.path.join(self.directory, entry["name"]) for entry in pending]
+        with ThreadPoolExecutor(max_workers=self.probe_workers) as pool:
+            for entry, metadata in zip(pending, pool.map(self.probe, paths)):
+                entry.update(metadata or {})
+                entry["probed"] = True
+        self._dirty = True
+
+    def query(
+        self,
+        pattern: str = "",
+        codec: str = "",
+        min_duration: float = 0,
+        max_duration: float = 0,
+        sort_by: str = "name",
+        descending: bool = False,
+        offset: int = 0,
+        limit: int = 50,
+        probe: bool = True,
+    ) -> Tuple[int, List[dict]]:
+        """
+        Refresh the index and return one page of matching files.
+
+        Args:
+            pattern: Shell-style file name pattern, case-insensitive (e.g. "*.mov", "clip_*")
+            codec: Only files whose video codec is this (e.g. "h264")
+            min_duration: Only files at least this many seconds long
+            max_duration: Only files at most this many seconds long (0 for no limit)
+            sort_by: One of SORT_FIELDS
+            descending: Reverse the sort order
+            offset: Number of matching files to skip
+            limit: Maximum number of files to return
+            probe: Fill in ffprobe metadata for the returned files
+
+        Returns:
+            (number of matching files, entries on the requested page)
+        """
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_FIELDS)}")
+        with self._lock:
+            self.refresh()
+            entries = list(self.entries.values())
+            if pattern:
+                pattern = pattern.lower()
+                entries = [entry for entry in entries if fnmatch.fnmatchcase(entry["name"].lower(), pattern)]
+            if codec or min_duration or max_duration or sort_by in METADATA_FIELDS:
+                self._probe_all(entries)
+            if codec:
+                entries = [entry for entry in entries if (entry.get("codec") or "").lower() == codec.lower()]
+            if min_duration:
+                entries = [entry for entry in entries if (entry.get("duration") or 0) >= min_duration]
+            if max_duration:
+                entries = [entry for entry in entries if entry.get("duration") is not None and entry["duration"] <= max_duration]
+
+            key = "mtime_ns" if sort_by == "mtime" else sort_by
+            if key == "name":
+                entries.sort(key=lambda entry: entry["name"].lower(), reverse=descending)
+            else:
+                # Files without the value (e.g. unreadable duration) always go last
+                known = [entry for entry in entries if entry.get(key) is not None]
+                unknown = [entry for entry in entries if entry.get(key) is None]
+                known.sort(key=lambda entry: entry[key], reverse=descending)
+                entries = known + unknown
+
+            page = entries[offset:offset + limit]
+            if probe:
+                self._probe_all(page)
+            self._save()
+            return len(entries), [dict(entry) for entry in page]
+
+    def _load(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r") as index_file:
+                data = json.load(index_file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error reading {self.index_path}: {str(e)}")
+            return
+        # One index file can hold several directories
+        self.entries = data.get(os.path.abspath(self.directory), {})
+
+    def _save(self):
+        if not self.index_path or not self._dirty:
+            return
+        try:
+            with open(self.index_path, "r") as index_file:
+                data = json.load(index_file)
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        data[os.path.abspath(self.directory)] = self.entries
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as index_file:
+            json.dump(data, index_file)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def describe_video(entry: dict) -> str:
+    """Size, duration, codec and resolution of an index entry as one line."""
+    line = f"{entry['name']} ({entry['size'] / (1024 * 1024):.1f} MB"
+    if entry.get("duration") is not None:
+        line += f", {format_duration(entry['duration'])}"
+    if entry.get("codec"):
+        line += f", {entry['codec']}"
+    if entry.get("width") and entry.get("height"):
+        line += f" {entry['width']}x{entry['height']}"
+    line += ")"
+    return line
+
+
+def modified_at(entry: dict) -> float:
+    return entry["mtime_ns"] / 1e9
+